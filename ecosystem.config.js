@@ -4,6 +4,8 @@ module.exports = {
         name: "StableIntel",
         script: "src/bot/bot.py",
         interpreter: "venv/bin/python",
+        // longer than shutdownDrainSeconds in config.json, which covers stopping the ingestion workers and the drain, so both finish before pm2 sends SIGKILL
+        kill_timeout: 25000,
         env: {
 
         },
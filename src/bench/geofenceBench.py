@@ -0,0 +1,87 @@
+# Measures GeofenceEngine throughput on synthetic teleport batches.
+#
+#   python src/bench/geofenceBench.py --events 200000 --batch 500 --zones 200
+#
+# Positions are uniform over the globe with a share placed inside random zones, so
+# the grid lookup, the circle and polygon tests and the alert paths all get exercised.
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bot"))
+from ingestBench import percentile  # noqa: E402
+from tools.geofence import GeofenceEngine  # noqa: E402
+
+
+def make_zones(count):
+    zones = []
+    for i in range(count):
+        lat, lon = random.uniform(-60, 60), random.uniform(-180, 180)
+        if i % 2:
+            zones.append({"name": f"circle-{i}", "type": "circle", "lat": lat, "lon": lon, "radiusKm": random.uniform(5, 80)})
+        else:
+            sides = random.randint(3, 12)
+            size = random.uniform(0.1, 1.0)
+            points = [
+                [lat + size * math.sin(2 * math.pi * k / sides), lon + size * math.cos(2 * math.pi * k / sides)]
+                for k in range(sides)
+            ]
+            zones.append({"name": f"polygon-{i}", "type": "polygon", "points": points})
+    return zones
+
+
+def make_batch(size, zones, accounts, inside_share):
+    batch = []
+    for _ in range(size):
+        if random.random() < inside_share:
+            zone = random.choice(zones)
+            lat, lon = (zone["lat"], zone["lon"]) if zone["type"] == "circle" else zone["points"][0]
+        else:
+            lat, lon = random.uniform(-85, 85), random.uniform(-180, 180)
+        batch.append({
+            "acid": str(random.randrange(accounts)),
+            "oldLatitude": random.uniform(-85, 85), "oldLongitude": random.uniform(-180, 180),
+            "newLatitude": lat, "newLongitude": lon, "distance": 0,
+        })
+    return batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Geofence engine throughput")
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--zones", type=int, default=200)
+    parser.add_argument("--accounts", type=int, default=50000)
+    parser.add_argument("--inside", type=float, default=0.01, help="share of positions placed inside a zone")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    zones = make_zones(args.zones)
+    engine = GeofenceEngine(zones)
+    batches = [make_batch(args.batch, zones, args.accounts, args.inside) for _ in range(args.events // args.batch)]
+
+    timings = []
+    alerts = {}
+    t0 = time.perf_counter()
+    for i, batch in enumerate(batches):
+        t1 = time.perf_counter()
+        for alert in engine.check(batch, now=i):
+            alerts[alert["kind"]] = alerts.get(alert["kind"], 0) + 1
+        timings.append(time.perf_counter() - t1)
+    elapsed = time.perf_counter() - t0
+
+    events = len(batches) * args.batch
+    print(f"geofence: {events} events in {elapsed:.2f}s ({events / elapsed:.0f} events/s), "
+          f"{len(engine.zones)} zones in {len(engine.grid)} grid cells")
+    print(f"per batch of {args.batch}: p50 {statistics.median(timings) * 1000:.2f} ms, "
+          f"p99 {percentile(timings, 99) * 1000:.2f} ms")
+    print(f"alerts: {alerts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# Compares the in-loop aiohttp ingestion server against the old threaded Flask path.
+#
+#   python src/bench/ingestBench.py --requests 5000 --concurrency 64 --batch 20
+#
+# Both servers enqueue into an asyncio.Queue on the benchmark's event loop, exactly
+# like StableIntelBot does. Enqueue latency is measured from the moment the client
+# starts a request until the batch is on the queue. The "+spool" run adds the
+# on-disk event spool write that the bot does before answering 204.
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import aiohttp
+from flask import Flask, request
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bot"))
+from tools.ingestServer import IngestServer  # noqa: E402
+from tools.eventSpool import EventSpool  # noqa: E402
+
+ROUTE = "/aircraft-change"
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def make_batch(size, sent_at):
+    return [
+        {"callsign": f"BENCH{i}", "oldAircraft": "1", "newAircraft": "2", "sentAt": sent_at}
+        for i in range(size)
+    ]
+
+
+async def fire(url, total, concurrency, batch_size):
+    # keep-alive client, so the numbers reflect the server rather than connection setup
+    sem = asyncio.Semaphore(concurrency)
+    statuses = {}
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def one():
+            async with sem:
+                async with session.post(url, json=make_batch(batch_size, time.perf_counter())) as resp:
+                    await resp.read()
+                    statuses[resp.status] = statuses.get(resp.status, 0) + 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - t0
+    return elapsed, statuses
+
+
+async def drain(queue, latencies, expected):
+    for _ in range(expected):
+        _, data, enqueued_at = await queue.get()
+        latencies.append(enqueued_at - data[0]["sentAt"])
+        queue.task_done()
+
+
+async def bench_aiohttp(port, args, spool_dir=None):
+    queue = asyncio.Queue()
+    spool = None
+    if spool_dir is not None:
+        # same write-ahead path as StableIntelBot.enqueue_event: durable before the 204
+        spool = EventSpool(os.path.join(spool_dir, "spool.sqlite3"))
+        await spool.start()
+
+    async def enqueue(event_type, data, received_at):
+        if spool is not None:
+            await spool.append(event_type, data)
+        await queue.put((event_type, data, time.perf_counter()))
+
+    server = IngestServer(enqueue, {ROUTE: "aircraft-change"}, port=port)
+    await server.start()
+    latencies = []
+    consumer = asyncio.create_task(drain(queue, latencies, args.requests))
+    try:
+        elapsed, statuses = await fire(f"http://127.0.0.1:{port}{ROUTE}", args.requests, args.concurrency, args.batch)
+        await consumer
+    finally:
+        await server.stop()
+        if spool is not None:
+            await spool.close()
+            print(f"spool: {spool.appended} batches in {spool.commits} commits")
+    return elapsed, statuses, latencies
+
+
+async def bench_flask(port, args):
+    # mirrors the route shape StableIntelBot used before the aiohttp server
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    async def put(item):
+        await queue.put((item[0], item[1], time.perf_counter()))
+
+    app = Flask(__name__)
+
+    @app.route(ROUTE, methods=["POST"])
+    def aircraft_change():
+        data = request.json
+        if not isinstance(data, list):
+            return 'Invalid data format. Expected a list.', 400
+        asyncio.run_coroutine_threadsafe(put(("aircraft-change", data)), loop)
+        return "", 204
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", port, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    latencies = []
+    consumer = asyncio.create_task(drain(queue, latencies, args.requests))
+    try:
+        elapsed, statuses = await fire(f"http://127.0.0.1:{port}{ROUTE}", args.requests, args.concurrency, args.batch)
+        await consumer
+    finally:
+        server.shutdown()
+        thread.join()
+    return elapsed, statuses, latencies
+
+
+def report(name, elapsed, statuses, latencies, total):
+    print(
+        f"{name:<8} {total / elapsed:>10.1f} req/s   "
+        f"p50 {statistics.median(latencies) * 1000:>8.2f} ms   "
+        f"p99 {percentile(latencies, 99) * 1000:>8.2f} ms   "
+        f"statuses {statuses}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Ingestion server benchmark")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--batch", type=int, default=20)
+    parser.add_argument("--port", type=int, default=5902)
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {args.batch} events per batch")
+    report("flask", *(await bench_flask(args.port, args)), args.requests)
+    report("aiohttp", *(await bench_aiohttp(args.port + 1, args)), args.requests)
+    with tempfile.TemporaryDirectory() as spool_dir:
+        report("+spool", *(await bench_aiohttp(args.port + 2, args, spool_dir)), args.requests)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
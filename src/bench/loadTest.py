@@ -0,0 +1,295 @@
+# Offline end-to-end load test: synthetic batches -> ingestion routes -> queue -> fake Discord.
+#
+#   python src/bench/loadTest.py --batches 200 --batch-size 25
+#   python src/bench/loadTest.py --geofs-seconds 30 --geofs-5xx 0.2 --geofs-bad-json 0.1
+#   python src/bench/loadTest.py --max-p99 90 --max-not-accepted 0.05   # as a CI gate
+#
+# Run from the repository root (the bot reads src/bot/config.json relative to it).
+# Exits with status 1 when a threshold is breached: fewer than --min-delivered of the
+# accepted events delivered, an ingest->delivery p50/p99 over --max-p50/--max-p99, more
+# than --max-not-accepted of the requests answered with something other than 204, or
+# more than --max-poll-failures of the GeoFS polls timing out.
+# Nothing here talks to Discord or GeoFS: channels are replaced by FakeChannel, which
+# enforces Discord-like per-channel rate limits, and the chat poller is pointed at a
+# local /update stand-in that can inject latency, empty bodies, bad JSON and 5xx.
+import argparse
+import asyncio
+import gzip
+import itertools
+import logging
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bot"))
+from ingestBench import percentile  # noqa: E402
+import bot as bot_module  # noqa: E402
+from tools.eventSpool import EventSpool  # noqa: E402
+from tools.multiplayerAPI import AsyncMultiplayerAPI  # noqa: E402
+from tools.http_client import close_async_session, latency_summary  # noqa: E402
+
+TAG = re.compile(r"LT-(\d+)\b")
+
+
+def make_item(event_type, tag):
+    if event_type == "aircraft-change":
+        return {"acid": tag, "callsign": tag, "oldAircraft": "Cessna 172", "newAircraft": "Airbus A320"}
+    if event_type == "new-account":
+        return {"acid": tag, "callsign": tag}
+    if event_type == "callsign-change":
+        return {"acid": tag, "oldCallsign": "OLD", "newCallsign": "NEW"}
+    if event_type == "teleporation":
+        return {
+            "acid": tag, "oldLatitude": 37.61, "oldLongitude": -122.38,
+            "newLatitude": 51.47, "newLongitude": -0.45, "distance": 8620,
+        }
+    return {"acid": tag, "status": random.choice(("online", "offline"))}
+
+
+class FakeChannel:
+    """
+    Stand-in for a discord.TextChannel.
+
+    Allows `limit` sends per `window` seconds, like Discord's per-channel message
+    bucket. An over-limit send is counted as a 429 and retried after the bucket
+    resets, which is what discord.py does internally.
+    """
+
+    def __init__(self, channel_id, sink, limit=5, window=5.0, latency=0.05):
+        self.id = channel_id
+        self.sink = sink
+        self.limit = limit
+        self.window = window
+        self.latency = latency
+        self.sent = []
+        self.rate_limited = 0
+
+    async def send(self, content=None, **kwargs):
+        while True:
+            await asyncio.sleep(self.latency)
+            now = time.perf_counter()
+            self.sent = [t for t in self.sent if now - t < self.window]
+            if len(self.sent) < self.limit:
+                self.sent.append(now)
+                break
+            self.rate_limited += 1
+            await asyncio.sleep(self.window - (now - self.sent[0]))
+        self.sink.delivered(content, kwargs.get("embeds") or [kwargs.get("embed")], kwargs.get("file"))
+
+
+class Sink:
+    """Collects delivery times for every tagged event, across all fake channels."""
+
+    def __init__(self):
+        self.sent_at = {}
+        self.delivered_at = {}
+        self.messages = 0
+
+    def delivered(self, content, embeds, file=None):
+        now = time.perf_counter()
+        self.messages += 1
+        text = (content or "") + "".join((e.description or "") for e in embeds if e is not None)
+        if file is not None:
+            # flood digests carry their events in a gzip attachment
+            text += gzip.decompress(file.fp.getvalue()).decode()
+        for seq in TAG.findall(text):
+            self.delivered_at.setdefault(int(seq), now)
+
+
+async def replay_batches(args, sink, url):
+    seq = itertools.count()
+    event_types = list(bot_module.bot.registry.routes.items())
+    statuses = {}
+    ingest_latency = []
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async with aiohttp.ClientSession() as session:
+        async def post(route, event_type):
+            async with sem:
+                batch = []
+                for _ in range(args.batch_size):
+                    n = next(seq)
+                    batch.append(make_item(event_type, f"LT-{n}"))
+                    sink.sent_at[n] = time.perf_counter()
+                t0 = time.perf_counter()
+                async with session.post(url + route, json=batch) as resp:
+                    await resp.read()
+                    ingest_latency.append(time.perf_counter() - t0)
+                    statuses[resp.status] = statuses.get(resp.status, 0) + 1
+                    if resp.status != 204:
+                        for item in batch:
+                            sink.sent_at.pop(int(item["acid"][3:]), None)
+                if args.interval:
+                    await asyncio.sleep(args.interval)
+
+        await asyncio.gather(*(
+            post(*event_types[i % len(event_types)]) for i in range(args.batches)
+        ))
+    return statuses, ingest_latency
+
+
+async def run_pipeline(args):
+    sink = Sink()
+    bot = bot_module.bot
+    channels = {}
+
+    def get_channel(channel_id):
+        if channel_id not in channels:
+            channels[channel_id] = FakeChannel(channel_id, sink, args.rate_limit, args.rate_window, args.send_latency)
+        return channels[channel_id]
+
+    async def ready():
+        return None
+
+    bot.get_channel = get_channel
+    bot.wait_until_ready = ready
+    bot.ingestServer.port = args.port
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        bot.spool = EventSpool(os.path.join(spool_dir, "spool.sqlite3"), logger=bot.logger)
+        bot.register_metrics()
+        await bot.start_pipeline()
+        bot.registry.resolve_channels(get_channel)
+
+        t0 = time.perf_counter()
+        statuses, ingest_latency = await replay_batches(args, sink, f"http://127.0.0.1:{args.port}")
+        # waits for the queue and the channel workers to drain
+        deadline = time.perf_counter() + args.drain_timeout
+        while time.perf_counter() < deadline and len(sink.delivered_at) < len(sink.sent_at):
+            await asyncio.sleep(0.1)
+        elapsed = time.perf_counter() - t0
+
+        for task in bot.pipeline_tasks:
+            task.cancel()
+        bot.dispatcher.stop()
+        await bot.ingestServer.stop()
+        await bot.spool.close()
+
+    latencies = [sink.delivered_at[n] - sink.sent_at[n] for n in sink.delivered_at if n in sink.sent_at]
+    print(f"ingest:   {sum(statuses.values())} requests {statuses}, "
+          f"p50 {statistics.median(ingest_latency) * 1000:.1f} ms, p99 {percentile(ingest_latency, 99) * 1000:.1f} ms")
+    print(f"delivery: {len(sink.delivered_at)}/{len(sink.sent_at)} events in {sink.messages} messages "
+          f"over {elapsed:.1f}s ({len(sink.delivered_at) / elapsed:.1f} events/s), "
+          f"429s {sum(c.rate_limited for c in channels.values())}")
+    if latencies:
+        print(f"ingest->delivery: p50 {statistics.median(latencies):.2f}s, p99 {percentile(latencies, 99):.2f}s, "
+              f"max {max(latencies):.2f}s")
+    for stage, p in bot.tracer.summary().items():
+        print(f"  {stage:<24} p50 {p['p50'] * 1000:8.1f} ms  p99 {p['p99'] * 1000:8.1f} ms  ({p['n']} batches)")
+
+    breaches = []
+    requests = sum(statuses.values())
+    delivered = len(sink.delivered_at) / len(sink.sent_at) if sink.sent_at else 1.0
+    if delivered < args.min_delivered:
+        breaches.append(f"delivered {delivered:.1%} of accepted events, below {args.min_delivered:.1%}")
+    not_accepted = (requests - statuses.get(204, 0)) / requests if requests else 0.0
+    if args.max_not_accepted is not None and not_accepted > args.max_not_accepted:
+        breaches.append(f"{not_accepted:.1%} of requests not accepted, above {args.max_not_accepted:.1%}")
+    if latencies:
+        for name, limit, value in (("p50", args.max_p50, statistics.median(latencies)), ("p99", args.max_p99, percentile(latencies, 99))):
+            if limit is not None and value > limit:
+                breaches.append(f"ingest->delivery {name} {value:.2f}s, above {limit:g}s")
+    return breaches
+
+
+async def run_geofs(args):
+    state = {"lastMsgId": 0}
+    counts = {}
+
+    async def update(request):
+        await request.read()
+        await asyncio.sleep(random.uniform(0, args.geofs_latency))
+        roll = random.random()
+        if roll < args.geofs_5xx:
+            mode, response = "5xx", web.Response(status=503, text="unavailable")
+        elif roll < args.geofs_5xx + args.geofs_empty:
+            mode, response = "empty", web.Response(status=200, text="")
+        elif roll < args.geofs_5xx + args.geofs_empty + args.geofs_bad_json:
+            mode, response = "bad-json", web.Response(status=200, text='{"myId": "lt", "chatMess')
+        else:
+            new = random.randint(0, 4)
+            state["lastMsgId"] += new
+            mode, response = "ok", web.json_response({
+                "myId": "lt",
+                "lastMsgId": state["lastMsgId"],
+                "chatMessages": [{"acid": 1, "cs": "LT", "msg": "load+test"} for _ in range(new)],
+            })
+        counts[mode] = counts.get(mode, 0) + 1
+        return response
+
+    app = web.Application()
+    app.router.add_post("/update", update)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port + 1).start()
+
+    api = AsyncMultiplayerAPI("load-test", "0", url=f"http://127.0.0.1:{args.port + 1}/update")
+    polls = []
+    failures = 0
+    await api.handshake()
+    deadline = time.perf_counter() + args.geofs_seconds
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(api.getMessages(), timeout=20)
+            polls.append(time.perf_counter() - t0)
+        except asyncio.TimeoutError:
+            failures += 1
+    await close_async_session()
+    await runner.cleanup()
+
+    print(f"geofs:    {len(polls)} polls ok, {failures} timed out, server replies {counts}")
+    if polls:
+        print(f"getMessages: p50 {statistics.median(polls) * 1000:.1f} ms, p99 {percentile(polls, 99) * 1000:.1f} ms")
+    print(f"http pool: {latency_summary()}")
+
+    failed = failures / (failures + len(polls)) if failures + len(polls) else 0.0
+    if args.max_poll_failures is not None and failed > args.max_poll_failures:
+        return [f"{failed:.1%} of GeoFS polls timed out, above {args.max_poll_failures:.1%}"]
+    return []
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end load test")
+    parser.add_argument("--batches", type=int, default=200, help="batches posted, spread across all event routes")
+    parser.add_argument("--batch-size", type=int, default=25)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--interval", type=float, default=0.0, help="pause after each batch per client slot")
+    parser.add_argument("--rate-limit", type=int, default=5, help="fake Discord sends allowed per window per channel")
+    parser.add_argument("--rate-window", type=float, default=5.0)
+    parser.add_argument("--send-latency", type=float, default=0.05)
+    parser.add_argument("--drain-timeout", type=float, default=300.0)
+    parser.add_argument("--port", type=int, default=5912)
+    parser.add_argument("--geofs-seconds", type=float, default=0.0, help="also poll the fake GeoFS server this long")
+    parser.add_argument("--geofs-latency", type=float, default=0.2)
+    parser.add_argument("--geofs-empty", type=float, default=0.05)
+    parser.add_argument("--geofs-bad-json", type=float, default=0.05)
+    parser.add_argument("--geofs-5xx", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=1)
+    # pass/fail thresholds; a breach makes the exit status 1
+    parser.add_argument("--min-delivered", type=float, default=1.0, help="fraction of accepted events that must be delivered")
+    parser.add_argument("--max-p50", type=float, default=None, help="ingest->delivery p50 limit in seconds")
+    parser.add_argument("--max-p99", type=float, default=None, help="ingest->delivery p99 limit in seconds")
+    parser.add_argument("--max-not-accepted", type=float, default=None, help="fraction of requests allowed a status other than 204")
+    parser.add_argument("--max-poll-failures", type=float, default=None, help="fraction of GeoFS polls allowed to time out")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    logging.getLogger("STABLE INTEL").setLevel(logging.WARNING)
+    breaches = await run_pipeline(args)
+    if args.geofs_seconds:
+        breaches += await run_geofs(args)
+    for breach in breaches:
+        print(f"FAIL: {breach}")
+    return 1 if breaches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
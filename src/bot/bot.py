@@ -3,235 +3,555 @@ from discord import app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
 import os
-from flask import Flask, request
-from threading import Thread
 import asyncio
-import logging
-import sys
+import contextlib
+import hashlib
 import json
+import logging
+import signal
+import time
+from tools.ingestServer import IngestServer
+from tools.ingestWorker import IngestBridge
+from tools.embedPacker import pack_embeds, compact_embeds, FrozenEmbed
+from tools.channelDispatcher import ChannelDispatcher
+from tools.webhookPool import WebhookPool
+from tools.eventQueue import EventQueue, QueueFull
+from tools.eventSpool import EventSpool
+from tools.eventRegistry import EventRegistry
+from tools.subscriptions import SubscriptionTable
+from tools.tracing import TraceRecorder, trace_id
+from tools.floodDigest import FloodDigest
+from tools.metrics import metrics
+from tools.asyncLogging import setup_logging, apply_levels, stop_logging
+
+QUEUE_WAIT_SECONDS = metrics.histogram("stableintel_queue_wait_seconds", "Time a batch spends in task_queue before processing.", ("event_type",))
+DISCORD_RATE_LIMITS = metrics.counter("stableintel_discord_rate_limited_total", "429 responses discord.py reported and retried internally.")
+TASK_RESTARTS = metrics.counter("stableintel_task_restarts_total", "Supervised background tasks restarted after crashing.", ("task",))
+BOOT_PHASE_SECONDS = metrics.gauge("stableintel_boot_phase_seconds", "Duration of each startup phase of the last boot.", ("phase",))
+EVENT_LATENCY_SECONDS = metrics.histogram("stableintel_event_latency_seconds", "Receive-to-delivery time of a batch per event type.", ("event_type",))
+EVENTS_COALESCED = metrics.counter("stableintel_events_coalesced_total", "Items merged into another item or dropped as duplicates.", ("event_type",))
+BATCH_FAILURES = metrics.counter("stableintel_batch_failures_total", "Batches whose processing raised and were discarded.", ("event_type",))
+
+
+class RateLimitCounter(logging.Handler):
+    # discord.py retries 429s internally and only tells us through its 'discord.http' logger
+    def emit(self, record):
+        if "rate limit" in record.getMessage().lower():
+            DISCORD_RATE_LIMITS.inc()
 
 load_dotenv()
 BOT_TOKEN = os.getenv('DISCORD_TOKEN')
 class StableIntelBot(commands.Bot):
     def __init__(self, botToken):
-        # sets up logger
+        self.boot_started = time.perf_counter()
+        self.boot_timings = {}
+        # sets up logger; every logger goes through one queue, written to stdout by a background thread
+        setup_logging()
         self.logger = logging.getLogger("STABLE INTEL")
-        self.logger.setLevel(logging.DEBUG)
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.DEBUG)
-        self.logger.addHandler(console_handler)
 
         intents = discord.Intents.default()
         intents.message_content = True
         super().__init__(command_prefix='=', intents=intents)
 
-        self.flaskApp = Flask(__name__)
-        self.flaskApp.logger.handlers = self.logger.handlers
-        self.flaskApp.logger.setLevel(self.logger.level)
-
-        werkzeug_logger = logging.getLogger('werkzeug')
-        werkzeug_logger.handlers.clear()
-        werkzeug_logger.propagate = False
-        werkzeug_logger.setLevel(self.logger.level)
-        werkzeug_logger.addHandler(console_handler)
-
         # sets up the event loop
 
         self.throttleInterval = 0.2
-        self.task_queue = asyncio.Queue()
 
-        self.lock = asyncio.Lock()
-        self.config = self.load_config("src/bot/config.json")
+        # single source of event types, routes, templates and channels; also owns the parsed config
+        self.registry = EventRegistry("src/bot/config.json", self.logger)
+        self.config = self.registry.config
+        self.configure_logging()
+        self.registry.on_reload.append(self.configure_logging)
+        # optional webhook delivery, so event logs stop sharing the bot token's rate limit with commands
+        self.webhookPool = None
+        if self.config.get("webhookDelivery", False):
+            self.webhookPool = WebhookPool(
+                name=self.config.get("webhookName", "Stable Intel Events"),
+                per_channel=self.config.get("webhooksPerChannel", 3),
+                logger=self.logger,
+            )
+        # one delivery worker per destination channel, paced by throttleInterval or by the webhooks' buckets
+        self.dispatcher = ChannelDispatcher(
+            self.throttleInterval, self.logger, webhooks=self.webhookPool,
+            max_pending=self.config.get("dispatchMaxPending", 200),
+        )
+        # extra channels, in any guild, that receive event types on top of the configured log channels
+        self.subscriptions = SubscriptionTable(self.config.get("subscriptionsPath", "data/subscriptions.json"), self.logger)
+        self.subscriptions.load()
+        # flooding event types are posted as one summary plus attachment per interval instead of per event
+        self.digests = FloodDigest(self.config.get("floodDigest"), self.dispatcher.submit, self.logger)
+        # event type -> callables fed every valid item of that type, whether or not it is displayed
+        self.event_hooks = {}
+        # hooks that also want the unix time their batch was received, as hook(items, received)
+        self.timed_hooks = set()
+        # bounded queue per event type, served in weighted-fair order; limits, priority, weight and SLO come from queueLimits
+        self.task_queue = EventQueue(self.config.get("queueLimits"), on_drop=self.on_batches_dropped)
+        # both copy their settings out of the config, so a reload hands them the new ones
+        self.registry.on_reload.append(self.apply_limits)
+        # every accepted batch is written to disk before it is acknowledged, and removed once delivered
+        self.spool = EventSpool(
+            self.config.get("spoolPath", "data/spool.sqlite3"),
+            synchronous=self.config.get("spoolSynchronous", "FULL"),
+            logger=self.logger,
+        )
+        # per-batch stage timings (and the chat poll loop's), summarized by /stats
+        self.tracer = TraceRecorder(self.config.get("traceBufferSize", 2048))
+        # delivery futures not yet resolved, awaited by the shutdown drain
+        self.inflight = set()
+        self.processing = False
+        self.shutting_down = False
+        self._shutdown_task = None
         self.setup_routes()
 
-    def load_config(self, config_path):
-        with open(config_path, "r") as f:
-            return json.load(f)
-
     async def clear_queue_for_event(self, event_type):
-        new_queue = asyncio.Queue()
-
-        # iterate through the queue and put all events that are not the specified type into the new queue
-        while not self.task_queue.empty():
-            task_type, data = await self.task_queue.get()
-            if task_type != event_type:
-                await new_queue.put((task_type, data))
-            self.task_queue.task_done()
-        
-        self.task_queue = new_queue
+        purged = self.task_queue.purge(event_type)
+        self.logger.log(20, f"Purged {purged} queued '{event_type}' event(s)")
+        return purged
 
     async def on_ready(self):
         self.logger.log(20, f'{self.user} has connected to Discord!')
-    
+        # channel objects are resolved once here and on config reloads, not per event
+        self.registry.resolve_channels(self.get_channel)
+        if "ready" not in self.boot_timings:
+            self.record_boot_phase("ready", time.perf_counter() - self.boot_started)
+
+    def record_boot_phase(self, phase, elapsed):
+        self.boot_timings[phase] = elapsed
+        BOOT_PHASE_SECONDS.set(elapsed, phase)
+        self.logger.log(20, f"Boot phase '{phase}' took {elapsed * 1000:.0f}ms")
+
+    @contextlib.contextmanager
+    def boot_phase(self, phase):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_boot_phase(phase, time.perf_counter() - t0)
+
     async def setup_hook(self) -> None:
         self.logger.log(20, "Starting up...")
+        self.register_metrics()
         self.logger.log(20, "Loading extensions...")
-        await self._load_extensions()
-        self.logger.log(20, "Syncing commands...")
-        try:
-            synced = await self.tree.sync()
-            self.logger.log(20, f"Synced {len(synced)} command(s)")
-        except Exception as e:
-            self.logger.log(40, f"Exception while syncing commands. Error: {e}")
-
-        self.logger.log(20, "Launching Flask server...")
-        Thread(target=self.flaskApp.run, kwargs={"host": "127.0.0.1", "port": 5002}).start()
+        with self.boot_phase("extensions"):
+            await self._load_extensions()
+        await self.start_pipeline()
+        self.install_signal_handlers()
+        # syncing only talks to Discord's REST API, so the gateway connection does not wait for it
+        self.command_sync_task = asyncio.create_task(self.sync_commands())
         self.logger.log(20, "Connecting to discord...")
 
-        self.logger.log(20, "Starting task processing loops...")
-        self.loop.create_task(self.process_tasks())
+    def command_tree_hash(self):
+        # the application id is included so switching bot tokens always syncs
+        commands = sorted((command.to_dict(self.tree) for command in self.tree.get_commands()), key=lambda c: c["name"])
+        payload = json.dumps({"application": self.application_id, "commands": commands}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
 
-    def setup_routes(self):
-        @self.flaskApp.route("/aircraft-change", methods=["POST"])
-        def aircraft_change():
-            data = request.json
-            if not isinstance(data, list):
-                return 'Invalid data format. Expected a list.', 400
-            asyncio.run_coroutine_threadsafe(self.task_queue.put(("aircraft-change", data)), self.loop)
-            return "", 204
-        @self.flaskApp.route("/new-account", methods=["POST"])
-        def new_account():
-            data = request.json
-            if not isinstance(data, list):
-                return 'Invalid data format. Expected a list.', 400
-            asyncio.run_coroutine_threadsafe(self.task_queue.put(("new-account", data)), self.loop)
-            return "", 204
-        @self.flaskApp.route("/callsign-change", methods=["POST"])
-        def callsign_change():
-            data = request.json
-            if not isinstance(data, list):
-                return 'Invalid data format. Expected a list.', 400
-            asyncio.run_coroutine_threadsafe(self.task_queue.put(("callsign-change", data)), self.loop)
-            return "", 204
-        @self.flaskApp.route("/teleporation", methods=["POST"])
-        def teleporation():
-            data = request.json
-            if not isinstance(data, list):
-                return 'Invalid data format. Expected a list.', 400
-            asyncio.run_coroutine_threadsafe(self.task_queue.put(("teleporation", data)), self.loop)
-            return "", 204
-        @self.flaskApp.route("/activity-change", methods=["POST"])
-        def activity_change():
-            data = request.json
-            if not isinstance(data, list):
-                return 'Invalid data format. Expected a list.', 400
-            asyncio.run_coroutine_threadsafe(self.task_queue.put(("activity-change", data)), self.loop)
-            return "", 204
+    async def sync_commands(self):
+        # skips the rate-limited global sync when the command tree is unchanged since the last successful one
+        path = self.config.get("commandTreeHashPath", "data/command_tree.sha256")
+        with self.boot_phase("command_sync"):
+            digest = self.command_tree_hash()
+            try:
+                with open(path, "r") as f:
+                    if f.read().strip() == digest:
+                        self.logger.log(20, "Command tree unchanged, skipping sync")
+                        return
+            except FileNotFoundError:
+                pass
+            self.logger.log(20, "Syncing commands...")
+            try:
+                synced = await self.tree.sync()
+                self.logger.log(20, f"Synced {len(synced)} command(s)")
+            except Exception as e:
+                self.logger.log(40, f"Exception while syncing commands. Error: {e}")
+                return
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(digest)
 
-    async def process_tasks(self):
-        # process tasks from the queue
-        while True:
-            task_type, data = await self.task_queue.get()
-
-            if task_type == "aircraft-change":
-                await self.process_aircraft_change(data)
-            elif task_type == "new-account":
-                await self.process_new_account(data)
-            elif task_type == "callsign-change":
-                await self.process_callsign_change(data)
-            elif task_type == "teleporation":
-                await self.process_teleportation(data)
-            elif task_type == "activity-change":
-                await self.process_activity_change(data)
-            self.task_queue.task_done()
-    
-    async def process_aircraft_change(self, data):
-        channel = self.get_channel_config("aircraft-change")
-        if not channel or not self.config.get("displayAircraftChanges", True):
-            return
-        
-        embeds = [
-            discord.Embed(
-                title="Aircraft Change",
-                description=f"Callsign: {change_data['callsign']}\n Old Aircraft: {change_data['oldAircraft']}\n New Aircraft: {change_data['newAircraft']}",
-                color=discord.Color.green()
-            ) for change_data in data
-        ]
-        await self.send_embeds(channel, embeds)
+    def configure_logging(self):
+        # format, sampling and levels all follow config.json, including on hot reload
+        sampling = self.config.get("logSampling", {})
+        setup_logging(self.config.get("logFormat", "json"), sampling.get("burst", 5), sampling.get("windowSeconds", 60))
+        apply_levels(self.config.get("logLevels", {"": "INFO"}))
 
-    async def process_new_account(self, data):
-        channel = self.get_channel_config("new-account")
-        if not channel or not self.config.get("displayNewAccounts", True):
-            return
-        
-        embeds = [
-            discord.Embed(
-                title="New Account",
-                description=f"Acoount ID: {account_data['acid']}\n Callsign: {account_data['callsign']}",
-                color=discord.Color.green()
-            ) for account_data in data
-        ]
-        await self.send_embeds(channel, embeds)
+    def apply_limits(self):
+        self.task_queue.configure(self.config.get("queueLimits"))
+        self.digests.config = self.config.get("floodDigest") or {}
 
-    async def process_callsign_change(self, data):
-        channel = self.get_channel_config("callsign-change")
-        if not channel or not self.config.get("displayCallsignChanges", True):
+    def install_signal_handlers(self):
+        # pm2 stops the process with SIGINT (or SIGTERM when configured); both drain before exiting
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.on_signal, sig)
+            except (NotImplementedError, RuntimeError):
+                # no loop signal handlers on Windows; Ctrl+C still stops the bot, without the drain
+                pass
+
+    def on_signal(self, sig):
+        # the task is kept so it cannot be garbage collected mid-drain; a repeated signal is ignored
+        if self._shutdown_task is not None:
+            self.logger.log(20, f"{sig.name} received, already shutting down")
             return
-        
-        embeds = [
-            discord.Embed(
-                title="Callsign Change",
-                description=f"Acoount ID: {callsign_data['acid']}\n Old Callsign: {callsign_data['oldCallsign']}\n New Callsign: {callsign_data['newCallsign']}",
-                color=discord.Color.green()
-            ) for callsign_data in data
-        ]
-        await self.send_embeds(channel, embeds)
+        self._shutdown_task = asyncio.create_task(self.shutdown(sig.name))
 
-    async def process_teleportation(self, data):
-        channel = self.get_channel_config("teleporation")
-        if not channel or not self.config.get("displayTeleporations", True):
+    async def shutdown(self, reason="shutdown"):
+        """Stop ingesting, deliver as much as possible before the deadline, persist the rest, then close."""
+        if self.shutting_down:
             return
-        
-        embeds = [
-            discord.Embed(
-                title="Teleporation",
-                description=f"{teleporation_data['acid']}\n Old Position: {teleporation_data['oldLatitude']}, {teleporation_data['oldLongitude']}\n New Position: {teleporation_data['newLatitude']}, {teleporation_data['newLongitude']}\n Distance: {teleporation_data['distance']} km",
-                color=discord.Color.green()
-            ) for teleporation_data in data
+        self.shutting_down = True
+        deadline = self.config.get("shutdownDrainSeconds", 20)
+        self.logger.log(20, f"{reason} received, draining for up to {deadline}s...")
+        t0 = time.perf_counter()
+
+        self.ingestServer.draining = True
+        await self.ingestServer.stop()
+        if self.ingestBridge is not None:
+            # the workers are stopped together and their wait comes out of the same budget as the drain
+            await self.ingestBridge.stop(min(self.config.get("ingestWorkerStopSeconds", 5), deadline))
+        # discord.py paces 429s itself, so the fixed throttle is dropped while draining
+        self.dispatcher.set_interval(0)
+        # batches held for coalescing go out now rather than at the end of their window
+        self.task_queue.release()
+        try:
+            await asyncio.wait_for(self.drain(), max(0.0, deadline - (time.perf_counter() - t0)))
+            self.logger.log(20, f"Drained queue and deliveries in {time.perf_counter() - t0:.1f}s")
+        except asyncio.TimeoutError:
+            backlog = sum(self.dispatcher.depth().values())
+            self.logger.warning(
+                f"Drain deadline reached with {self.task_queue.qsize()} queued event(s) and {backlog} unsent message(s); "
+                f"their batches stay in the spool for the next start"
+            )
+
+        for task in self.pipeline_tasks:
+            task.cancel()
+        self.dispatcher.stop()
+        # flushes the acks of everything delivered above, so it is not replayed
+        await self.spool.close()
+        await self.close()
+
+    async def drain(self):
+        while not self.task_queue.empty() or self.processing:
+            await asyncio.sleep(0.05)
+        # buffered digests are posted early so their batches can be acknowledged
+        await self.digests.flush_all()
+        while self.inflight:
+            # asyncio.wait, unlike gather, leaves the deliveries untouched when the deadline cancels the drain
+            await asyncio.wait(self.inflight)
+            # lets the done callbacks ack their batches
+            await asyncio.sleep(0)
+        # subscriber and alert messages are not tracked per batch but still get delivered
+        await self.dispatcher.join()
+
+    async def close(self):
+        if self.webhookPool is not None:
+            await self.webhookPool.close()
+        await super().close()
+
+    async def start_pipeline(self):
+        # spool -> ingestion server -> queue consumer; also driven directly by the offline load test
+        self.logger.log(20, "Opening event spool...")
+        with self.boot_phase("spool_replay"):
+            await self.spool.start()
+            await self.replay_spool()
+
+        self.logger.log(20, "Launching ingestion server...")
+        with self.boot_phase("ingest_server"):
+            await self.ingestServer.start()
+            if self.ingestBridge is not None:
+                await self.ingestBridge.start()
+
+        self.logger.log(20, "Starting task processing loops...")
+        self.pipeline_tasks = [
+            asyncio.create_task(self.supervise("process_tasks", self.process_tasks)),
+            asyncio.create_task(self.supervise("flood_digest", self.digests.run)),
+            asyncio.create_task(self.supervise(
+                "config_watch", lambda: self.registry.watch(self.get_channel, self.config.get("configReloadSeconds", 5)),
+            )),
         ]
-        await self.send_embeds(channel, embeds)
 
-    async def process_activity_change(self, data):
-        channel = self.get_channel_config("activity-change")
-        if not channel or not self.config.get("displayActivityChanges", True):
+    async def supervise(self, name, factory):
+        # restarts a long-running task whenever it crashes, backing off while it keeps failing right away
+        failures = 0
+        while True:
+            started = time.monotonic()
+            try:
+                await factory()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                TASK_RESTARTS.inc(name)
+                failures = 1 if time.monotonic() - started > 60 else failures + 1
+                delay = min(30.0, 0.5 * 2 ** (failures - 1))
+                self.logger.log(40, f"Task '{name}' crashed ({type(e).__name__}: {e}); restarting in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    def setup_routes(self):
+        # the ingestion server shares the bot's event loop, so accepted batches go straight onto the queue
+        port = self.config.get("ingestPort", 5002)
+        self.ingestBridge = None
+        workers = self.config.get("ingestWorkers", 0)
+        if workers:
+            # worker processes take over the ingestion port; this server only keeps the status pages, on a port of its own
+            self.ingestBridge = IngestBridge(
+                self.enqueue_event,
+                self.config.get("ingestSocketPath", "data/ingest.sock"),
+                workers,
+                self.registry.config_path,
+                logger=self.logger,
+            )
+            port = self.config.get("ingestAdminPort", port + 1)
+        self.ingestServer = IngestServer(
+            self.enqueue_event,
+            self.registry.routes if not workers else {},
+            host=self.config.get("ingestHost", "127.0.0.1"),
+            port=port,
+            max_body=self.config.get("ingestMaxBodyBytes", 8 * 1024 * 1024),
+            keepalive_timeout=self.config.get("ingestKeepAliveSeconds", 75),
+            logger=self.logger,
+            decode=self.registry.decode,
+        )
+        self.ingestServer.add_json_route("/queues", self.task_queue.stats)
+        self.ingestServer.add_text_route("/metrics", metrics.render, content_type="text/plain; version=0.0.4")
+
+    def register_metrics(self):
+        # registered from setup_hook so only the running instance feeds the scrape callbacks
+        metrics.callback(
+            "stableintel_queue_depth", "Events waiting in task_queue per event type.",
+            lambda: {t: lane["depth"] for t, lane in self.task_queue.stats().items()}, ("event_type",),
+        )
+        metrics.callback(
+            "stableintel_queue_dropped_total", "Events dropped by overflow policy or purge per event type.",
+            lambda: {t: lane["dropped"] for t, lane in self.task_queue.stats().items()}, ("event_type",), kind="counter",
+        )
+        metrics.callback(
+            "stableintel_queue_rejected_total", "Events rejected with 429 per event type.",
+            lambda: {t: lane["rejected"] for t, lane in self.task_queue.stats().items()}, ("event_type",), kind="counter",
+        )
+        metrics.callback(
+            "stableintel_queue_oldest_wait_seconds", "Age of the oldest queued batch per event type.",
+            lambda: {t: lane["oldestWaitSeconds"] for t, lane in self.task_queue.stats().items()}, ("event_type",),
+        )
+        metrics.callback(
+            "stableintel_queue_aged_total", "Batches served early by the starvation guard per event type.",
+            lambda: {t: lane["aged"] for t, lane in self.task_queue.stats().items()}, ("event_type",), kind="counter",
+        )
+        metrics.callback(
+            "stableintel_slo_met_total", "Batches delivered within their type's sloSeconds.",
+            lambda: {t: lane["sloMet"] for t, lane in self.task_queue.stats().items()}, ("event_type",), kind="counter",
+        )
+        metrics.callback(
+            "stableintel_slo_missed_total", "Batches delivered later than their type's sloSeconds.",
+            lambda: {t: lane["sloMissed"] for t, lane in self.task_queue.stats().items()}, ("event_type",), kind="counter",
+        )
+        metrics.callback(
+            "stableintel_digest_active", "1 while an event type is posted as digests.",
+            lambda: {t: 1 for t in self.digests.active}, ("event_type",),
+        )
+        metrics.callback(
+            "stableintel_channel_backlog", "Messages waiting in each channel's delivery worker.",
+            self.dispatcher.depth, ("channel",),
+        )
+        rate_limit_handler = RateLimitCounter(logging.WARNING)
+        logging.getLogger("discord.http").addHandler(rate_limit_handler)
+
+    async def enqueue_event(self, event_type, data, received_at=None, payload=None):
+        # raises QueueFull when the type's lane is full and set to reject, which the route turns into a 429;
+        # returns the batch's trace id, which the route hands back to the producer
+        self.task_queue.check_capacity(event_type, len(data))
+        trace = self.tracer.start(event_type, received_at)
+        spool_id = await self.spool.append(event_type, data, payload)
+        trace.mark("enqueued")
+        try:
+            batch = self.task_queue.put_nowait(event_type, data, spool_id, trace)
+        except QueueFull:
+            self.spool.mark_delivered(spool_id)
+            raise
+        if batch is None:
+            self.spool.mark_delivered(spool_id)
+        return trace.trace_id
+
+    async def replay_spool(self):
+        # re-queues batches that were accepted but not delivered before the last shutdown or crash
+        replayed = 0
+        for spool_id, event_type, data in await self.spool.replay():
+            try:
+                batch = self.task_queue.put_nowait(event_type, data, spool_id, self.tracer.start(event_type))
+            except QueueFull:
+                self.logger.warning(f"Queue for '{event_type}' is full; spooled batch {spool_id} kept for the next start")
+                continue
+            if batch is None:
+                self.spool.mark_delivered(spool_id)
+            replayed += 1
+        if replayed:
+            self.logger.log(20, f"Replayed {replayed} undelivered batch(es) from the event spool")
+
+    def on_batches_dropped(self, event_type, batches):
+        # dropped or purged batches are intentionally discarded, so they must not come back on replay;
+        # only their own ids, since spooled batches a full replay skipped sit between them
+        for batch in batches:
+            self.acknowledge(batch)
+
+    def acknowledge(self, batch):
+        self.spool.mark_delivered(batch.spool_id)
+        for spool_id in batch.absorbed:
+            self.spool.mark_delivered(spool_id)
+
+    def track_delivery(self, batch, delivery):
+        # acknowledges the spooled batch once every message built from it has been sent
+        if delivery is None:
+            self.acknowledge(batch)
+            if batch.trace is not None:
+                self.tracer.finish(batch.trace)
             return
-        embeds = [
-            discord.Embed(
-                title="Activity Change",
-                description=f"{activity_data['acid']}\n Status: {activity_data['status']}",
-                color=discord.Color.green()
-            ) for activity_data in data
-        ]
-        await self.send_embeds(channel, embeds)
-    
-    async def send_embeds(self, channel, embeds):
-        async with self.lock:
-            for embed in embeds:
-                await channel.send(embed=embed)
-                await asyncio.sleep(self.throttleInterval)
-
-    def get_channel_config(self, event_type): # gets the channel for the event type
-        if event_type == "aircraft-change":
-            channel = self.get_channel(self.config["aircraftChangeLogChannel"])
-        elif event_type == "new-account":
-            channel = self.get_channel(self.config["newAccountLogChannel"])
-        elif event_type == "callsign-change":
-            channel = self.get_channel(self.config["callsignChangeLogChannel"])
-        elif event_type == "teleporation":
-            channel = self.get_channel(self.config["teleporationLogChannel"])
-        elif event_type == "activity-change":
-            channel = self.get_channel(self.config["activityChangeLogChannel"])
-        else:
+        self.inflight.add(delivery)
+
+        def on_done(future):
+            self.inflight.discard(future)
+            if not future.cancelled() and future.exception() is None and all(future.result()):
+                self.acknowledge(batch)
+                if batch.trace is not None:
+                    self.tracer.finish(batch.trace)
+                    latency = time.perf_counter() - batch.trace.received
+                    EVENT_LATENCY_SECONDS.observe(latency, batch.event_type)
+                    self.task_queue.observe_latency(batch.event_type, latency)
+            else:
+                self.logger.warning(f"Delivery of '{batch.event_type}' batch {batch.spool_id} (trace {trace_id(batch.trace)}) failed; it stays spooled for replay", extra={"trace_id": trace_id(batch.trace)})
+        delivery.add_done_callback(on_done)
+
+    async def process_tasks(self):
+        # process tasks from the queue; channels are only resolvable once the gateway is ready
+        await self.wait_until_ready()
+        while True:
+            # backpressure: while Discord is behind, batches wait in their bounded lanes, where
+            # priorities and overflow policies apply, rather than piling up in the channel workers
+            await self.dispatcher.wait_capacity()
+            batch = await self.task_queue.get()
+            QUEUE_WAIT_SECONDS.observe(time.monotonic() - batch.enqueued_at, batch.event_type)
+            self.processing = True
+            if batch.trace is not None:
+                batch.trace.mark("dequeued")
+            try:
+                delivery = await self.process_event(batch.event_type, batch.data, batch.trace)
+            except Exception as e:
+                # a batch that cannot be processed is dropped, not retried on every restart
+                BATCH_FAILURES.inc(batch.event_type)
+                self.logger.log(40, f"Discarding '{batch.event_type}' batch {batch.spool_id} (trace {trace_id(batch.trace)}): {type(e).__name__}: {e}", extra={"trace_id": trace_id(batch.trace)})
+                delivery = None
+            finally:
+                self.processing = False
+            self.track_delivery(batch, delivery)
+
+    def add_event_hook(self, event_type, hook, timed=False):
+        self.event_hooks.setdefault(event_type, []).append(hook)
+        if timed:
+            self.timed_hooks.add(hook)
+
+    def remove_event_hook(self, event_type, hook):
+        hooks = self.event_hooks.get(event_type, [])
+        if hook in hooks:
+            hooks.remove(hook)
+        self.timed_hooks.discard(hook)
+
+    async def process_event(self, event_type, data, trace=None):
+        event = self.registry.get(event_type)
+        if event is None:
             self.logger.log(40, f"Invalid event type: {event_type}")
             return None
 
-        if not channel:
-            self.logger.warning(f"Channel ID for '{event_type}' is not set in the configuration.")
+        items = [item for item in data if event.accepts(item)]
+        if len(items) != len(data):
+            self.logger.warning(f"Skipped {len(data) - len(items)} '{event_type}' item(s) missing fields {event.fields}")
+        # when the producer handed the batch over, not when it came off the queue
+        received = time.time() - (time.perf_counter() - trace.received) if trace is not None else time.time()
+        for hook in self.event_hooks.get(event_type, ()):
+            try:
+                if hook in self.timed_hooks:
+                    hook(items, received)
+                else:
+                    hook(items)
+            except Exception as e:
+                self.logger.log(40, f"Event hook {getattr(hook, '__qualname__', hook)} failed for '{event_type}': {e}")
+
+        # hooks see every item; what gets displayed is coalesced per account
+        count = len(items)
+        items = event.coalesce(items)
+        if len(items) != count:
+            EVENTS_COALESCED.inc(event_type, amount=count - len(items))
+
+        channel = self.get_channel_config(event) if event.enabled else None
+        targets = self.subscriptions.match(event_type, items)
+        flooding = self.digests.observe(event_type, count)
+        if not channel and not targets:
             return None
-        return channel
+
+        if flooding:
+            # nothing is rendered; the items wait for the interval's digest, which acknowledges the batch once posted
+            if trace is not None:
+                trace.mark("rendered")
+            delivery = self.digests.add(event, channel, items, track=True) if channel else None
+            for channel_id, indexes in targets.items():
+                subscriber = self.get_channel(channel_id)
+                if subscriber is not None and subscriber is not channel:
+                    self.digests.add(event, subscriber, items if indexes is None else [items[i] for i in indexes])
+            return delivery
+
+        # every item is rendered once, and each distinct selection of items is packed once and shared
+        embeds = [event.render(item) for item in items]
+        shared = len(targets) + bool(channel) > 1
+        packed = {}
+
+        def messages_for(indexes):
+            key = None if indexes is None or len(indexes) == len(items) else tuple(indexes)
+            if key not in packed:
+                packed[key] = self.prepare_messages(embeds if key is None else [embeds[i] for i in key], shared)
+            return packed[key]
+
+        delivery = None
+        if channel:
+            messages = messages_for(None)
+            if trace is not None:
+                trace.mark("rendered")
+            # only the primary channel's sends are traced; subscriber copies would skew the send stage
+            delivery = self.submit_messages(channel, messages, trace)
+        for channel_id, indexes in targets.items():
+            subscriber = self.get_channel(channel_id)
+            if subscriber is None or subscriber is channel:
+                continue
+            # subscriber channels are best effort: a broken one must not keep the batch spooled for everyone
+            self.submit_messages(subscriber, messages_for(indexes))
+        return delivery
+
+    def prepare_messages(self, embeds, shared=False):
+        # large batches are folded into multi-line embeds, then packed up to 10 per message
+        if len(embeds) >= self.config.get("compactEmbedThreshold", 30):
+            embeds = compact_embeds(embeds, self.config.get("compactEmbedChars", 1900))
+        messages = pack_embeds(embeds)
+        if shared:
+            # the payload of an embed going to several channels is serialized once
+            messages = [[FrozenEmbed.freeze(embed) for embed in message] for message in messages]
+        return messages
+
+    def submit_messages(self, channel, messages, trace=None):
+        # hands the messages to the channel's worker; the returned future resolves once all are delivered
+        return asyncio.gather(*(self.dispatcher.submit(channel, trace, embeds=message_embeds) for message_embeds in messages))
+
+    def send_embeds(self, channel, embeds):
+        return self.submit_messages(channel, self.prepare_messages(embeds))
+
+    def get_channel_config(self, event): # gets the channel for the event type
+        if event.channel is None and event.channel_id:
+            event.channel = self.get_channel(event.channel_id)
+        if not event.channel:
+            self.logger.warning(f"Channel ID for '{event.name}' is not set in the configuration.")
+            return None
+        return event.channel
         
     async def _load_extensions(self) -> None:
-        for extension in ("chatLogging",):
+        for extension in ("chatLogging", "accountLookup", "geofenceAlerts", "subscriptions"):
             await self.load_extension(f"cogs.{extension}")
 
 bot = StableIntelBot(BOT_TOKEN)
@@ -247,8 +567,48 @@ async def ping(interaction: discord.Interaction):
     embed = discord.Embed(title="Pong!", description=f"Latency: {delay}ms", color=discord.Color.green())
     await interaction.response.send_message(embed=embed)
 
+def format_latency(seconds):
+    return f"{seconds * 1000:.0f}ms" if seconds >= 0.01 else f"{seconds * 1000:.1f}ms"
+
+@bot.tree.command(name="stats", description="Show pipeline latency percentiles and backlog.")
+@app_commands.default_permissions(administrator=True)
+@app_commands.checks.has_permissions(administrator=True)
+async def stats(interaction: discord.Interaction):
+    embed = discord.Embed(title="Pipeline Stats", color=discord.Color.green())
+    for stage, p in bot.tracer.summary().items():
+        embed.add_field(
+            name=stage,
+            value=f"p50 {format_latency(p['p50'])} · p90 {format_latency(p['p90'])}\n"
+                  f"p99 {format_latency(p['p99'])} · max {format_latency(p['max'])}\n{p['n']} samples",
+            inline=True,
+        )
+        if len(embed.fields) == 23:
+            break
+    slo = [
+        f"{event_type}: {lane['sloMet'] / (lane['sloMet'] + lane['sloMissed']):.1%} within {lane['sloSeconds']:g}s"
+        for event_type, lane in bot.task_queue.stats().items() if lane["sloMet"] + lane["sloMissed"]
+    ]
+    if slo:
+        embed.add_field(name="SLO", value="\n".join(slo)[:1024], inline=False)
+    slowest = [
+        f"`{trace.trace_id}` {trace.event_type}: {format_latency(total)}"
+        for trace, total in bot.tracer.slowest(5)
+    ]
+    if slowest:
+        # trace ids match the X-Trace-Id the producer got back and the ids in delivery logs
+        embed.add_field(name="Slowest recent batches", value="\n".join(slowest)[:1024], inline=False)
+    backlog = sum(bot.dispatcher.depth().values())
+    embed.add_field(name="Backlog", value=f"{bot.task_queue.qsize()} queued event(s), {backlog} message(s) waiting", inline=False)
+    if not bot.tracer.samples:
+        embed.description = "No batches traced yet."
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
 def main():
-    bot.run(BOT_TOKEN)
+    # discord.py's own handler is skipped so its records go through the queued root handler too
+    try:
+        bot.run(BOT_TOKEN, log_handler=None)
+    finally:
+        stop_logging()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,87 @@
+import discord
+from discord import app_commands
+from discord.ext import tasks, commands
+import asyncio
+import logging
+import time
+from bot import StableIntelBot
+from tools.accountIndex import AccountIndex
+
+
+class AccountLookup(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.config = bot.config
+        self.log = logging.getLogger("eventhorizon.accounts")
+        self.snapshotPath = self.config.get("accountIndexPath", "data/accounts.idx")
+        self.index = AccountIndex()
+
+    async def cog_load(self):
+        # loads the last snapshot off the event loop, then starts feeding the index from live events
+        t0 = time.perf_counter()
+        try:
+            self.index = await asyncio.to_thread(AccountIndex.load_snapshot, self.snapshotPath)
+        except Exception as e:
+            self.log.error("Could not load account index snapshot %s: %s", self.snapshotPath, e)
+        self.log.info("Account index ready: %d accounts in %.2fs", len(self.index), time.perf_counter() - t0)
+
+        self.bot.add_event_hook("new-account", self.index.on_new_account)
+        self.bot.add_event_hook("callsign-change", self.index.on_callsign_change)
+        self.bot.add_event_hook("aircraft-change", self.index.on_aircraft_change)
+        self.snapshotLoop.change_interval(seconds=self.config.get("accountIndexSnapshotSeconds", 300))
+        self.snapshotLoop.start()
+
+    async def cog_unload(self):
+        self.bot.remove_event_hook("new-account", self.index.on_new_account)
+        self.bot.remove_event_hook("callsign-change", self.index.on_callsign_change)
+        self.bot.remove_event_hook("aircraft-change", self.index.on_aircraft_change)
+        self.snapshotLoop.cancel()
+        await self.snapshot()
+
+    async def snapshot(self):
+        if not self.index.dirty:
+            return
+        t0 = time.perf_counter()
+        generation, state = await self.index.snapshot_state()
+        await asyncio.to_thread(AccountIndex.write_snapshot, self.snapshotPath, state)
+        # only now is it on disk; a failed write leaves the index dirty for the next loop
+        self.index.mark_saved(generation)
+        self.log.info("Account index snapshot written (%d accounts) in %.2fs", len(self.index), time.perf_counter() - t0)
+
+    @tasks.loop(seconds=300)
+    async def snapshotLoop(self):
+        try:
+            await self.snapshot()
+        except Exception as e:
+            self.log.error("Account index snapshot failed: %s", e)
+
+    @app_commands.command(name="lookup", description="Look up an account ID or callsign history.")
+    async def lookup(self, interaction: discord.Interaction, query: str):
+        t0 = time.perf_counter()
+        result = self.index.lookup(query)
+        elapsed_us = (time.perf_counter() - t0) * 1e6
+
+        if result is None:
+            embed = discord.Embed(title="Not Found", description=f"No account or callsign matching `{query}`.", color=discord.Color.red())
+        elif result["kind"] == "acid":
+            history = result["callsigns"]
+            embed = discord.Embed(title=f"Account {result['acid']}", color=discord.Color.green())
+            embed.add_field(name="Current Callsign", value=history[-1], inline=True)
+            embed.add_field(name="Aircraft", value=result["aircraft"] or "Unknown", inline=True)
+            shown = history[-20:]
+            more = f"\n…and {len(history) - len(shown)} earlier" if len(history) > len(shown) else ""
+            embed.add_field(name=f"Callsign History ({len(history)})", value="\n".join(reversed(shown)) + more, inline=False)
+        else:
+            accounts = result["accounts"]
+            embed = discord.Embed(title=f"Callsign {result['callsign']}", color=discord.Color.green())
+            embed.add_field(name="Aircraft", value=result["aircraft"] or "Unknown", inline=True)
+            shown = accounts[-20:]
+            lines = [f"{acid} (now {current})" for acid, current in reversed(shown)]
+            more = f"\n…and {len(accounts) - len(shown)} earlier" if len(accounts) > len(shown) else ""
+            embed.add_field(name=f"Used By ({len(accounts)})", value=("\n".join(lines) or "Unknown") + more, inline=False)
+        embed.set_footer(text=f"Lookup took {elapsed_us:.0f}µs")
+        await interaction.response.send_message(embed=embed)
+
+
+async def setup(bot: StableIntelBot):
+    await bot.add_cog(AccountLookup(bot))
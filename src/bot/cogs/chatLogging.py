@@ -6,8 +6,15 @@ from dotenv import load_dotenv
 import asyncio
 import logging, time, asyncio
 from bot import StableIntelBot
-from tools.multiplayerAPI import MultiplayerAPI
-import json
+from tools.multiplayerAPI import AsyncMultiplayerAPI
+from tools.http_client import close_async_session, latency_summary
+from tools.pollScheduler import AdaptivePollScheduler
+from tools.embedPacker import chunk_lines
+from tools.metrics import metrics
+from tools.chatArchive import ChatArchive
+from tools.chatOutbox import ChatOutbox, OutboxFull
+
+GETMESSAGES_SECONDS = metrics.histogram("stableintel_geofs_getmessages_seconds", "getMessages round-trip time by outcome.", ("outcome",))
 
 class ChatLogging(commands.Cog):
     def __init__(self, bot):
@@ -19,34 +26,75 @@ class ChatLogging(commands.Cog):
         self._last_msgid = None
         self._last_msgid_change_ts = time.time()
         self._tick_seq = 0
+        self._session_task = None
         self.log = logging.getLogger("eventhorizon.chat")
 
         # Initialize multiplayer session and configs
         load_dotenv()
         SESSION_ID = os.getenv('GEOFS_SESSION_ID')
         ACCOUNT_ID = os.getenv('GEOFS_ACCOUNT_ID')
-        self.multiplayerAPI = MultiplayerAPI(SESSION_ID, ACCOUNT_ID)
-        self.config = self.load_config("src/bot/config.json")
+        self.multiplayerAPI = AsyncMultiplayerAPI(SESSION_ID, ACCOUNT_ID)
+        # shared with the bot; values read per tick follow config.json reloads, the scheduler and outbox settings are read once here
+        self.config = bot.config
+        self.pollScheduler = AdaptivePollScheduler(
+            min_interval=self.config.get("chatPollMinSeconds", 1),
+            base_interval=self.config.get("chatPollBaseSeconds", 5),
+            idle_interval=self.config.get("chatPollIdleSeconds", 15),
+            max_interval=self.config.get("chatPollMaxSeconds", 60),
+            busy_messages=self.config.get("chatPollBusyMessages", 5),
+        )
+        self.archive = ChatArchive(
+            self.config.get("chatArchivePath", "data/chat.sqlite3"),
+            logger=self.log,
+            dedupe_window=self.config.get("chatArchiveDedupeSeconds", 10),
+        )
+        # /chat send-msg messages, posted by the poll loop's own /update requests
+        self.outbox = ChatOutbox(
+            min_interval=self.config.get("chatSendIntervalSeconds", 3),
+            max_attempts=self.config.get("chatSendMaxAttempts", 3),
+            max_age=self.config.get("chatSendMaxAgeSeconds", 600),
+            max_size=self.config.get("chatOutboxSize", 20),
+        )
 
-    def load_config(self, config_path):
-        with open(config_path, "r") as f:
-            return json.load(f)
-    
     async def cog_load(self):
+        metrics.callback(
+            "stableintel_chat_state", "ChatLogging loop state (drop_count, failures, lastMsgId).",
+            lambda: {
+                "drop_count": self._drop_count,
+                "failures": self._failures,
+                "last_msg_id": self.multiplayerAPI.lastMsgID or 0,
+                "outbox": len(self.outbox),
+            },
+            ("stat",),
+        )
+        await self.archive.start()
         if self.config["displayChat"]:
-            import asyncio
-            try:
+            # the handshake retries until GeoFS answers, so it must not hold up Discord or ingestion
+            self._session_task = asyncio.create_task(self.start_session())
+
+    async def start_session(self):
+        try:
+            with self.bot.boot_phase("geofs_handshake"):
                 # gets geofs ID through handshake
-                await asyncio.to_thread(self.multiplayerAPI.handshake)
-            except Exception as e:
-                self.log.error("Handshake failed at startup: %s", e)
-                return
-            # seeds the no-progress watchdog from current state
-            # and starts session
-            self._last_msgid = getattr(self.multiplayerAPI, "lastMsgID", None)
-            self._last_msgid_change_ts = time.time()
-            self.printMessages.start()
-            self.chatHeartbeat.start()
+                await self.multiplayerAPI.handshake()
+        except Exception as e:
+            self.log.error("Handshake failed at startup: %s", e)
+            return
+        # seeds the no-progress watchdog from current state
+        # and starts session
+        self._last_msgid = getattr(self.multiplayerAPI, "lastMsgID", None)
+        self._last_msgid_change_ts = time.time()
+        self.printMessages.start()
+        self.chatHeartbeat.start()
+
+    async def cog_unload(self):
+        if self._session_task is not None:
+            self._session_task.cancel()
+        self.printMessages.cancel()
+        self.chatHeartbeat.cancel()
+        self.outbox.close()
+        await close_async_session()
+        await self.archive.close()
     
     chat_group = app_commands.Group(name="chat", description="GeoFS chat discord bridge (Historical BiFrost module)")
 
@@ -75,17 +123,35 @@ class ChatLogging(commands.Cog):
             self.log.debug("[tick %d] skipped (busy). drop_count=%d", tick_id, self._drop_count)
             return
         self._busy = True
+        # at most one queued /chat send-msg message rides along on this poll
+        outgoing = self.outbox.take()
         
         try:
             try:
                 # logs information on most recent multiplayer request
                 t0 = time.time()
-                messages = await asyncio.wait_for(
-                    asyncio.to_thread(self.multiplayerAPI.getMessages), timeout=20
-                )
+                messages = None
+                if outgoing is not None:
+                    # exactly one POST carries the text; it counts as one attempt whatever happens
+                    messages, refused = await asyncio.wait_for(self.multiplayerAPI.pollWithMessage(outgoing.text), timeout=20)
+                    if messages is not None:
+                        self.outbox.sent(outgoing)
+                    elif refused:
+                        # GeoFS never acted on it, so a later poll can safely carry it again
+                        self.outbox.failed(outgoing)
+                    else:
+                        self.outbox.unconfirmed(outgoing)
+                    outgoing = None
+                if messages is None:
+                    # the retry is an ordinary poll; the message waits in the outbox for a later one
+                    messages = await asyncio.wait_for(self.multiplayerAPI.getMessages(), timeout=20)
                 dt = time.time() - t0
+                GETMESSAGES_SECONDS.observe(dt, "ok")
+                self.bot.tracer.record("chat poll", dt)
                 self.log.debug("[tick %d] getMessages ok in %.2fs; msgs=%d", tick_id, dt, len(messages))
                 self._failures = 0
+                self.pollScheduler.on_success(len(messages), getattr(self.multiplayerAPI, "lastMsgID", None))
+                self.archive.add(messages, time.time())
 
                 self._last_success_ts = time.time()
                 
@@ -100,7 +166,7 @@ class ChatLogging(commands.Cog):
                     if self._last_msgid_change_ts and (now - self._last_msgid_change_ts) > 600:
                         self.log.warning("[tick %d] No chat progress for 10m (lastMsgId=%s). Forcing re-handshake.", tick_id, curr)
                         try:
-                            await asyncio.to_thread(self.multiplayerAPI.handshake)
+                            await self.multiplayerAPI.handshake()
                             # after successful handshake, refreshes markers
                             self._last_msgid = getattr(self.multiplayerAPI, "lastMsgID", curr)
                             self._last_msgid_change_ts = time.time()
@@ -110,29 +176,43 @@ class ChatLogging(commands.Cog):
                             self.log.error("[tick %d] Re-handshake after no-progress FAILED: %s", tick_id, e)
 
             except asyncio.TimeoutError:
+                GETMESSAGES_SECONDS.observe(time.time() - t0, "timeout")
                 # another opportunity for rehandshake
                 self._failures = getattr(self, "_failures", 0) + 1
                 self.log.warning("[tick %d] getMessages TIMEOUT (failures=%d)", tick_id, self._failures)
+                self.pollScheduler.on_failure()
                 if self._failures >= 3:
                     try:
-                        await asyncio.to_thread(self.multiplayerAPI.handshake)
+                        await self.multiplayerAPI.handshake()
                         self._failures = 0
                         self.log.info("[tick %d] re-handshake succeeded", tick_id)
                     except Exception as e:
                         self.log.error("[tick %d] re-handshake failed: %s", tick_id, e)
                 messages = []
             
-            # builds message string for discord
-            discord_message = ""
-            for msg in messages:
-                discord_message += f"({msg.get('acid', '?')}) | {msg.get('cs','?')}: {msg.get('msg','')}\n"
-            if discord_message != "":
-                await chat_channel.send(discord_message, allowed_mentions=AllowedMentions.none())
+            # builds message strings for discord, split to stay under the 2000 character limit
+            lines = [f"({msg.get('acid', '?')}) | {msg.get('cs','?')}: {msg.get('msg','')}\n" for msg in messages]
+            if lines:
+                t_send = time.time()
+                for discord_message in chunk_lines(lines):
+                    await chat_channel.send(discord_message, allowed_mentions=AllowedMentions.none())
+                self.bot.tracer.record("chat send", time.time() - t_send)
+            # a full cycle is the poll plus relaying what it returned, the chat counterpart of a batch's total
+            self.bot.tracer.record("chat cycle", time.time() - t_tick)
         except Exception as e:
             self.log.exception("[tick %d] printMessages error: %s", tick_id, e)
         finally:
             self._busy = False
-            self.log.debug("[tick %d] end elapsed=%.2fs", tick_id, time.time() - t_tick)
+            if outgoing is not None:
+                # timed out or errored mid-request: it may be in the chat already, so it is never sent again
+                self.outbox.unconfirmed(outgoing)
+            # adaptive scheduling: the next tick fires after whatever delay the scheduler settled on,
+            # sooner while messages are waiting to be sent
+            interval = self.pollScheduler.interval
+            if self.outbox:
+                interval = min(interval, self.outbox.min_interval)
+            self.printMessages.change_interval(seconds=interval)
+            self.log.debug("[tick %d] end elapsed=%.2fs next=%.1fs", tick_id, time.time() - t_tick, self.pollScheduler.interval)
             # If skipped ticks while busy, send a single summary notice now.
             if self._drop_count:
                 try:
@@ -160,6 +240,15 @@ class ChatLogging(commands.Cog):
             getattr(self.multiplayerAPI, "myID", None),
             getattr(self.multiplayerAPI, "lastMsgID", None)
         )
+        # keep-alive effectiveness of the GeoFS connection pool
+        stats = latency_summary()
+        self.log.info(
+            "[hb] http requests=%d new_conn=%d reused=%d stale_retries=%d avg_new=%sms avg_reused=%sms handshake_saved=%.1fs",
+            stats["requests"], stats["new_connections"], stats["reused_connections"], stats["stale_retries"],
+            f"{stats['avg_new_conn_request_ms']:.0f}" if stats["avg_new_conn_request_ms"] is not None else "-",
+            f"{stats['avg_reused_conn_request_ms']:.0f}" if stats["avg_reused_conn_request_ms"] is not None else "-",
+            stats["handshake_seconds_saved"],
+        )
 
     @chat_group.command(name="send-msg", description="Send a message to GeoFS Chat")
     async def send_msg(self, interaction: discord.Interaction, msg: str):
@@ -175,23 +264,80 @@ class ChatLogging(commands.Cog):
             await interaction.response.send_message(embed=embed)
             return
         
+        # the message goes out with one of the next chat polls, so that loop must be running
+        if not self.printMessages.is_running():
+            await interaction.response.send_message(
+                embed=discord.Embed(title="Error", description="The GeoFS chat session is not running.", color=discord.Color.red())
+            )
+            return
+        try:
+            delivered = self.outbox.submit(msg)
+        except OutboxFull:
+            await interaction.response.send_message(
+                embed=discord.Embed(title="Error", description="Too many messages are waiting to be sent; try again shortly.", color=discord.Color.red())
+            )
+            return
+
+        # answered right away; the same response is edited once GeoFS has the message or it was given up on
+        await interaction.response.send_message(
+            embed=discord.Embed(title="Queued", description=f"Position {len(self.outbox)} in the chat queue.", color=discord.Color.blurple())
+        )
+        result = await delivered
+        if result:
+            embed = discord.Embed(title="Success", description="Sent", color=discord.Color.green())
+        elif result is None:
+            embed = discord.Embed(title="Unconfirmed", description="GeoFS did not answer; the message may or may not have been posted, and was not sent again.", color=discord.Color.orange())
+        else:
+            embed = discord.Embed(title="Failed", description="GeoFS did not accept the message; it was not sent.", color=discord.Color.red())
         try:
-            await asyncio.to_thread(self.multiplayerAPI.sendMsg, msg)
+            await interaction.edit_original_response(embed=embed)
+        except discord.HTTPException as e:
+            self.log.warning("Could not report chat delivery status: %s", e)
+
+    @chat_group.command(name="search", description="Search archived GeoFS chat")
+    @app_commands.describe(
+        query="Words to search for (the last word also matches as a prefix)",
+        acid="Only messages from this account ID",
+        callsign="Only messages sent under this callsign",
+        page="Result page, newest first",
+    )
+    async def search(
+        self,
+        interaction: discord.Interaction,
+        query: str = "",
+        acid: str | None = None,
+        callsign: str | None = None,
+        page: app_commands.Range[int, 1, 1000] = 1,
+    ):
+        if not (query.strip() or acid or callsign):
+            await interaction.response.send_message(
+                embed=discord.Embed(title="Error", description="Give a query, an acid or a callsign.", color=discord.Color.red()),
+                ephemeral=True,
+            )
+            return
+
+        t0 = time.perf_counter()
+        try:
+            rows, has_more = await self.archive.search(query.strip(), acid, callsign, page=page)
         except Exception as e:
             await interaction.response.send_message(
-                embed=discord.Embed(
-                    title="Error",
-                    description=str(e),
-                    color=discord.Color.red()
-                )
+                embed=discord.Embed(title="Error", description=str(e), color=discord.Color.red()),
+                ephemeral=True,
             )
             return
+        elapsed = time.perf_counter() - t0
+
+        lines = [
+            f"<t:{int(ts)}:f> ({msg_acid}) **{discord.utils.escape_markdown(cs)}**: {discord.utils.escape_markdown(msg)[:300]}"
+            for _, msg_acid, cs, msg, ts in rows
+        ]
         embed = discord.Embed(
-            title="Success",
-            description="Sent",
-            color=discord.Color.green()
+            title="Chat Search",
+            description="\n".join(lines)[:4000] if lines else "No matching messages.",
+            color=discord.Color.green(),
         )
-        await interaction.response.send_message(embed=embed)
+        embed.set_footer(text=f"Page {page}{' • more results on the next page' if has_more else ''} • {elapsed * 1000:.0f}ms")
+        await interaction.response.send_message(embed=embed, allowed_mentions=AllowedMentions.none())
 
 async def setup(bot: StableIntelBot):
     await bot.add_cog(ChatLogging(bot))
\ No newline at end of file
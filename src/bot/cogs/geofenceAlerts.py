@@ -0,0 +1,112 @@
+import discord
+from discord.ext import commands
+import asyncio
+import logging
+import time
+from bot import StableIntelBot
+from tools.geofence import GeofenceEngine
+from tools.metrics import metrics
+
+GEOFENCE_SECONDS = metrics.histogram("stableintel_geofence_check_seconds", "Time to check one coalesced batch of teleport events.")
+GEOFENCE_ALERTS = metrics.counter("stableintel_geofence_alerts_total", "Geofence alerts raised by kind.", ("kind",))
+
+
+class GeofenceAlerts(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.config = bot.config
+        self.log = logging.getLogger("eventhorizon.geofence")
+        self.engine = None
+        self._engine_config = None
+        self._pending = []
+        # unix time each pending teleport was received, for the speed check
+        self._times = []
+        self._wake = asyncio.Event()
+        self._worker = None
+        self.checked = 0
+
+    async def cog_load(self):
+        self._build_engine()
+        self.bot.add_event_hook("teleporation", self.on_teleport, timed=True)
+        self._worker = asyncio.create_task(self.run())
+
+    async def cog_unload(self):
+        self.bot.remove_event_hook("teleporation", self.on_teleport)
+        if self._worker is not None:
+            self._worker.cancel()
+
+    def _build_engine(self):
+        settings = self.config.get("geofence", {})
+        if settings == self._engine_config:
+            return
+        engine = GeofenceEngine(
+            settings.get("zones", []),
+            max_jump_km=settings.get("maxJumpKm", 15000),
+            max_speed_kmh=settings.get("maxSpeedKmh", 4000),
+            min_speed_check_km=settings.get("minSpeedCheckKm", 50),
+            cell_deg=settings.get("cellDegrees", 1.0),
+        )
+        # last known positions survive a config reload
+        if self.engine is not None:
+            engine.last_seen = self.engine.last_seen
+        self.engine = engine
+        self._engine_config = settings
+        self.log.info("Geofence engine ready with %d zone(s)", len(engine.zones))
+
+    def on_teleport(self, items, received):
+        # runs inside process_event, so it only buffers; the check itself happens off the event loop
+        if items:
+            self._pending.extend(items)
+            self._times.extend([received] * len(items))
+            self._wake.set()
+
+    async def run(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            # everything that arrived while the previous check ran is checked as one array batch
+            items, self._pending = self._pending, []
+            times, self._times = self._times, []
+            try:
+                self._build_engine()
+            except Exception as e:
+                self.log.error("Invalid geofence config, keeping the previous zones: %s", e)
+                self._engine_config = self.config.get("geofence", {})
+            t0 = time.perf_counter()
+            try:
+                alerts = await asyncio.to_thread(self.engine.check, items, None, times)
+            except Exception as e:
+                self.log.error("Geofence check of %d teleport(s) failed: %s", len(items), e)
+                continue
+            GEOFENCE_SECONDS.observe(time.perf_counter() - t0)
+            self.checked += len(items)
+            if alerts:
+                self.send_alerts(alerts)
+
+    def send_alerts(self, alerts):
+        for alert in alerts:
+            GEOFENCE_ALERTS.inc(alert["kind"])
+        channel_id = self.config.get("geofence", {}).get("alertChannel")
+        channel = self.bot.get_channel(channel_id) if channel_id else None
+        if channel is None:
+            self.log.warning("%d geofence alert(s) raised but geofence.alertChannel is not set or not visible", len(alerts))
+            return
+        self.bot.send_embeds(channel, [self.render(alert) for alert in alerts])
+
+    @staticmethod
+    def render(alert) -> discord.Embed:
+        position = f"{alert['lat']:.4f}, {alert['lon']:.4f}"
+        if alert["kind"] == "entry":
+            title = "Restricted Zone Entry"
+            description = f"{alert['acid']}\n Zone: {alert['zone']}\n Position: {position}\n Jump: {alert['distance']:.0f} km"
+        elif alert["kind"] == "speed":
+            title = "Impossible Speed"
+            description = f"{alert['acid']}\n Position: {position}\n Moved: {alert['distance']:.0f} km at {alert['speed']:.0f} km/h"
+        else:
+            title = "Impossible Jump"
+            description = f"{alert['acid']}\n Position: {position}\n Distance: {alert['distance']:.0f} km"
+        return discord.Embed(title=title, description=description, color=discord.Color.red())
+
+
+async def setup(bot: StableIntelBot):
+    await bot.add_cog(GeofenceAlerts(bot))
@@ -0,0 +1,94 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+import asyncio
+import logging
+from bot import StableIntelBot
+
+
+def split_values(text: str | None) -> list[str]:
+    return [value.strip() for value in (text or "").split(",") if value.strip()]
+
+
+class Subscriptions(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.table = bot.subscriptions
+        self.log = logging.getLogger("eventhorizon.subscriptions")
+
+    async def save(self):
+        await asyncio.to_thread(self.table.save)
+
+    async def event_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [
+            app_commands.Choice(name=event.title, value=name)
+            for name, event in self.bot.registry.types.items()
+            if current.lower() in name or current.lower() in event.title.lower()
+        ][:25]
+
+    subscriptions_group = app_commands.Group(
+        name="subscriptions",
+        description="Send event logs to channels in this server.",
+        guild_only=True,
+        default_permissions=discord.Permissions(manage_guild=True),
+    )
+
+    @subscriptions_group.command(name="add", description="Subscribe a channel to an event type, optionally filtered.")
+    @app_commands.describe(
+        event="Event type to receive",
+        channel="Channel the events are posted in",
+        acids="Comma-separated account IDs to keep",
+        callsigns="Comma-separated callsigns to keep",
+        aircraft="Comma-separated aircraft names to keep",
+    )
+    @app_commands.autocomplete(event=event_autocomplete)
+    async def add(
+        self,
+        interaction: discord.Interaction,
+        event: str,
+        channel: discord.TextChannel,
+        acids: str | None = None,
+        callsigns: str | None = None,
+        aircraft: str | None = None,
+    ):
+        if self.bot.registry.get(event) is None:
+            await interaction.response.send_message(f"Unknown event type `{event}`.", ephemeral=True)
+            return
+        filters = {"acid": split_values(acids), "callsign": split_values(callsigns), "aircraft": split_values(aircraft)}
+        sub = self.table.add(interaction.guild_id, channel.id, event, filters)
+        await self.save()
+        self.log.info("Guild %s subscribed channel %s to '%s' %s", interaction.guild_id, channel.id, event, sub.to_json()["filters"])
+
+        embed = discord.Embed(title="Subscribed", description=f"{channel.mention} now receives **{event}** events.", color=discord.Color.green())
+        for kind, values in sub.filters.items():
+            embed.add_field(name=f"Only {kind}", value=", ".join(sorted(values))[:1024], inline=False)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @subscriptions_group.command(name="remove", description="Stop sending an event type to a channel.")
+    @app_commands.autocomplete(event=event_autocomplete)
+    async def remove(self, interaction: discord.Interaction, event: str, channel: discord.TextChannel):
+        sub = self.table.subscriptions.get((channel.id, event))
+        if sub is None or sub.guild_id != interaction.guild_id:
+            await interaction.response.send_message(f"{channel.mention} is not subscribed to `{event}`.", ephemeral=True)
+            return
+        self.table.remove(channel.id, event)
+        await self.save()
+        await interaction.response.send_message(f"{channel.mention} no longer receives **{event}** events.", ephemeral=True)
+
+    @subscriptions_group.command(name="list", description="Show this server's event subscriptions.")
+    async def list_subscriptions(self, interaction: discord.Interaction):
+        subs = self.table.for_guild(interaction.guild_id)
+        lines = []
+        for sub in sorted(subs, key=lambda s: (s.channel_id, s.event_type)):
+            filters = "; ".join(f"{kind}: {', '.join(sorted(values))}" for kind, values in sub.filters.items())
+            lines.append(f"<#{sub.channel_id}> **{sub.event_type}**" + (f" ({filters})" if filters else ""))
+        embed = discord.Embed(
+            title=f"Subscriptions ({len(subs)})",
+            description="\n".join(lines)[:4000] or "No channels in this server are subscribed.",
+            color=discord.Color.green(),
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+async def setup(bot: StableIntelBot):
+    await bot.add_cog(Subscriptions(bot))
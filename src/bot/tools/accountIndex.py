@@ -0,0 +1,186 @@
+import asyncio
+import os
+import pickle
+from array import array
+
+
+class AccountIndex:
+    """
+    Compact in-memory index of GeoFS accounts, callsigns and aircraft.
+
+    Every acid, callsign and aircraft name is stored once in a string table and
+    referred to by its integer id everywhere else. Per-account callsign history and
+    per-callsign account history are array('I') of those ids, so millions of accounts
+    cost a few dozen bytes each and a lookup is a couple of dict hits.
+    """
+
+    SNAPSHOT_VERSION = 1
+
+    def __init__(self):
+        self._strings: list[str] = []
+        self._ids: dict[str, int] = {}
+        # acid id -> callsign ids, oldest first
+        self.callsigns: dict[int, array] = {}
+        # callsign id -> acid ids that have used it, oldest first
+        self.accounts: dict[int, array] = {}
+        # callsign id -> aircraft id last seen flying under that callsign
+        self.aircraft: dict[int, int] = {}
+        # bumped by every change; dirty until a snapshot of the latest generation is on disk
+        self.generation = 0
+        self.saved_generation = 0
+
+    def _intern(self, value) -> int:
+        value = str(value)
+        sid = self._ids.get(value)
+        if sid is None:
+            sid = len(self._strings)
+            self._strings.append(value)
+            self._ids[value] = sid
+        return sid
+
+    @staticmethod
+    def _append_unique_last(history: array, value: int) -> None:
+        if not history or history[-1] != value:
+            history.append(value)
+
+    def record_callsign(self, acid, callsign) -> None:
+        acid_id = self._intern(acid)
+        cs_id = self._intern(callsign)
+        history = self.callsigns.get(acid_id)
+        if history is None:
+            history = self.callsigns[acid_id] = array("I")
+        self._append_unique_last(history, cs_id)
+        holders = self.accounts.get(cs_id)
+        if holders is None:
+            holders = self.accounts[cs_id] = array("I")
+        self._append_unique_last(holders, acid_id)
+        self.generation += 1
+
+    def record_aircraft(self, callsign, aircraft) -> None:
+        self.aircraft[self._intern(callsign)] = self._intern(aircraft)
+        self.generation += 1
+
+    @property
+    def dirty(self) -> bool:
+        return self.generation != self.saved_generation
+
+    # event hooks ---------------------------------------------------------
+
+    def on_new_account(self, items) -> None:
+        for item in items:
+            self.record_callsign(item["acid"], item["callsign"])
+
+    def on_callsign_change(self, items) -> None:
+        for item in items:
+            # the old callsign goes in first so history is complete even for accounts we never saw created
+            self.record_callsign(item["acid"], item["oldCallsign"])
+            self.record_callsign(item["acid"], item["newCallsign"])
+
+    def on_aircraft_change(self, items) -> None:
+        for item in items:
+            self.record_aircraft(item["callsign"], item["newAircraft"])
+
+    # queries -------------------------------------------------------------
+
+    def lookup(self, query: str) -> dict | None:
+        """Resolve query as an acid first, then as a callsign. None if neither is known."""
+        sid = self._ids.get(str(query).strip())
+        if sid is None:
+            return None
+        strings = self._strings
+        if sid in self.callsigns:
+            history = [strings[i] for i in self.callsigns[sid]]
+            current = self.callsigns[sid][-1]
+            aircraft = self.aircraft.get(current)
+            return {
+                "kind": "acid",
+                "acid": strings[sid],
+                "callsigns": history,
+                "aircraft": strings[aircraft] if aircraft is not None else None,
+            }
+        if sid in self.accounts or sid in self.aircraft:
+            holders = self.accounts.get(sid, ())
+            aircraft = self.aircraft.get(sid)
+            return {
+                "kind": "callsign",
+                "callsign": strings[sid],
+                "accounts": [(strings[a], strings[self.callsigns[a][-1]]) for a in holders],
+                "aircraft": strings[aircraft] if aircraft is not None else None,
+            }
+        return None
+
+    def __len__(self) -> int:
+        return len(self.callsigns)
+
+    # persistence ---------------------------------------------------------
+
+    async def snapshot_state(self, chunk: int = 20000) -> tuple[int, tuple]:
+        """
+        (generation, state) for write_snapshot, copied on the event loop a chunk at a time.
+
+        The history arrays are appended to in place by live events, so they are copied
+        into flat buffers here rather than pickled later from another thread. Copying
+        yields to the loop every `chunk` histories, so events keep flowing meanwhile.
+        Account histories are copied before callsign histories, and the string table and
+        aircraft last, so every id the copy refers to is also in it. Pass the generation
+        to mark_saved once the snapshot is written.
+        """
+        generation = self.generation
+        accounts = await self._flatten(self.accounts, chunk)
+        callsigns = await self._flatten(self.callsigns, chunk)
+        state = (
+            self.SNAPSHOT_VERSION,
+            list(self._strings),
+            callsigns,
+            accounts,
+            (array("I", self.aircraft.keys()), array("I", self.aircraft.values())),
+        )
+        return generation, state
+
+    def mark_saved(self, generation: int) -> None:
+        self.saved_generation = generation
+
+    @staticmethod
+    async def _flatten(histories: dict, chunk: int) -> tuple:
+        # dict of arrays -> (keys, offsets, values) so the snapshot is three flat buffers
+        keys = array("I", histories.keys())
+        offsets = array("Q", [0])
+        values = array("I")
+        for start in range(0, len(keys), chunk):
+            for key in keys[start:start + chunk]:
+                values.extend(histories[key])
+                offsets.append(len(values))
+            await asyncio.sleep(0)
+        return keys, offsets, values
+
+    @staticmethod
+    def _unflatten(keys: array, offsets: array, values: array) -> dict:
+        return {key: values[offsets[i]:offsets[i + 1]] for i, key in enumerate(keys)}
+
+    @staticmethod
+    def write_snapshot(path: str, state: tuple) -> None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load_snapshot(cls, path: str) -> "AccountIndex":
+        index = cls()
+        if not os.path.exists(path):
+            return index
+        with open(path, "rb") as f:
+            version, *state = pickle.load(f)
+        if version != cls.SNAPSHOT_VERSION:
+            return index
+        strings, callsigns, accounts, (aircraft_keys, aircraft_values) = state
+        index._strings = strings
+        index._ids = {value: sid for sid, value in enumerate(index._strings)}
+        index.callsigns = cls._unflatten(*callsigns)
+        index.accounts = cls._unflatten(*accounts)
+        index.aircraft = dict(zip(aircraft_keys, aircraft_values))
+        return index
@@ -0,0 +1,140 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+
+# LogRecord attributes that are not user supplied `extra` fields
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName", "suppressed"}
+
+_listener = None
+_queue_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, call site, extras and traceback."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "site": f"{record.module}:{record.lineno}",
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        if getattr(record, "suppressed", 0):
+            line += f" [{record.suppressed} similar suppressed]"
+        return line
+
+
+class CallSiteSampler(logging.Filter):
+    """
+    Rate limits repeated warnings and errors per call site.
+
+    Each call site (file and line) may log `burst` records per `window` seconds; the
+    rest are dropped and counted, and the next record let through carries the count.
+    INFO and DEBUG records are never sampled.
+    """
+
+    def __init__(self, burst: int = 5, window: float = 60.0, min_level: int = logging.WARNING):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.min_level = min_level
+        # (pathname, lineno) -> [window start, records in window, suppressed since last pass]
+        self.sites: dict[tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.min_level:
+            return True
+        now = record.created
+        with self._lock:
+            site = self.sites.get((record.pathname, record.lineno))
+            if site is None:
+                site = self.sites[(record.pathname, record.lineno)] = [now, 0, 0]
+            if now - site[0] >= self.window:
+                site[0] = now
+                site[1] = 0
+            if site[1] >= self.burst:
+                site[2] += 1
+                return False
+            site[1] += 1
+            record.suppressed, site[2] = site[2], 0
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    # the calling thread only renders the message (and traceback) text; formatting and I/O happen on the listener
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(fmt: str = "json", burst: int = 5, window: float = 60.0, stream=None) -> None:
+    """
+    Route every logger through a queue drained by a background thread.
+
+    Call sites only pay for a level check and a queue put; stdout writes happen on the
+    listener thread, so a slow terminal or pipe never blocks the event loop. Safe to
+    call more than once: later calls only update the format and sampling settings.
+    """
+    global _listener, _queue_handler
+    formatter = JsonFormatter() if fmt == "json" else TextFormatter()
+    if _listener is not None:
+        _listener.handlers[0].setFormatter(formatter)
+        sampler = _queue_handler.filters[0]
+        sampler.burst, sampler.window = burst, window
+        return
+
+    log_queue = queue.SimpleQueue()
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(formatter)
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+    _listener.start()
+
+    _queue_handler = _QueueHandler(log_queue)
+    _queue_handler.addFilter(CallSiteSampler(burst, window))
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(logging.INFO)
+
+
+def apply_levels(levels: dict | None) -> None:
+    """Set logger levels from a {"logger name": "LEVEL"} mapping; "" or "root" is the root logger."""
+    for name, level in (levels or {}).items():
+        logging.getLogger(None if name in ("", "root") else name).setLevel(str(level).upper())
+
+
+def stop_logging() -> None:
+    """Flush everything still queued; called once on shutdown."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        _listener = None
+        _queue_handler = None
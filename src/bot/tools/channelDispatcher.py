@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from collections import deque
+import discord
+from .metrics import metrics
+from .tracing import trace_id
+
+SEND_SECONDS = metrics.histogram("stableintel_channel_send_seconds", "channel.send latency per destination channel.", ("channel",))
+SEND_FAILURES = metrics.counter("stableintel_channel_send_failures_total", "Failed channel.send calls.", ("channel",))
+SEND_RATE_LIMITED = metrics.counter("stableintel_channel_send_429_total", "channel.send calls that surfaced a 429.", ("channel",))
+WEBHOOK_FALLBACKS = metrics.counter("stableintel_webhook_fallbacks_total", "Webhooks found deleted; delivery fell back to the bot.", ("channel",))
+
+
+class ChannelWorker:
+    """
+    Delivers messages to a single channel, in order, with its own pacing.
+
+    A single task sends everything and awaits each send before starting the next, so
+    messages reach the channel in the order they were submitted; a channel's throughput
+    is therefore bounded by one send round trip at a time. Through the bot it sleeps
+    `interval` between sends. Once webhooks are attached it rotates through them with
+    no pause instead: each webhook has its own rate-limit bucket, so rotating lets more
+    sends go out per rate-limit window before any of them has to wait, but it does not
+    overlap sends. A webhook found deleted is dropped and the message goes through the
+    next one, or the bot once none are left.
+    """
+
+    def __init__(self, channel, interval: float, logger: logging.Logger):
+        self.channel = channel
+        self.interval = interval
+        self.log = logger
+        self.queue = asyncio.Queue()
+        self.sent = 0
+        self.failed = 0
+        self.webhooks: deque = deque()
+        # looks up the channel's webhooks; kept so it is not garbage collected, cancelled with the worker
+        self.attach_task = None
+        self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while True:
+            kwargs, future, trace = await self.queue.get()
+            try:
+                await self.send(kwargs, future, trace)
+            finally:
+                self.queue.task_done()
+            if not self.webhooks:
+                await asyncio.sleep(self.interval)
+
+    async def send(self, kwargs, future, trace=None):
+        while self.webhooks:
+            webhook = self.webhooks[0]
+            self.webhooks.rotate(-1)
+            try:
+                await self.deliver(kwargs, future, trace, webhook)
+                return
+            except discord.NotFound:
+                self.log.warning(f"Webhook {webhook.id} for channel {self.channel.id} was deleted (trace {trace_id(trace)}); dropping it from the pool", extra={"trace_id": trace_id(trace)})
+                WEBHOOK_FALLBACKS.inc(self.channel.id)
+                self.detach_webhook(webhook)
+        await self.deliver(kwargs, future, trace)
+
+    async def deliver(self, kwargs, future, trace=None, webhook=None):
+        channel_id = getattr(self.channel, "id", "?")
+        t0 = time.perf_counter()
+        try:
+            await (webhook or self.channel).send(**kwargs)
+            t1 = time.perf_counter()
+            SEND_SECONDS.observe(t1 - t0, channel_id)
+            if trace is not None:
+                trace.mark_send(t0, t1)
+            self.sent += 1
+            if not future.done():
+                future.set_result(True)
+        except discord.NotFound as e:
+            # a deleted webhook is dropped by send, which retries through the next one
+            if webhook is not None:
+                raise
+            self._failed(channel_id, future, trace, e)
+        except Exception as e:
+            if getattr(e, "status", None) == 429:
+                SEND_RATE_LIMITED.inc(channel_id)
+            self._failed(channel_id, future, trace, e)
+
+    def _failed(self, channel_id, future, trace, error):
+        self.failed += 1
+        SEND_FAILURES.inc(channel_id)
+        self.log.log(40, f"Failed to deliver to channel {channel_id} (trace {trace_id(trace)}): {error}", extra={"trace_id": trace_id(trace)})
+        if not future.done():
+            future.set_result(False)
+
+    def attach_webhooks(self, webhooks) -> None:
+        self.webhooks.extend(webhooks)
+
+    def detach_webhook(self, webhook) -> None:
+        if webhook in self.webhooks:
+            self.webhooks.remove(webhook)
+
+    def cancel(self) -> None:
+        self.task.cancel()
+        if self.attach_task is not None:
+            self.attach_task.cancel()
+
+
+class ChannelDispatcher:
+    """
+    Runs one worker per destination channel.
+
+    Each channel has its own Discord rate-limit bucket, so a flood for one channel
+    only delays that channel's queue and the others keep delivering in parallel.
+    With a webhook pool, new workers switch to webhook delivery as soon as the
+    channel's webhooks are ready.
+
+    Messages submitted but not yet delivered are counted across all channels. Once
+    max_pending are outstanding, wait_capacity() blocks the queue consumer, so a slow
+    or unreachable Discord backs batches up in their bounded EventQueue lanes (where
+    the overflow policies apply) instead of in unbounded per-channel queues.
+    """
+
+    def __init__(self, interval: float = 0.2, logger: logging.Logger | None = None, webhooks=None, max_pending: int = 200):
+        self.interval = interval
+        self.log = logger or logging.getLogger(__name__)
+        self.webhooks = webhooks
+        self.workers: dict[int, ChannelWorker] = {}
+        self.max_pending = max_pending
+        self.pending = 0
+        self._capacity = asyncio.Event()
+        self._capacity.set()
+
+    def worker_for(self, channel) -> ChannelWorker:
+        worker = self.workers.get(channel.id)
+        if worker is None:
+            worker = ChannelWorker(channel, self.interval, self.log)
+            self.workers[channel.id] = worker
+            if self.webhooks is not None:
+                worker.attach_task = asyncio.create_task(self._attach_webhooks(worker))
+        else:
+            # channel objects can be replaced on reconnect; always send through the newest one
+            worker.channel = channel
+        return worker
+
+    async def _attach_webhooks(self, worker) -> None:
+        # the bot keeps delivering while the webhooks are looked up or created, and for good if that fails
+        try:
+            worker.attach_webhooks(await self.webhooks.acquire(worker.channel))
+        except Exception as e:
+            self.log.log(40, f"Webhook setup for channel {worker.channel.id} failed, delivering as the bot: {type(e).__name__}: {e}")
+
+    def submit(self, channel, trace=None, **send_kwargs) -> asyncio.Future:
+        """Queue one channel.send call; the future resolves to True once delivered, False on failure."""
+        future = asyncio.get_running_loop().create_future()
+        self.pending += 1
+        if self.pending >= self.max_pending:
+            self._capacity.clear()
+        future.add_done_callback(self._released)
+        self.worker_for(channel).queue.put_nowait((send_kwargs, future, trace))
+        return future
+
+    def _released(self, future) -> None:
+        self.pending -= 1
+        if self.pending < self.max_pending:
+            self._capacity.set()
+
+    async def wait_capacity(self) -> None:
+        """Wait until fewer than max_pending messages are outstanding."""
+        while self.pending >= self.max_pending:
+            self._capacity.clear()
+            await self._capacity.wait()
+
+    def set_interval(self, interval: float) -> None:
+        self.interval = interval
+        for worker in self.workers.values():
+            worker.interval = interval
+
+    def depth(self) -> dict[int, int]:
+        return {channel_id: worker.queue.qsize() for channel_id, worker in self.workers.items()}
+
+    async def join(self) -> None:
+        await asyncio.gather(*(worker.queue.join() for worker in self.workers.values()))
+
+    def stop(self) -> None:
+        for worker in self.workers.values():
+            worker.cancel()
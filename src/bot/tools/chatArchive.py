@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ChatArchive:
+    """
+    Full-text searchable archive of GeoFS chat (SQLite FTS5, WAL mode).
+
+    Messages are buffered and written in batches by a single writer thread. Rows are
+    numbered by SQLite in arrival order; GeoFS does not send message ids, so a message
+    seen again from the same account within dedupe_window seconds (an overlapping
+    poll) is not stored twice. Searches use their own read connection and thread, so a long query neither
+    blocks the event loop nor waits behind a write.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 2.0, logger: logging.Logger | None = None, dedupe_window: float = 10.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.dedupe_window = dedupe_window
+        # (acid, msg) -> when it was last archived, for dropping repeats from overlapping polls
+        self._recent: dict[tuple, float] = {}
+        self.log = logger or logging.getLogger(__name__)
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-archive-w")
+        self._reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-archive-r")
+        self._write_conn = None
+        self._read_conn = None
+        self._pending = []
+        self._wake = asyncio.Event()
+        self._task = None
+        self._closing = False
+        self.archived = 0
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._writer, self._open_writer)
+        await loop.run_in_executor(self._reader, self._open_reader)
+        self._task = asyncio.create_task(self._run())
+
+    def _open_writer(self) -> None:
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = self._write_conn = sqlite3.connect(self.path, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY,
+                acid TEXT,
+                callsign TEXT,
+                msg TEXT NOT NULL,
+                ts REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS messages_acid ON messages (acid);
+            CREATE INDEX IF NOT EXISTS messages_callsign ON messages (callsign COLLATE NOCASE);
+            CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5 (
+                msg, callsign, content='messages', content_rowid='id', tokenize='unicode61'
+            );
+            CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+                INSERT INTO messages_fts (rowid, msg, callsign) VALUES (new.id, new.msg, new.callsign);
+            END;
+        """)
+
+    def _open_reader(self) -> None:
+        self._read_conn = sqlite3.connect(self.path, isolation_level=None)
+        self._read_conn.execute("PRAGMA query_only=ON")
+
+    def add(self, messages: list[dict], ts: float) -> None:
+        """Queue decoded chat messages for archiving, skipping repeats within dedupe_window."""
+        now = time.monotonic()
+        if len(self._recent) > 4096:
+            self._recent = {key: seen for key, seen in self._recent.items() if now - seen < self.dedupe_window}
+        for m in messages:
+            if not m.get("msg"):
+                continue
+            acid = str(m.get("acid", ""))
+            key = (acid, m["msg"])
+            seen = self._recent.get(key)
+            self._recent[key] = now
+            if seen is not None and now - seen < self.dedupe_window:
+                continue
+            self._pending.append((acid, str(m.get("cs", "")), m["msg"], ts))
+        if self._pending:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wake.wait()
+            # lets a few polls accumulate so each transaction carries a decent batch
+            if not self._closing:
+                await asyncio.sleep(self.flush_interval)
+            self._wake.clear()
+            pending, self._pending = self._pending, []
+            if pending:
+                try:
+                    await loop.run_in_executor(self._writer, self._write, pending)
+                    self.archived += len(pending)
+                except Exception as e:
+                    self.log.error("Chat archive write of %d message(s) failed: %s", len(pending), e)
+            if self._closing and not self._pending:
+                return
+
+    def _write(self, rows) -> None:
+        cur = self._write_conn.cursor()
+        cur.execute("BEGIN")
+        try:
+            cur.executemany("INSERT INTO messages (acid, callsign, msg, ts) VALUES (?, ?, ?, ?)", rows)
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _fts_query(text: str) -> str:
+        # every word becomes a quoted term (prefix match on the last one), so user input is never FTS syntax
+        terms = [t.replace('"', '""') for t in text.split()]
+        if not terms:
+            return ""
+        quoted = [f'"{t}"' for t in terms]
+        quoted[-1] += "*"
+        return " ".join(quoted)
+
+    def _search(self, text, acid, callsign, limit, offset) -> list[tuple]:
+        clauses = []
+        params = []
+        if text:
+            # walking the FTS index in rowid order lets LIMIT stop early instead of sorting every hit
+            source = "messages_fts f JOIN messages m ON m.id = f.rowid"
+            order = "f.rowid"
+            clauses.append("messages_fts MATCH ?")
+            params.append(self._fts_query(text))
+        else:
+            source = "messages m"
+            order = "m.id"
+        if acid:
+            clauses.append("m.acid = ?")
+            params.append(str(acid))
+        if callsign:
+            clauses.append("m.callsign = ? COLLATE NOCASE")
+            params.append(callsign)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._read_conn.execute(
+            f"SELECT m.id, m.acid, m.callsign, m.msg, m.ts FROM {source} {where} ORDER BY {order} DESC LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        ).fetchall()
+
+    async def search(
+        self,
+        text: str = "",
+        acid: str | None = None,
+        callsign: str | None = None,
+        page: int = 1,
+        per_page: int = 10,
+    ) -> tuple[list[tuple], bool]:
+        """Newest-first page of matches; the flag tells whether another page exists."""
+        loop = asyncio.get_running_loop()
+        offset = (max(page, 1) - 1) * per_page
+        rows = await loop.run_in_executor(self._reader, self._search, text, acid, callsign, per_page + 1, offset)
+        return rows[:per_page], len(rows) > per_page
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._closing = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        loop = asyncio.get_running_loop()
+        if self._write_conn is not None:
+            await loop.run_in_executor(self._writer, self._write_conn.close)
+            self._write_conn = None
+        if self._read_conn is not None:
+            await loop.run_in_executor(self._reader, self._read_conn.close)
+            self._read_conn = None
+        self._writer.shutdown(wait=False)
+        self._reader.shutdown(wait=False)
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from collections import deque
+from .metrics import metrics
+
+CHAT_OUTBOX = metrics.counter("stableintel_chat_outbox_total", "Outgoing GeoFS chat messages by result.", ("result",))
+
+
+class OutboxFull(Exception):
+    """Raised by ChatOutbox.submit when too many messages are already waiting."""
+
+
+class OutgoingMessage:
+    __slots__ = ("text", "future", "attempts", "created", "not_before")
+
+    def __init__(self, text: str, future: asyncio.Future):
+        self.text = text
+        self.future = future
+        self.attempts = 0
+        self.created = time.monotonic()
+        self.not_before = 0.0
+
+
+class ChatOutbox:
+    """
+    Queue of chat messages waiting to ride along on the next GeoFS poll.
+
+    The /update endpoint that returns new messages also takes one outgoing message in
+    its "m" field, so sending costs no extra request: the poll loop takes at most one
+    message per poll, no sooner than min_interval after the previous one. A message
+    that fails is retried on later polls, up to max_attempts times, and one older than
+    max_age is given up on. Only failures known to happen before GeoFS acted on the
+    request are retried; after any other failure the message may already be in the chat,
+    so it is settled as unconfirmed rather than risk posting it twice. Each submit returns
+    a future resolving to True once GeoFS accepted the message, False once it was given up
+    on, and None when it is unknown whether it was posted.
+    """
+
+    def __init__(self, min_interval: float = 3.0, max_attempts: int = 3, max_age: float = 600.0, max_size: int = 20):
+        self.min_interval = min_interval
+        self.max_attempts = max_attempts
+        self.max_age = max_age
+        self.max_size = max_size
+        self.queue: deque[OutgoingMessage] = deque()
+        self._last_sent = 0.0
+
+    def __len__(self) -> int:
+        return len(self.queue)
+
+    def submit(self, text: str) -> asyncio.Future:
+        if len(self.queue) >= self.max_size:
+            CHAT_OUTBOX.inc("rejected")
+            raise OutboxFull()
+        future = asyncio.get_running_loop().create_future()
+        self.queue.append(OutgoingMessage(text, future))
+        return future
+
+    def take(self) -> OutgoingMessage | None:
+        """The message for this poll, or None when nothing is due or the rate limit says wait."""
+        now = time.monotonic()
+        while self.queue and now - self.queue[0].created > self.max_age:
+            self._resolve(self.queue.popleft(), False, "expired")
+        if not self.queue or now - self._last_sent < self.min_interval or now < self.queue[0].not_before:
+            return None
+        message = self.queue.popleft()
+        message.attempts += 1
+        self._last_sent = now
+        return message
+
+    def sent(self, message: OutgoingMessage) -> None:
+        self._resolve(message, True, "sent")
+
+    def failed(self, message: OutgoingMessage) -> None:
+        if message.attempts >= self.max_attempts:
+            self._resolve(message, False, "failed")
+            return
+        # back to the front, so messages keep their order; retried a little later each time
+        message.not_before = time.monotonic() + self.min_interval * 2 ** message.attempts
+        self.queue.appendleft(message)
+        CHAT_OUTBOX.inc("retried")
+
+    def unconfirmed(self, message: OutgoingMessage) -> None:
+        self._resolve(message, None, "unconfirmed")
+
+    def close(self) -> None:
+        while self.queue:
+            self._resolve(self.queue.popleft(), False, "dropped")
+
+    @staticmethod
+    def _resolve(message: OutgoingMessage, delivered: bool | None, result: str) -> None:
+        CHAT_OUTBOX.inc(result)
+        if not message.future.done():
+            message.future.set_result(delivered)
@@ -0,0 +1,109 @@
+import discord
+
+# Discord message limits
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+MAX_DESCRIPTION_CHARS = 4096
+MAX_MESSAGE_CHARS = 2000
+
+
+class FrozenEmbed(discord.Embed):
+    """An embed whose payload dict is built once and reused by every message that carries it."""
+    __slots__ = ("_payload",)
+
+    @classmethod
+    def freeze(cls, embed: discord.Embed) -> "FrozenEmbed":
+        payload = embed.to_dict()
+        frozen = cls.from_dict(payload)
+        frozen._payload = payload
+        return frozen
+
+    def to_dict(self):
+        return self._payload
+
+
+def pack_embeds(
+    embeds: list[discord.Embed],
+    max_embeds: int = MAX_EMBEDS_PER_MESSAGE,
+    max_chars: int = MAX_EMBED_CHARS_PER_MESSAGE,
+) -> list[list[discord.Embed]]:
+    """Greedily group embeds into messages that stay within Discord's per-message limits."""
+    messages = []
+    current = []
+    current_chars = 0
+    for embed in embeds:
+        size = len(embed)
+        if current and (len(current) >= max_embeds or current_chars + size > max_chars):
+            messages.append(current)
+            current = []
+            current_chars = 0
+        current.append(embed)
+        current_chars += size
+    if current:
+        messages.append(current)
+    return messages
+
+
+def compact_embeds(embeds: list[discord.Embed], max_description: int = 1900) -> list[discord.Embed]:
+    """
+    Merge runs of embeds with the same title and colour into multi-line embeds.
+
+    Every event keeps its own block of lines, so nothing is dropped; the title gets the
+    number of events folded into it. max_description is kept well under Discord's 4096
+    so that several compact embeds still fit in one 6000 character message. Embeds with
+    fields are passed through as they are, since only descriptions are merged.
+    """
+    max_description = min(max_description, MAX_DESCRIPTION_CHARS)
+    compacted = []
+    title = color = None
+    blocks = []
+    length = 0
+
+    def flush():
+        if blocks:
+            compacted.append(discord.Embed(
+                title=f"{title} ×{len(blocks)}" if len(blocks) > 1 else title,
+                description="\n\n".join(blocks),
+                color=color,
+            ))
+
+    for embed in embeds:
+        if embed.fields:
+            flush()
+            blocks = []
+            length = 0
+            compacted.append(embed)
+            continue
+        block = (embed.description or "")[:max_description]
+        # length is the merged description so far; each further block adds a blank line too
+        if blocks and (embed.title != title or embed.color != color or length + 2 + len(block) > max_description):
+            flush()
+            blocks = []
+            length = 0
+        title = embed.title
+        color = embed.color
+        length += len(block) + (2 if blocks else 0)
+        blocks.append(block)
+    flush()
+    return compacted
+
+
+def chunk_lines(lines: list[str], limit: int = MAX_MESSAGE_CHARS) -> list[str]:
+    """Join lines into as few messages as possible, each under Discord's content limit."""
+    chunks = []
+    current = ""
+    for line in lines:
+        # a single oversized line is hard-split
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        if len(current) + len(line) > limit:
+            chunks.append(current)
+            current = ""
+        current += line
+    if current:
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,292 @@
+import asyncio
+import time
+from collections import deque
+from itertools import islice
+
+OVERFLOW_POLICIES = ("drop-oldest", "drop-newest", "reject")
+DEFAULT_LIMITS = {
+    "maxEvents": 5000,
+    "overflow": "drop-oldest",
+    "priority": 0,          # higher tiers are always served first...
+    "weight": 1,            # ...and lanes in the same tier share the consumer in proportion to their weights
+    "maxWaitSeconds": 30,   # ...unless a lower lane's oldest batch has waited this long
+    "sloSeconds": 60,       # receive-to-delivery target, measured per event type
+    "coalesceSeconds": 0,   # hold a lane's batches this long after the first arrives, then hand them out as one
+}
+
+
+class QueueFull(Exception):
+    """Raised by EventQueue.put_nowait when a lane with the reject policy is full."""
+
+
+class Batch:
+    __slots__ = ("event_type", "data", "enqueued_at", "spool_id", "trace", "absorbed")
+
+    def __init__(self, event_type: str, data: list, spool_id: int | None = None, trace=None):
+        self.event_type = event_type
+        self.data = data
+        self.enqueued_at = time.monotonic()
+        self.spool_id = spool_id
+        self.trace = trace
+        # spool ids of batches merged into this one by a coalescing lane; acknowledged together
+        self.absorbed = ()
+
+
+class Lane:
+    """Bounded FIFO of batches for one event type."""
+    __slots__ = (
+        "batches", "events", "max_events", "overflow", "dropped", "rejected",
+        "priority", "weight", "max_wait", "slo_seconds", "vtime", "aged", "slo_met", "slo_missed", "hold",
+    )
+
+    def __init__(self, max_events: int, overflow: str, priority: int = 0, weight: float = 1,
+                 max_wait: float = 30, slo_seconds: float = 60, hold: float = 0):
+        self.batches = deque()
+        self.events = 0
+        self.dropped = 0
+        self.rejected = 0
+        # virtual finish time: grows by events served / weight, the lowest in a tier goes next
+        self.vtime = 0.0
+        # batches served early by the starvation guard
+        self.aged = 0
+        self.slo_met = 0
+        self.slo_missed = 0
+        self.configure(max_events, overflow, priority, weight, max_wait, slo_seconds, hold)
+
+    @staticmethod
+    def check(overflow: str, weight: float) -> None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow}'. Expected one of {OVERFLOW_POLICIES}.")
+        if weight <= 0:
+            raise ValueError(f"Lane weight must be positive, got {weight}.")
+
+    def configure(self, max_events: int, overflow: str, priority: int = 0, weight: float = 1,
+                  max_wait: float = 30, slo_seconds: float = 60, hold: float = 0) -> None:
+        """Set the lane's limits; queued batches and counters are kept."""
+        self.check(overflow, weight)
+        self.max_events = max_events
+        self.overflow = overflow
+        self.priority = priority
+        self.weight = weight
+        self.max_wait = max_wait
+        self.slo_seconds = slo_seconds
+        self.hold = hold
+
+
+class EventQueue:
+    """
+    Per-event-type bounded queues behind a single consumer interface.
+
+    Each event type gets its own lane, bounded by number of events, with an overflow
+    policy of drop-oldest, drop-newest or reject (QueueFull, answered with 429 by the
+    ingestion routes). Purging a type swaps its lane out in constant time.
+
+    Lanes are served in weighted-fair order: the highest priority tier with work goes
+    first, and within a tier each lane gets consumer time in proportion to its weight,
+    counted in events so one large flood batch costs what it weighs. A lane whose oldest
+    batch has waited maxWaitSeconds is served ahead of everything, so low tiers are
+    delayed under load but never starved.
+
+    A lane with coalesceSeconds is not served until its oldest batch is that old; then
+    everything in it is handed out as a single batch, so bursts can be merged downstream.
+
+    on_drop(event_type, batches) is called with whatever batches get evicted or purged.
+    """
+
+    def __init__(self, limits: dict | None = None, on_drop=None):
+        self.limits = limits or {}
+        self.on_drop = on_drop
+        self.lanes: dict[str, Lane] = {}
+        # virtual time of the last lane served; idle lanes rejoin here instead of cashing in saved credit
+        self._vtime = 0.0
+        # cleared on shutdown so held batches are released at once
+        self.holding = True
+        self._ready = asyncio.Event()
+
+    @staticmethod
+    def _settings(limits: dict, event_type: str) -> tuple:
+        cfg = {**DEFAULT_LIMITS, **limits.get("default", {}), **limits.get(event_type, {})}
+        return (
+            int(cfg["maxEvents"]), cfg["overflow"], int(cfg["priority"]), float(cfg["weight"]),
+            float(cfg["maxWaitSeconds"]), float(cfg["sloSeconds"]), float(cfg["coalesceSeconds"]),
+        )
+
+    def lane(self, event_type: str) -> Lane:
+        lane = self.lanes.get(event_type)
+        if lane is None:
+            lane = Lane(*self._settings(self.limits, event_type))
+            self.lanes[event_type] = lane
+        return lane
+
+    def configure(self, limits: dict | None) -> None:
+        """
+        Apply new limits to the existing lanes and to those created later (config reload).
+
+        Everything is validated before any lane changes, so a bad entry leaves the old
+        limits in place. Queued batches stay; a lane now over its maxEvents is brought
+        back under it by its overflow policy on the next put.
+        """
+        limits = limits or {}
+        settings = {event_type: self._settings(limits, event_type) for event_type in self.lanes}
+        for args in settings.values():
+            Lane.check(args[1], args[3])
+        for event_type, args in settings.items():
+            self.lanes[event_type].configure(*args)
+        self.limits = limits
+        # a shorter coalesceSeconds can make a held lane servable now
+        self._ready.set()
+
+    def check_capacity(self, event_type: str, size: int) -> None:
+        """Raise QueueFull up front if a batch of this size would be rejected."""
+        lane = self.lane(event_type)
+        if lane.overflow == "reject" and lane.events + size > lane.max_events:
+            lane.rejected += size
+            raise QueueFull(event_type)
+
+    def put_nowait(self, event_type: str, data: list, spool_id: int | None = None, trace=None) -> Batch | None:
+        """Enqueue a batch; returns None when the batch was dropped by the drop-newest policy."""
+        lane = self.lane(event_type)
+        size = len(data)
+        if lane.events + size > lane.max_events:
+            if lane.overflow == "reject":
+                lane.rejected += size
+                raise QueueFull(event_type)
+            if lane.overflow == "drop-newest":
+                lane.dropped += size
+                return None
+            # drop-oldest: evict whole batches first, then trim the incoming batch if it alone is too big
+            evicted = []
+            while lane.batches and lane.events + size > lane.max_events:
+                old = lane.batches.popleft()
+                lane.events -= len(old.data)
+                lane.dropped += len(old.data)
+                evicted.append(old)
+            if evicted and self.on_drop:
+                self.on_drop(event_type, evicted)
+            if size > lane.max_events:
+                lane.dropped += size - lane.max_events
+                data = data[size - lane.max_events:]
+                size = len(data)
+        batch = Batch(event_type, data, spool_id, trace)
+        if not lane.batches:
+            lane.vtime = max(lane.vtime, self._vtime)
+        lane.batches.append(batch)
+        lane.events += size
+        self._ready.set()
+        return batch
+
+    def get_nowait(self) -> Batch | None:
+        now = time.monotonic()
+        chosen, chosen_key = None, None
+        for lane in self.lanes.values():
+            if not lane.batches:
+                continue
+            waited = now - lane.batches[0].enqueued_at
+            if waited < lane.hold and self.holding:
+                continue
+            if waited >= lane.max_wait:
+                # starvation guard: overdue lanes first, longest waiting first
+                key = (0, -waited)
+            else:
+                key = (1, -lane.priority, lane.vtime)
+            if chosen_key is None or key < chosen_key:
+                chosen, chosen_key = lane, key
+        if chosen is None:
+            return None
+        if chosen.hold and len(chosen.batches) > 1:
+            batch = self._merge(chosen)
+        else:
+            batch = chosen.batches.popleft()
+        chosen.events -= len(batch.data)
+        if chosen_key[0] == 0:
+            chosen.aged += 1
+        self._vtime = chosen.vtime
+        chosen.vtime += max(1, len(batch.data)) / chosen.weight
+        return batch
+
+    @staticmethod
+    def _merge(lane: Lane) -> Batch:
+        # the merged batch keeps the first batch's age and trace, and carries the others' spool ids
+        first = lane.batches[0]
+        merged = Batch(first.event_type, [item for batch in lane.batches for item in batch.data], first.spool_id, first.trace)
+        merged.enqueued_at = first.enqueued_at
+        merged.absorbed = tuple(batch.spool_id for batch in islice(lane.batches, 1, None) if batch.spool_id is not None)
+        lane.batches = deque()
+        return merged
+
+    def _next_release(self) -> float | None:
+        # seconds until the earliest held lane becomes servable
+        if not self.holding:
+            return None
+        now = time.monotonic()
+        waits = [lane.batches[0].enqueued_at + lane.hold - now for lane in self.lanes.values() if lane.hold and lane.batches]
+        return max(0.0, min(waits)) if waits else None
+
+    def release(self) -> None:
+        """Stop holding coalescing lanes; used when draining on shutdown."""
+        self.holding = False
+        self._ready.set()
+
+    async def get(self) -> Batch:
+        while True:
+            batch = self.get_nowait()
+            if batch is not None:
+                return batch
+            self._ready.clear()
+            timeout = self._next_release()
+            if timeout is None:
+                await self._ready.wait()
+                continue
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def purge(self, event_type: str) -> int:
+        """Drop everything queued for event_type in O(1); returns the number of events dropped."""
+        lane = self.lane(event_type)
+        purged = lane.events
+        batches = lane.batches
+        lane.batches = deque()
+        lane.events = 0
+        lane.dropped += purged
+        if batches and self.on_drop:
+            self.on_drop(event_type, batches)
+        return purged
+
+    def observe_latency(self, event_type: str, seconds: float) -> bool:
+        """Count one delivered batch against its type's SLO; returns whether it was met."""
+        lane = self.lane(event_type)
+        met = seconds <= lane.slo_seconds
+        if met:
+            lane.slo_met += 1
+        else:
+            lane.slo_missed += 1
+        return met
+
+    def qsize(self) -> int:
+        return sum(lane.events for lane in self.lanes.values())
+
+    def empty(self) -> bool:
+        return not any(lane.batches for lane in self.lanes.values())
+
+    def stats(self) -> dict:
+        return {
+            event_type: {
+                "depth": lane.events,
+                "batches": len(lane.batches),
+                "maxEvents": lane.max_events,
+                "overflow": lane.overflow,
+                "dropped": lane.dropped,
+                "rejected": lane.rejected,
+                "priority": lane.priority,
+                "weight": lane.weight,
+                "aged": lane.aged,
+                "oldestWaitSeconds": round(time.monotonic() - lane.batches[0].enqueued_at, 3) if lane.batches else 0,
+                "sloSeconds": lane.slo_seconds,
+                "sloMet": lane.slo_met,
+                "sloMissed": lane.slo_missed,
+                "coalesceSeconds": lane.hold,
+            }
+            for event_type, lane in self.lanes.items()
+        }
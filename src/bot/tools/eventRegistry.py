@@ -0,0 +1,261 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Annotated, Any
+import discord
+import msgspec
+
+# Field type names usable under "types" in an event spec. "id" covers values GeoFS
+# sends either as strings or as numbers (account ids, callsigns, aircraft).
+FIELD_TYPES = {
+    "str": str,
+    "int": int,
+    "float": float,
+    "id": str | int,
+    "latitude": Annotated[float, msgspec.Meta(ge=-90, le=90)],
+    "longitude": Annotated[float, msgspec.Meta(ge=-180, le=180)],
+    "any": Any,
+}
+# types of the built-in fields; fields not listed here or in the spec accept any value
+DEFAULT_FIELD_TYPES = {
+    "acid": "id",
+    "callsign": "id",
+    "oldCallsign": "id",
+    "newCallsign": "id",
+    "oldAircraft": "id",
+    "newAircraft": "id",
+    "oldLatitude": "latitude",
+    "oldLongitude": "longitude",
+    "newLatitude": "latitude",
+    "newLongitude": "longitude",
+    "distance": "float",
+    "status": "id",
+}
+# splits a batch into undecoded items, for the per-item fallback
+_RAW_LIST = msgspec.json.Decoder(list[msgspec.Raw])
+
+# Built-in event types. Entries under "events" in config.json override these field by
+# field, and any new name there becomes a new event type with its own route.
+DEFAULT_EVENT_TYPES = {
+    "aircraft-change": {
+        "route": "/aircraft-change",
+        "fields": ["callsign", "oldAircraft", "newAircraft"],
+        "title": "Aircraft Change",
+        "template": "Callsign: {callsign}\n Old Aircraft: {oldAircraft}\n New Aircraft: {newAircraft}",
+        "channelKey": "aircraftChangeLogChannel",
+        "enabledKey": "displayAircraftChanges",
+        # aircraft changes carry no acid, so the callsign identifies the player
+        "coalesce": {"key": "callsign", "chains": [["oldAircraft", "newAircraft"]]},
+    },
+    "new-account": {
+        "route": "/new-account",
+        "fields": ["acid", "callsign"],
+        "title": "New Account",
+        "template": "Acoount ID: {acid}\n Callsign: {callsign}",
+        "channelKey": "newAccountLogChannel",
+        "enabledKey": "displayNewAccounts",
+    },
+    "callsign-change": {
+        "route": "/callsign-change",
+        "fields": ["acid", "oldCallsign", "newCallsign"],
+        "title": "Callsign Change",
+        "template": "Acoount ID: {acid}\n Old Callsign: {oldCallsign}\n New Callsign: {newCallsign}",
+        "channelKey": "callsignChangeLogChannel",
+        "enabledKey": "displayCallsignChanges",
+        "coalesce": {"key": "acid", "chains": [["oldCallsign", "newCallsign"]]},
+    },
+    "teleporation": {
+        "route": "/teleporation",
+        "fields": ["acid", "oldLatitude", "oldLongitude", "newLatitude", "newLongitude", "distance"],
+        "title": "Teleporation",
+        "template": "{acid}\n Old Position: {oldLatitude}, {oldLongitude}\n New Position: {newLatitude}, {newLongitude}\n Distance: {distance} km",
+        "channelKey": "teleporationLogChannel",
+        "enabledKey": "displayTeleporations",
+    },
+    "activity-change": {
+        "route": "/activity-change",
+        "fields": ["acid", "status"],
+        "title": "Activity Change",
+        "template": "{acid}\n Status: {status}",
+        "channelKey": "activityChangeLogChannel",
+        "enabledKey": "displayActivityChanges",
+        "coalesce": {"key": "acid"},
+    },
+}
+
+
+class EventType:
+    """One registry entry: where it is ingested, what it must contain, how it renders and where it goes."""
+    __slots__ = (
+        "name", "route", "fields", "title", "template", "color", "channel_id", "enabled", "channel",
+        "record", "_batch_decoder", "_item_decoder", "coalesce_key", "chains",
+    )
+
+    def __init__(self, name: str, spec: dict, config: dict):
+        self.name = name
+        self.route = spec.get("route", f"/{name}")
+        self.fields = tuple(spec.get("fields", ()))
+        self.title = spec.get("title", name)
+        self.template = spec["template"]
+        self.color = discord.Color(spec.get("color", discord.Color.green().value))
+        self.channel_id = spec.get("channel") or config.get(spec.get("channelKey", ""))
+        self.enabled = config.get(spec.get("enabledKey", ""), spec.get("enabled", True))
+        self.channel = None
+        # items sharing coalesce_key are merged: the first item's "old" side of each chain, the last item's everything else
+        coalesce = spec.get("coalesce") or {}
+        self.coalesce_key = coalesce.get("key")
+        self.chains = tuple((old, new) for old, new in coalesce.get("chains", ()))
+
+        # typed record of the required fields; anything else an item carries is dropped on decode
+        types = {**DEFAULT_FIELD_TYPES, **spec.get("types", {})}
+        self.record = msgspec.defstruct(
+            f"{name.title().replace('-', '')}Record",
+            [(field, FIELD_TYPES[types.get(field, "any")]) for field in self.fields],
+            gc=False,
+        )
+        # lax mode, like the untyped baseline: numbers sent as strings ("51.5") are converted, not rejected
+        self._batch_decoder = msgspec.json.Decoder(list[self.record], strict=False)
+        self._item_decoder = msgspec.json.Decoder(self.record, strict=False)
+
+    def accepts(self, item) -> bool:
+        return isinstance(item, dict) and all(field in item for field in self.fields)
+
+    def decode(self, body: bytes) -> tuple[list[dict], list[str]]:
+        """
+        Decode and validate a JSON batch, returning the valid items and one error per rejected item.
+
+        A clean batch is decoded in a single pass. Only when some item fails validation
+        is the batch split and decoded item by item, so one bad item costs just itself.
+        Raises msgspec.DecodeError for malformed JSON and msgspec.ValidationError when
+        the body is not a list.
+        """
+        try:
+            return msgspec.to_builtins(self._batch_decoder.decode(body)), []
+        except msgspec.ValidationError:
+            pass
+        records = []
+        errors = []
+        for i, raw in enumerate(_RAW_LIST.decode(body)):
+            try:
+                records.append(self._item_decoder.decode(raw))
+            except msgspec.ValidationError as e:
+                errors.append(f"item {i}: {e}")
+        return msgspec.to_builtins(records), errors
+
+    def coalesce(self, items: list) -> list:
+        """
+        Merge items that share the coalesce key, keeping the position of the first one.
+
+        A->B, B->C becomes A->C with "changes": 2; an item identical to the previous one
+        for its key is a duplicate and dropped. Items without the key pass through as is.
+        """
+        if self.coalesce_key is None or len(items) < 2:
+            return items
+        merged = []
+        latest = {}
+        for item in items:
+            key = item.get(self.coalesce_key)
+            if key is None:
+                merged.append(item)
+                continue
+            slot = latest.get(key)
+            if slot is None:
+                latest[key] = [len(merged), item, 1]
+                merged.append(item)
+                continue
+            index, previous, changes = slot
+            if item == previous:
+                continue
+            combined = dict(item)
+            for old, _ in self.chains:
+                combined[old] = merged[index][old]
+            combined["changes"] = changes + 1
+            merged[index] = combined
+            slot[1], slot[2] = item, changes + 1
+        return merged
+
+    def render(self, item) -> discord.Embed:
+        description = self.template.format_map(item)
+        if item.get("changes", 1) > 1:
+            description += f"\n Changes: {item['changes']}"
+        return discord.Embed(title=self.title, description=description, color=self.color)
+
+
+class EventRegistry:
+    """
+    Declarative table of event types built from config.json.
+
+    The registry owns the single parsed copy of the config. On reload the dict is
+    updated in place, so code that reads it at use time (cogs included) sees the new
+    values, and the route and type tables are swapped to match. Components that copied
+    settings out of it when they were built only change if an on_reload callback hands
+    them the new ones.
+    """
+
+    def __init__(self, config_path: str, logger: logging.Logger | None = None):
+        self.config_path = config_path
+        self.log = logger or logging.getLogger(__name__)
+        self.config: dict = {}
+        self.types: dict[str, EventType] = {}
+        # route path -> event type name, read live by the ingestion server
+        self.routes: dict[str, str] = {}
+        # called with no arguments after every successful reload
+        self.on_reload = []
+        self._mtime = None
+        self.load()
+
+    def load(self) -> None:
+        with open(self.config_path, "r") as f:
+            config = json.load(f)
+        self._mtime = os.path.getmtime(self.config_path)
+
+        specs = {name: dict(spec) for name, spec in DEFAULT_EVENT_TYPES.items()}
+        for name, overrides in config.get("events", {}).items():
+            specs.setdefault(name, {}).update(overrides)
+        types = {name: EventType(name, spec, config) for name, spec in specs.items()}
+
+        # keeps already resolved channels when the id did not change
+        for name, event in types.items():
+            old = self.types.get(name)
+            if old is not None and old.channel_id == event.channel_id:
+                event.channel = old.channel
+
+        self.config.clear()
+        self.config.update(config)
+        self.types = types
+        self.routes.clear()
+        self.routes.update({event.route: name for name, event in types.items()})
+
+    def get(self, name: str) -> EventType | None:
+        return self.types.get(name)
+
+    def decode(self, event_type: str, body: bytes) -> tuple[list[dict], list[str]]:
+        return self.types[event_type].decode(body)
+
+    def resolve_channels(self, get_channel) -> None:
+        for event in self.types.values():
+            if event.channel_id:
+                event.channel = get_channel(event.channel_id)
+            if event.channel is None:
+                self.log.warning(f"Channel for '{event.name}' is not set or not visible to the bot.")
+
+    async def watch(self, get_channel, interval: float = 5.0) -> None:
+        """Reload the registry whenever config.json changes on disk."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                mtime = os.path.getmtime(self.config_path)
+                if mtime == self._mtime:
+                    continue
+                # a broken edit is reported once, not on every poll
+                self._mtime = mtime
+                self.load()
+                # ingestion workers have no Discord client and pass None
+                if get_channel is not None:
+                    self.resolve_channels(get_channel)
+                for callback in self.on_reload:
+                    callback()
+                self.log.log(20, f"Reloaded {self.config_path} ({len(self.types)} event types)")
+            except Exception as e:
+                self.log.log(40, f"Failed to reload {self.config_path}: {e}")
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class EventSpool:
+    """
+    Append-only on-disk record of accepted event batches (SQLite in WAL mode).
+
+    Appends are group-committed: while one transaction is being written and fsynced,
+    new appends pile up and go out together in the next one, so a burst of requests
+    costs a handful of fsyncs rather than one each. Rows are deleted once their batch
+    has been delivered; whatever is still present at startup is replayed.
+    """
+
+    def __init__(self, path: str, synchronous: str = "FULL", logger: logging.Logger | None = None):
+        self.path = path
+        self.synchronous = synchronous
+        self.log = logger or logging.getLogger(__name__)
+        # sqlite connections are tied to the thread that made them, so all I/O goes through one worker
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spool")
+        self._conn = None
+        self._pending = []
+        self._acks = []
+        self._wake = asyncio.Event()
+        self._task = None
+        self._closing = False
+        self.commits = 0
+        self.appended = 0
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._open)
+        self._task = asyncio.create_task(self._run())
+
+    def _open(self) -> None:
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " event_type TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " received_at REAL NOT NULL)"
+        )
+
+    async def append(self, event_type: str, data: list, payload: str | None = None) -> int:
+        """
+        Durably record a batch; returns its spool id once the covering commit is on disk.
+
+        payload is the batch already encoded as JSON, when the caller has it.
+        """
+        future = asyncio.get_running_loop().create_future()
+        if payload is None:
+            payload = json.dumps(data, separators=(",", ":"))
+        self._pending.append((event_type, payload, time.time(), future))
+        self._wake.set()
+        return await future
+
+    def mark_delivered(self, spool_id: int | None) -> None:
+        if spool_id is not None:
+            self._acks.append(spool_id)
+            self._wake.set()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            written = await self._flush(loop)
+            if self._closing and not (written and (self._pending or self._acks)):
+                if self._acks:
+                    self.log.log(30, f"Event spool closed with {len(self._acks)} unwritten ack(s); those batches replay on the next start")
+                return
+
+    async def _flush(self, loop) -> bool:
+        pending, self._pending = self._pending, []
+        acks, self._acks = self._acks, []
+        if not (pending or acks):
+            return True
+        try:
+            ids = await loop.run_in_executor(self._executor, self._write, pending, acks)
+        except Exception as e:
+            self.log.log(40, f"Event spool write failed: {e}")
+            for *_, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            # the appends are failed back to their callers, but acks stay for the next commit
+            self._acks[:0] = acks
+            return False
+        self.commits += 1
+        self.appended += len(pending)
+        for (*_, future), spool_id in zip(pending, ids):
+            if not future.done():
+                future.set_result(spool_id)
+        return True
+
+    def _write(self, pending, acks) -> list[int]:
+        ids = []
+        cur = self._conn.cursor()
+        cur.execute("BEGIN")
+        try:
+            for event_type, payload, received_at, _ in pending:
+                cur.execute(
+                    "INSERT INTO events (event_type, payload, received_at) VALUES (?, ?, ?)",
+                    (event_type, payload, received_at),
+                )
+                ids.append(cur.lastrowid)
+            if acks:
+                cur.executemany("DELETE FROM events WHERE id = ?", ((i,) for i in acks))
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+        return ids
+
+    async def replay(self) -> list[tuple[int, str, list]]:
+        """Every batch that was accepted but never marked delivered, oldest first."""
+        loop = asyncio.get_running_loop()
+        rows = await loop.run_in_executor(
+            self._executor,
+            lambda: self._conn.execute("SELECT id, event_type, payload FROM events ORDER BY id").fetchall(),
+        )
+        return [(spool_id, event_type, json.loads(payload)) for spool_id, event_type, payload in rows]
+
+    async def close(self) -> None:
+        # lets the writer finish its current commit and flush whatever is still pending
+        if self._task is not None:
+            self._closing = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        loop = asyncio.get_running_loop()
+        if self._conn is not None:
+            await loop.run_in_executor(self._executor, self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=False)
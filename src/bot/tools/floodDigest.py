@@ -0,0 +1,191 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+import logging
+import time
+from collections import Counter, deque
+import discord
+
+DEFAULT_DIGEST = {
+    "enabled": True,
+    "enterPerMinute": 300,   # switch to digests once this many events arrived in the last minute...
+    "exitPerMinute": 100,    # ...and back to single events once the rate falls under this
+    "intervalSeconds": 60,   # one digest message per channel per interval while flooding
+    "format": "csv",         # attachment format, "csv" or "json" (one object per line), gzip compressed
+    "topFields": ["newAircraft", "acid", "callsign", "status"],
+    "topCount": 5,
+}
+
+
+class _Meter:
+    # events per type over a sliding minute, bucketed per second
+    __slots__ = ("buckets", "total")
+
+    def __init__(self):
+        self.buckets = deque()
+        self.total = 0
+
+    def add(self, now: float, count: int) -> None:
+        second = int(now)
+        if self.buckets and self.buckets[-1][0] == second:
+            self.buckets[-1][1] += count
+        else:
+            self.buckets.append([second, count])
+        self.total += count
+
+    def rate(self, now: float) -> int:
+        while self.buckets and self.buckets[0][0] <= now - 60:
+            self.total -= self.buckets.popleft()[1]
+        return self.total
+
+
+class _Pending:
+    # one channel's digest for one event type, being filled until its interval ends
+    __slots__ = ("channel", "event", "items", "futures", "started")
+
+    def __init__(self, channel, event, started: float):
+        self.channel = channel
+        self.event = event
+        self.items = []
+        self.futures = []
+        self.started = started
+
+
+class FloodDigest:
+    """
+    Switches flooding event types from one embed per event to one digest per interval.
+
+    Above enterPerMinute a type's items are buffered per channel instead of rendered;
+    every intervalSeconds each buffer becomes a single message with a summary embed
+    (counts and the most frequent values) and the full detail as a gzip attachment.
+    Below exitPerMinute the type goes back to per-event posting. While flooding, a
+    channel's delivery cost is one message per interval however many events arrive.
+
+    submit(channel, embeds=[...], file=...) must return a future resolving to True once
+    the message was sent, as ChannelDispatcher.submit does.
+    """
+
+    def __init__(self, config: dict | None, submit, logger: logging.Logger | None = None):
+        self.config = config or {}
+        self.submit = submit
+        self.log = logger or logging.getLogger(__name__)
+        self.meters: dict[str, _Meter] = {}
+        # event types currently in digest mode
+        self.active: set[str] = set()
+        # (event type, channel id) -> pending digest
+        self.pending: dict[tuple[str, int], _Pending] = {}
+
+    def settings(self, event_type: str) -> dict:
+        return {**DEFAULT_DIGEST, **self.config.get("default", {}), **self.config.get(event_type, {})}
+
+    def observe(self, event_type: str, count: int) -> bool:
+        """Count a batch and return whether the type should be digested."""
+        cfg = self.settings(event_type)
+        if not cfg["enabled"]:
+            return False
+        now = time.monotonic()
+        meter = self.meters.get(event_type)
+        if meter is None:
+            meter = self.meters[event_type] = _Meter()
+        meter.add(now, count)
+        if event_type not in self.active and meter.rate(now) >= cfg["enterPerMinute"]:
+            self.active.add(event_type)
+            self.log.warning(f"'{event_type}' is flooding ({meter.rate(now)} events/min); switching to digests every {cfg['intervalSeconds']}s")
+        return event_type in self.active
+
+    def add(self, event, channel, items: list, track: bool = False) -> asyncio.Future | None:
+        """Buffer items for the channel's next digest; with track, returns a future resolving to [delivered]."""
+        key = (event.name, channel.id)
+        pending = self.pending.get(key)
+        if pending is None:
+            pending = self.pending[key] = _Pending(channel, event, time.monotonic())
+        pending.items.extend(items)
+        if not track:
+            return None
+        future = asyncio.get_running_loop().create_future()
+        pending.futures.append(future)
+        return future
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(1)
+            now = time.monotonic()
+            for key, pending in list(self.pending.items()):
+                if now - pending.started >= self.settings(key[0])["intervalSeconds"]:
+                    await self.flush(key)
+            # a type only leaves digest mode once its buffers have been posted
+            for event_type in list(self.active):
+                cfg = self.settings(event_type)
+                rate = self.meters[event_type].rate(now)
+                if rate < cfg["exitPerMinute"] and not any(key[0] == event_type for key in self.pending):
+                    self.active.discard(event_type)
+                    self.log.log(20, f"'{event_type}' is back to {rate} events/min; posting single events again")
+
+    async def flush(self, key: tuple[str, int]) -> None:
+        pending = self.pending.pop(key, None)
+        if pending is None:
+            return
+        if not pending.items:
+            # nothing to post, so nothing can fail; the batches waiting on it are done
+            self._resolve(pending.futures, True)
+            return
+        cfg = self.settings(key[0])
+        try:
+            embed = self.summarize(pending, cfg)
+            data, filename = await asyncio.to_thread(self.encode, pending, cfg["format"])
+            sent = self.submit(pending.channel, embeds=[embed], file=discord.File(io.BytesIO(data), filename=filename))
+        except Exception as e:
+            self.log.log(40, f"Digest of {len(pending.items)} '{key[0]}' event(s) for channel {key[1]} failed: {e}")
+            self._resolve(pending.futures, False)
+            return
+        # the channel worker paces the send; other digests are not held up waiting for it
+        sent.add_done_callback(lambda f: self._resolve(pending.futures, not f.cancelled() and f.exception() is None and f.result()))
+
+    @staticmethod
+    def _resolve(futures: list, delivered: bool) -> None:
+        for future in futures:
+            if not future.done():
+                future.set_result([delivered])
+
+    async def flush_all(self) -> None:
+        for key in list(self.pending):
+            await self.flush(key)
+
+    def summarize(self, pending: _Pending, cfg: dict) -> discord.Embed:
+        items = pending.items
+        elapsed = max(1.0, time.monotonic() - pending.started)
+        embed = discord.Embed(
+            title=f"{pending.event.title} digest",
+            description=f"**{len(items)}** events in the last {elapsed:.0f}s ({len(items) * 60 / elapsed:.0f}/min). Full detail attached.",
+            color=pending.event.color,
+        )
+        for field in cfg["topFields"]:
+            counts = Counter(item[field] for item in items if item.get(field) is not None)
+            if counts:
+                top = "\n".join(f"`{value}` ×{count}" for value, count in counts.most_common(cfg["topCount"]))
+                embed.add_field(name=f"Top {field}", value=top[:1024], inline=True)
+        return embed
+
+    @staticmethod
+    def encode(pending: _Pending, fmt: str) -> tuple[bytes, str]:
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+        buffer = io.StringIO()
+        if fmt == "json":
+            for item in pending.items:
+                buffer.write(json.dumps(item, default=str, ensure_ascii=False))
+                buffer.write("\n")
+            extension = "jsonl"
+        else:
+            # the event's own fields first, then anything extra (such as coalesced change counts)
+            columns = dict.fromkeys(pending.event.fields)
+            for item in pending.items:
+                for key in item:
+                    if key not in columns:
+                        columns[key] = None
+            writer = csv.DictWriter(buffer, fieldnames=list(columns), restval="")
+            writer.writeheader()
+            writer.writerows(pending.items)
+            extension = "csv"
+        return gzip.compress(buffer.getvalue().encode(), compresslevel=6), f"{pending.event.name}-{stamp}.{extension}.gz"
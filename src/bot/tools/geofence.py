@@ -0,0 +1,164 @@
+import math
+import time
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = 111.32
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; works elementwise on NumPy arrays."""
+    lat1, lon1, lat2, lon2 = (np.radians(a) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class Zone:
+    """A restricted area: a circle (centre + radius) or a lat/lon polygon."""
+    __slots__ = ("name", "kind", "lat", "lon", "radius_km", "poly_lat", "poly_lon", "bbox")
+
+    def __init__(self, spec: dict):
+        self.name = spec["name"]
+        self.kind = spec.get("type", "circle")
+        if self.kind == "circle":
+            self.lat = float(spec["lat"])
+            self.lon = float(spec["lon"])
+            self.radius_km = float(spec["radiusKm"])
+            dlat = self.radius_km / KM_PER_DEG_LAT
+            dlon = self.radius_km / max(KM_PER_DEG_LAT * math.cos(math.radians(self.lat)), 1e-6)
+            self.bbox = (self.lat - dlat, self.lon - dlon, self.lat + dlat, self.lon + dlon)
+        elif self.kind == "polygon":
+            points = np.asarray(spec["points"], dtype=np.float64)
+            self.poly_lat = points[:, 0]
+            self.poly_lon = points[:, 1]
+            self.bbox = (self.poly_lat.min(), self.poly_lon.min(), self.poly_lat.max(), self.poly_lon.max())
+        else:
+            raise ValueError(f"Unknown geofence zone type '{self.kind}' for zone '{self.name}'")
+
+    def contains(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        if self.kind == "circle":
+            return haversine_km(lat, lon, self.lat, self.lon) <= self.radius_km
+        # even-odd ray casting, vectorised over the points and looped over the edges
+        inside = np.zeros(lat.shape, dtype=bool)
+        ys, xs = self.poly_lat, self.poly_lon
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for i in range(len(ys)):
+                y1, x1, y2, x2 = ys[i - 1], xs[i - 1], ys[i], xs[i]
+                crosses = (y1 > lat) != (y2 > lat)
+                inside ^= crosses & (lon < (x2 - x1) * (lat - y1) / (y2 - y1) + x1)
+        return inside
+
+
+class GeofenceEngine:
+    """
+    Checks whole batches of teleport events at once.
+
+    Zones are bucketed into a lat/lon grid, so each position is only tested against
+    the zones whose bounding box touches its cell. Every test is a NumPy operation over
+    all the positions that share a candidate zone. Alerts are raised for entering a
+    zone, for a single jump longer than max_jump_km, and for consecutive positions of
+    one account implying a ground speed above max_speed_kmh.
+    """
+
+    def __init__(self, zones: list[dict], max_jump_km: float = 15000.0, max_speed_kmh: float = 4000.0,
+                 min_speed_check_km: float = 50.0, cell_deg: float = 1.0):
+        self.zones = [Zone(spec) for spec in zones]
+        self.max_jump_km = max_jump_km
+        self.max_speed_kmh = max_speed_kmh
+        self.min_speed_check_km = min_speed_check_km
+        self.cell_deg = cell_deg
+        self._lon_cells = int(math.ceil(360 / cell_deg)) + 1
+        self.grid: dict[int, list[int]] = {}
+        for z, zone in enumerate(self.zones):
+            lat0, lon0, lat1, lon1 = zone.bbox
+            for cy in range(math.floor(lat0 / cell_deg), math.floor(lat1 / cell_deg) + 1):
+                for cx in range(math.floor(lon0 / cell_deg), math.floor(lon1 / cell_deg) + 1):
+                    self.grid.setdefault(self._cell_key(cy, cx), []).append(z)
+        # acid -> (lat, lon, time) where the account's last teleport landed
+        self.last_seen: dict[str, tuple[float, float, float]] = {}
+
+    def _cell_key(self, cy, cx):
+        return cy * self._lon_cells + cx
+
+    def zones_containing(self, lat: np.ndarray, lon: np.ndarray) -> dict[int, np.ndarray]:
+        """zone index -> boolean mask of which positions fall inside it (only zones with a hit)."""
+        if not self.zones or lat.size == 0:
+            return {}
+        keys = self._cell_key(np.floor(lat / self.cell_deg).astype(np.int64), np.floor(lon / self.cell_deg).astype(np.int64))
+        cells, inverse = np.unique(keys, return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(cells) + 1))
+
+        # gathers, per zone, every position whose cell the zone touches
+        candidates: dict[int, list[np.ndarray]] = {}
+        for k, cell in enumerate(cells.tolist()):
+            zone_ids = self.grid.get(cell)
+            if zone_ids:
+                points = order[bounds[k]:bounds[k + 1]]
+                for z in zone_ids:
+                    candidates.setdefault(z, []).append(points)
+
+        hits = {}
+        for z, parts in candidates.items():
+            points = np.concatenate(parts)
+            inside = self.zones[z].contains(lat[points], lon[points])
+            if inside.any():
+                mask = np.zeros(lat.shape, dtype=bool)
+                mask[points[inside]] = True
+                hits[z] = mask
+        return hits
+
+    def check(self, items: list, now: float | None = None, times: list[float] | None = None) -> list[dict]:
+        """
+        Alerts for a batch of teleport events, oldest first.
+
+        times gives each event's own time in seconds (when it was received); without it
+        every event is taken to have happened at now. The speed check measures how far an
+        account moved between teleports, from where the previous one left it to where
+        this one started, so the jump being reported is never counted as travel.
+        """
+        if not items:
+            return []
+        now = time.time() if now is None else now
+        acids = [str(item["acid"]) for item in items]
+        old_lat = np.fromiter((item["oldLatitude"] for item in items), dtype=np.float64, count=len(items))
+        old_lon = np.fromiter((item["oldLongitude"] for item in items), dtype=np.float64, count=len(items))
+        new_lat = np.fromiter((item["newLatitude"] for item in items), dtype=np.float64, count=len(items))
+        new_lon = np.fromiter((item["newLongitude"] for item in items), dtype=np.float64, count=len(items))
+        stamps = [now] * len(items) if times is None else [float(t) for t in times]
+        alerts = []
+
+        # single impossible jumps
+        jump = haversine_km(old_lat, old_lon, new_lat, new_lon)
+        for i in np.nonzero(jump > self.max_jump_km)[0].tolist():
+            alerts.append({"kind": "jump", "acid": acids[i], "lat": float(new_lat[i]), "lon": float(new_lon[i]), "distance": float(jump[i])})
+
+        # implied speed since each account's previous teleport, earlier ones in this batch included
+        prev = []
+        landed = {}
+        for acid, lat, lon, stamp in zip(acids, new_lat.tolist(), new_lon.tolist(), stamps):
+            prev.append(landed.get(acid) or self.last_seen.get(acid))
+            landed[acid] = (lat, lon, stamp)
+        known = np.fromiter((p is not None for p in prev), dtype=bool, count=len(prev))
+        if known.any():
+            idx = np.nonzero(known)[0]
+            prev_lat = np.array([prev[i][0] for i in idx.tolist()])
+            prev_lon = np.array([prev[i][1] for i in idx.tolist()])
+            hours = np.maximum(np.array([stamps[i] - prev[i][2] for i in idx.tolist()]), 1.0) / 3600
+            moved = haversine_km(prev_lat, prev_lon, old_lat[idx], old_lon[idx])
+            fast = (moved > self.min_speed_check_km) & (moved / hours > self.max_speed_kmh)
+            for j in np.nonzero(fast)[0].tolist():
+                i = int(idx[j])
+                alerts.append({"kind": "speed", "acid": acids[i], "lat": float(old_lat[i]), "lon": float(old_lon[i]),
+                               "distance": float(moved[j]), "speed": float(moved[j] / hours[j])})
+        self.last_seen.update(landed)
+
+        # entries into restricted zones
+        if self.zones:
+            was_inside = self.zones_containing(old_lat, old_lon)
+            for z, mask in self.zones_containing(new_lat, new_lon).items():
+                entered = mask & ~was_inside.get(z, np.zeros(mask.shape, dtype=bool))
+                for i in np.nonzero(entered)[0].tolist():
+                    alerts.append({"kind": "entry", "acid": acids[i], "zone": self.zones[z].name,
+                                   "lat": float(new_lat[i]), "lon": float(new_lon[i]), "distance": float(jump[i])})
+        return alerts
@@ -1,3 +1,5 @@
+import asyncio
+import aiohttp
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -5,19 +7,16 @@ import json
 import uuid
 import time
 import logging
-import traceback
 import urllib3
+from .metrics import metrics
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# no handler of its own: records go through the process-wide queued handler (tools.asyncLogging)
 log = logging.getLogger(__name__)
-log.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
-log.addHandler(handler)
 
 
 def make_session() -> requests.Session:
-    """Create a Session with a urllib3 Retry on POST + Connection: close."""
+    """Create a keep-alive Session with a urllib3 Retry on POST."""
     s = requests.Session()
 
     retry_cfg = Retry(
@@ -28,11 +27,11 @@ def make_session() -> requests.Session:
         raise_on_status=False,      # let us handle HTTPError manually
         respect_retry_after_header=True,
     )
-    adapter = HTTPAdapter(max_retries=retry_cfg)
+    # connections are pooled and reused; one the server closed fails as a RequestException
+    # and safe_post rebuilds the session, so there is no need for Connection: close
+    adapter = HTTPAdapter(max_retries=retry_cfg, pool_maxsize=8)
     s.mount("https://", adapter)
-
-    # avoid stale TLS sockets
-    s.headers.update({"Connection": "close"})
+    s.mount("http://", adapter)
     return s
 
 
@@ -84,12 +83,12 @@ def safe_post(
             code = getattr(resp, "status_code", "?")
             log.error("[req %s] JSON decode error from %s (status %s): %s", req_id, url, code, jde)
             log.error("[req %s] Response preview: %r", req_id, resp.text[:300] if resp is not None else None)
-            traceback.print_exc()
+            log.debug("[req %s] JSON decode traceback", req_id, exc_info=True)
 
         # ---------- retry on network / HTTP errors ----------------------------
         except requests.RequestException as re:
             log.error("[req %s] RequestException attempt %d: %s", req_id, attempt + 1, re)
-            traceback.print_exc()
+            log.debug("[req %s] RequestException traceback", req_id, exc_info=True)
 
             if reset_session_on_error:
                 log.info("Re-initialising HTTP session (possible stale socket)")
@@ -107,4 +106,216 @@ def safe_post(
 
     # All retries failed
     log.error("[req %s] safe_post: gave up after %d attempts", req_id, max_json_retries + 1)
-    return None
\ No newline at end of file
+    return None
+
+# ---------------------------------------------------------------------------
+# asyncio client: one pooled keep-alive session for the whole process
+# ---------------------------------------------------------------------------
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# latency bookkeeping, split by whether the request paid for a new TCP+TLS connection
+http_stats = {
+    "requests": 0,
+    "failures": 0,
+    "stale_retries": 0,
+    "new_connections": 0,
+    "reused_connections": 0,
+    "connect_seconds_total": 0.0,
+    "new_conn_request_seconds_total": 0.0,
+    "reused_conn_request_seconds_total": 0.0,
+}
+
+_async_session: aiohttp.ClientSession | None = None
+
+metrics.callback(
+    "stableintel_geofs_http_total", "GeoFS HTTP pool counters (requests, failures, stale_retries, new/reused connections).",
+    lambda: {k: v for k, v in http_stats.items() if not k.endswith("_total")}, ("stat",), kind="counter",
+)
+
+
+async def _on_connection_create_start(session, ctx, params):
+    ctx.trace_request_ctx["connect_t0"] = time.perf_counter()
+
+
+async def _on_connection_create_end(session, ctx, params):
+    ctx.trace_request_ctx["connect"] = time.perf_counter() - ctx.trace_request_ctx["connect_t0"]
+
+
+async def _on_connection_reuseconn(session, ctx, params):
+    ctx.trace_request_ctx["reused"] = True
+
+
+def make_async_session() -> aiohttp.ClientSession:
+    """Create a ClientSession with a keep-alive pool and connection tracing."""
+    trace = aiohttp.TraceConfig()
+    trace.on_connection_create_start.append(_on_connection_create_start)
+    trace.on_connection_create_end.append(_on_connection_create_end)
+    trace.on_connection_reuseconn.append(_on_connection_reuseconn)
+    connector = aiohttp.TCPConnector(
+        limit=8,
+        # closes idle sockets before the server's own idle timeout, so reuse rarely hits a dead one
+        keepalive_timeout=15,
+    )
+    return aiohttp.ClientSession(connector=connector, trace_configs=[trace])
+
+
+def get_async_session() -> aiohttp.ClientSession:
+    global _async_session
+    if _async_session is None or _async_session.closed:
+        _async_session = make_async_session()
+    return _async_session
+
+
+async def close_async_session() -> None:
+    global _async_session
+    if _async_session is not None and not _async_session.closed:
+        await _async_session.close()
+    _async_session = None
+
+
+def _record(ctx: dict, elapsed: float) -> None:
+    http_stats["requests"] += 1
+    if ctx.get("reused"):
+        http_stats["reused_connections"] += 1
+        http_stats["reused_conn_request_seconds_total"] += elapsed
+    elif "connect" in ctx:
+        http_stats["new_connections"] += 1
+        http_stats["connect_seconds_total"] += ctx["connect"]
+        http_stats["new_conn_request_seconds_total"] += elapsed
+
+
+def latency_summary() -> dict:
+    """Average request latency on new vs reused connections, and the handshake time saved by reuse."""
+    new = http_stats["new_connections"]
+    reused = http_stats["reused_connections"]
+    avg_connect = http_stats["connect_seconds_total"] / new if new else 0.0
+    return {
+        "requests": http_stats["requests"],
+        "failures": http_stats["failures"],
+        "stale_retries": http_stats["stale_retries"],
+        "new_connections": new,
+        "reused_connections": reused,
+        "avg_new_conn_request_ms": 1000 * http_stats["new_conn_request_seconds_total"] / new if new else None,
+        "avg_reused_conn_request_ms": 1000 * http_stats["reused_conn_request_seconds_total"] / reused if reused else None,
+        "avg_connect_ms": 1000 * avg_connect,
+        "handshake_seconds_saved": avg_connect * reused,
+    }
+
+
+async def async_safe_post(
+    url: str,
+    payload: dict,
+    timeout: tuple[int, int] = (5, 15),
+    max_json_retries: int = 2,
+    **request_kwargs,            #  <-- forward anything else (cookies, headers…)
+) -> dict | None:
+    """
+    Async counterpart of safe_post over the shared keep-alive session.
+
+    • A request that fails on a reused socket the server already closed is retried
+      once straight away on a fresh connection (stale-socket detection)
+    • 429/5xx, network errors and bad JSON are retried with exponential back-off
+    • Returns parsed JSON on success, or None on total failure
+    """
+    req_id = uuid.uuid4().hex[:8]
+    client_timeout = aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+    stale_retry_used = False
+    attempt = 0
+    while attempt <= max_json_retries:
+        ctx = {}
+        session = get_async_session()
+        try:
+            t0 = time.perf_counter()
+            async with session.post(url, json=payload, timeout=client_timeout, trace_request_ctx=ctx, **request_kwargs) as resp:
+                text = await resp.text()
+                elapsed = time.perf_counter() - t0
+                _record(ctx, elapsed)
+                if resp.status in RETRY_STATUSES:
+                    raise aiohttp.ClientResponseError(resp.request_info, resp.history, status=resp.status, message=text[:100])
+                if text == "":
+                    http_stats["failures"] += 1
+                    log.error("[req %s] Empty response text from %s in %.2fs; no JSON to parse", req_id, url, elapsed)
+                    return None
+                resp.raise_for_status()
+                j = json.loads(text)
+                log.debug(
+                    "[req %s] POST %s %s in %.3fs (reused=%s connect=%.3fs len=%s)",
+                    req_id, url, resp.status, elapsed, ctx.get("reused", False), ctx.get("connect", 0.0), len(text),
+                )
+                return j
+
+        # ---------- stale keep-alive socket: retry at once on a new connection -----
+        except (aiohttp.ServerDisconnectedError, aiohttp.ClientOSError) as e:
+            if ctx.get("reused") and not stale_retry_used:
+                stale_retry_used = True
+                http_stats["stale_retries"] += 1
+                log.info("[req %s] Stale pooled connection (%s); retrying on a fresh one", req_id, e)
+                continue
+            log.error("[req %s] Connection error attempt %d: %s", req_id, attempt + 1, e)
+
+        # ---------- retry on bad JSON -----------------------------------------
+        except json.JSONDecodeError as jde:
+            log.error("[req %s] JSON decode error from %s: %s", req_id, url, jde)
+
+        # ---------- retry on network / HTTP errors ----------------------------
+        except aiohttp.ClientResponseError as e:
+            log.error("[req %s] HTTP %s from %s attempt %d", req_id, e.status, url, attempt + 1)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            log.error("[req %s] Request error attempt %d: %r", req_id, attempt + 1, e)
+
+        http_stats["failures"] += 1
+        # ---------- back-off before the next loop iteration -------------------
+        if attempt < max_json_retries:
+            sleep_sec = 2 ** attempt            # 1 s, 2 s, 4 s …
+            log.info("[req %s] Sleeping %ds before retry", req_id, sleep_sec)
+            await asyncio.sleep(sleep_sec)
+        attempt += 1
+
+    # All retries failed
+    log.error("[req %s] async_safe_post: gave up after %d attempts", req_id, max_json_retries + 1)
+    return None
+
+
+# answers that say the server turned the request away without acting on it
+REFUSED_STATUSES = {429, 503}
+
+
+async def async_post_once(
+    url: str,
+    payload: dict,
+    timeout: tuple[int, int] = (5, 15),
+    **request_kwargs,
+) -> tuple[dict | None, bool]:
+    """
+    One POST with no retries of any kind, for requests that must not reach the server twice.
+
+    Returns (parsed JSON, False) on success and (None, refused) on failure. refused is True
+    only when the server certainly did not act on the request: no connection could be made,
+    or it answered 429/503. After a timeout, a dropped connection, another error status or an
+    unusable body it may well have, so refused is False.
+    """
+    req_id = uuid.uuid4().hex[:8]
+    client_timeout = aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+    ctx = {}
+    session = get_async_session()
+    try:
+        t0 = time.perf_counter()
+        async with session.post(url, json=payload, timeout=client_timeout, trace_request_ctx=ctx, **request_kwargs) as resp:
+            text = await resp.text()
+            elapsed = time.perf_counter() - t0
+            _record(ctx, elapsed)
+            if resp.status >= 400:
+                http_stats["failures"] += 1
+                log.error("[req %s] HTTP %s from %s in %.2fs", req_id, resp.status, url, elapsed)
+                return None, resp.status in REFUSED_STATUSES
+            j = json.loads(text)
+            log.debug("[req %s] POST %s %s in %.3fs (reused=%s len=%s)", req_id, url, resp.status, elapsed, ctx.get("reused", False), len(text))
+            return j, False
+    except (aiohttp.ClientConnectorError, aiohttp.ConnectionTimeoutError) as e:
+        http_stats["failures"] += 1
+        log.error("[req %s] Could not connect to %s: %r", req_id, url, e)
+        return None, True
+    except (aiohttp.ClientError, asyncio.TimeoutError, json.JSONDecodeError) as e:
+        http_stats["failures"] += 1
+        log.error("[req %s] Request to %s failed after it was sent: %r", req_id, url, e)
+        return None, False
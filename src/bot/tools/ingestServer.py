@@ -0,0 +1,137 @@
+import json
+import logging
+import time
+import msgspec
+from aiohttp import web
+from .eventQueue import QueueFull
+from .metrics import metrics
+
+INGEST_REQUESTS = metrics.counter("stableintel_ingest_requests_total", "Ingestion requests by event type and status.", ("event_type", "status"))
+INGEST_EVENTS = metrics.counter("stableintel_ingest_events_total", "Events accepted by the ingestion routes.", ("event_type",))
+INGEST_REJECTED = metrics.counter("stableintel_ingest_items_rejected_total", "Items rejected by payload validation.", ("event_type",))
+INGEST_SECONDS = metrics.histogram("stableintel_ingest_seconds", "Time to parse, spool and enqueue a batch.", ("event_type",))
+# what an ingestion worker process reports to the bot
+INGEST_METRICS = (INGEST_REQUESTS, INGEST_EVENTS, INGEST_REJECTED, INGEST_SECONDS)
+
+
+class IngestServer:
+    """Event ingestion server that runs on the bot's own asyncio loop."""
+
+    def __init__(
+        self,
+        handler,
+        routes: dict[str, str],
+        host: str = "127.0.0.1",
+        port: int = 5002,
+        max_body: int = 8 * 1024 * 1024,
+        keepalive_timeout: float = 75.0,
+        logger: logging.Logger | None = None,
+        decode=None,
+        reuse_port: bool = False,
+    ):
+        # handler is awaited as handler(event_type, data, received_at) for every accepted batch,
+        # received_at being the perf_counter() time the request arrived; what it returns, the batch's
+        # trace id, goes back to the producer in an X-Trace-Id header;
+        # routes maps paths to event types and is read per request, so it can change at runtime.
+        # decode(event_type, body) returns (valid items, per-item errors); without it bodies are plain JSON lists
+        self.handler = handler
+        self.routes = routes
+        self.decode = decode or self._decode_json
+        self.host = host
+        self.port = port
+        self.max_body = max_body
+        self.keepalive_timeout = keepalive_timeout
+        # lets several ingestion worker processes listen on the same port
+        self.reuse_port = reuse_port
+        self.log = logger or logging.getLogger(__name__)
+        # set on shutdown; from then on every batch is refused so producers retry against the next instance
+        self.draining = False
+        self.app = self.build_app()
+        self._runner = None
+
+    def build_app(self) -> web.Application:
+        # client_max_size makes aiohttp answer 413 before the body is buffered
+        app = web.Application(client_max_size=self.max_body)
+        app.router.add_post("/{route:.+}", self._route)
+        return app
+
+    async def _route(self, request: web.Request) -> web.Response:
+        event_type = self.routes.get(request.path)
+        if event_type is None:
+            return web.Response(status=404, text="Unknown event route.")
+        if self.draining:
+            INGEST_REQUESTS.inc(event_type, 503)
+            return web.Response(status=503, text="Shutting down.", headers={"Retry-After": "5", "Connection": "close"})
+        t0 = time.perf_counter()
+        response = await self._ingest(request, event_type, t0)
+        INGEST_REQUESTS.inc(event_type, response.status)
+        INGEST_SECONDS.observe(time.perf_counter() - t0, event_type)
+        return response
+
+    @staticmethod
+    def _decode_json(event_type: str, body: bytes) -> tuple[list, list[str]]:
+        data = json.loads(body)
+        if not isinstance(data, list):
+            raise msgspec.ValidationError("Expected a list.")
+        return data, []
+
+    async def _ingest(self, request: web.Request, event_type: str, received_at: float) -> web.Response:
+        body = await request.read()
+        try:
+            data, errors = self.decode(event_type, body)
+        except msgspec.ValidationError:
+            return web.Response(status=400, text="Invalid data format. Expected a list.")
+        except (msgspec.DecodeError, json.JSONDecodeError, UnicodeDecodeError):
+            return web.Response(status=400, text="Invalid JSON body.")
+        if errors:
+            INGEST_REJECTED.inc(event_type, amount=len(errors))
+            self.log.warning(f"Rejected {len(errors)} of {len(errors) + len(data)} '{event_type}' item(s); first: {errors[0]}")
+        headers = {}
+        if data:
+            try:
+                trace = await self.handler(event_type, data, received_at)
+            except QueueFull:
+                return web.Response(status=429, text=f"Queue for '{event_type}' is full.", headers={"Retry-After": "5"})
+            except ConnectionError:
+                # only raised by an ingestion worker whose bot is unreachable or shutting down
+                return web.Response(status=503, text="Bot unavailable.", headers={"Retry-After": "5"})
+            INGEST_EVENTS.inc(event_type, amount=len(data))
+            if trace:
+                headers["X-Trace-Id"] = trace
+        if not errors:
+            return web.Response(status=204, headers=headers)
+        # valid items are kept even when others are rejected; the producer gets the counts and first errors
+        return web.json_response(
+            {"accepted": len(data), "rejected": len(errors), "errors": errors[:10]},
+            status=200 if data else 400,
+            headers=headers,
+        )
+
+    def add_json_route(self, path: str, provider) -> None:
+        """Expose provider() as a JSON GET endpoint, for operator status pages."""
+        async def route(request: web.Request) -> web.Response:
+            return web.json_response(provider())
+        self.app.router.add_get(path, route)
+
+    def add_text_route(self, path: str, provider, content_type: str = "text/plain") -> None:
+        """Expose provider() as a plain text GET endpoint, e.g. the Prometheus /metrics page."""
+        async def route(request: web.Request) -> web.Response:
+            return web.Response(text=provider(), content_type=content_type)
+        self.app.router.add_get(path, route)
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(
+            self.app,
+            access_log=None,
+            keepalive_timeout=self.keepalive_timeout,
+            shutdown_timeout=5.0,
+        )
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port, reuse_address=True, reuse_port=self.reuse_port or None)
+        await site.start()
+        self.log.log(20, f"Ingestion server listening on http://{self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
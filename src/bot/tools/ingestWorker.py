@@ -0,0 +1,370 @@
+"""
+Out-of-process ingestion.
+
+With ingestWorkers > 0 the bot starts that many worker processes (python -m
+tools.ingestWorker). Each one runs an IngestServer on the shared ingestion port
+(SO_REUSEPORT, so the kernel spreads connections across them), does the body
+parsing and validation there, and forwards every accepted batch to the bot as a
+length-prefixed msgpack frame over a Unix domain socket. The bot answers each frame
+once the batch is spooled, so producers still only get a 204 for durable batches and
+a 429 when the queue is full.
+
+Frames are a 4-byte big-endian length followed by a msgpack array:
+    worker -> bot   [request id, event type, received (unix time), JSON payload of the validated items]
+    worker -> bot   [0, None, sent (unix time), ingest metric samples since the previous such frame]
+    bot -> worker   [request id, status, trace id of the spooled batch ("" unless accepted)]
+
+A frame that does not decode is dropped and the connection kept. A worker exits once
+its connection to the bot ends, so workers never outlive the bot that started them.
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import signal
+import struct
+import sys
+import time
+import msgspec
+
+from .eventQueue import QueueFull
+from .ingestServer import INGEST_METRICS
+from .metrics import metrics
+
+STATUS_OK = 0
+STATUS_FULL = 1
+STATUS_UNAVAILABLE = 2
+
+_HEADER = struct.Struct(">I")
+# frames above this are a protocol error; well over the largest body ingestMaxBodyBytes allows
+MAX_FRAME = 256 * 1024 * 1024
+# how often a worker sends its ingest metrics to the bot
+METRICS_INTERVAL = 1.0
+
+_WorkerFrame = tuple[int, str | None, float, bytes | list]
+_BotFrame = tuple[int, int, str]
+
+BRIDGE_FRAMES = metrics.counter("stableintel_ingest_bridge_frames_total", "Batches received from ingestion workers by status.", ("status",))
+WORKER_RESTARTS = metrics.counter("stableintel_ingest_worker_restarts_total", "Ingestion worker processes restarted after exiting.")
+
+_STATUS_NAMES = {STATUS_OK: "ok", STATUS_FULL: "full", STATUS_UNAVAILABLE: "unavailable"}
+
+
+class _FrameWriter:
+    # frames written during one loop iteration go out in a single write
+    __slots__ = ("writer", "_outbox", "_encoder")
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self._outbox = []
+        self._encoder = msgspec.msgpack.Encoder()
+
+    def send(self, message) -> None:
+        body = self._encoder.encode(message)
+        if not self._outbox:
+            asyncio.get_running_loop().call_soon(self._flush)
+        self._outbox.append(_HEADER.pack(len(body)))
+        self._outbox.append(body)
+
+    def _flush(self) -> None:
+        if self._outbox and not self.writer.is_closing():
+            self.writer.write(b"".join(self._outbox))
+        self._outbox.clear()
+
+
+async def _read_frames(reader: asyncio.StreamReader, frame_type, log: logging.Logger):
+    decoder = msgspec.msgpack.Decoder(frame_type)
+    while True:
+        try:
+            header = await reader.readexactly(_HEADER.size)
+        except asyncio.IncompleteReadError:
+            return
+        (length,) = _HEADER.unpack(header)
+        if length > MAX_FRAME:
+            raise ValueError(f"Frame of {length} bytes exceeds the {MAX_FRAME} byte limit.")
+        body = await reader.readexactly(length)
+        try:
+            frame = decoder.decode(body)
+        except msgspec.DecodeError as e:
+            # the length prefix keeps the stream in step, so only this frame is lost
+            BRIDGE_FRAMES.inc("invalid")
+            log.warning(f"Dropped an undecodable {length} byte bridge frame: {e}")
+            continue
+        yield frame
+
+
+class IngestBridge:
+    """
+    Bot side of out-of-process ingestion: owns the worker processes and the Unix socket.
+
+    handler is awaited as handler(event_type, data, received_at, payload) for every
+    forwarded batch, received_at being a perf_counter() time like IngestServer passes
+    and payload the batch's JSON text, so it does not need encoding again to be spooled.
+    Whatever trace id it returns is passed back to the worker for the producer.
+    """
+
+    def __init__(
+        self,
+        handler,
+        socket_path: str,
+        workers: int,
+        config_path: str,
+        logger: logging.Logger | None = None,
+    ):
+        self.handler = handler
+        self.socket_path = os.path.abspath(socket_path)
+        self.workers = workers
+        self.config_path = config_path
+        self.log = logger or logging.getLogger(__name__)
+        # set on shutdown; from then on every frame is answered with STATUS_UNAVAILABLE
+        self.draining = False
+        self.processes: dict[int, asyncio.subprocess.Process] = {}
+        self._server = None
+        self._keepers = []
+        self._writers: set[asyncio.StreamWriter] = set()
+        self._decoder = msgspec.json.Decoder()
+
+    async def start(self) -> None:
+        if os.path.dirname(self.socket_path):
+            os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+        # a socket file left by a crashed instance would make the bind fail
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._serve, self.socket_path)
+        self._keepers = [asyncio.create_task(self._keep_worker(index)) for index in range(self.workers)]
+        self.log.log(20, f"Ingestion bridge listening on {self.socket_path} with {self.workers} worker process(es)")
+
+    async def _keep_worker(self, index: int) -> None:
+        # restarts a worker that exits for any reason other than shutdown
+        bot_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, (bot_dir, os.environ.get("PYTHONPATH"))))}
+        while True:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "tools.ingestWorker",
+                "--socket", self.socket_path, "--config", self.config_path, "--index", str(index),
+                env=env,
+            )
+            self.processes[index] = process
+            code = await process.wait()
+            if self.draining:
+                return
+            WORKER_RESTARTS.inc()
+            self.log.warning(f"Ingestion worker {index} exited with code {code}; restarting")
+            await asyncio.sleep(1)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        out = _FrameWriter(writer)
+        tasks = set()
+        self._writers.add(writer)
+        try:
+            async for request_id, event_type, received, payload in _read_frames(reader, _WorkerFrame, self.log):
+                if request_id == 0:
+                    # the worker's ingest metrics, shown on this process's /metrics page
+                    metrics.merge(payload)
+                    continue
+                # frames are handled concurrently so their spool appends share group commits
+                task = asyncio.create_task(self._handle(out, request_id, event_type, received, payload))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, ValueError) as e:
+            self.log.warning(f"Ingestion worker connection dropped: {e}")
+        finally:
+            if tasks:
+                await asyncio.wait(tasks)
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _handle(self, out: _FrameWriter, request_id: int, event_type: str, received: float, payload: bytes) -> None:
+        status = STATUS_OK
+        trace = None
+        if self.draining:
+            status = STATUS_UNAVAILABLE
+        else:
+            # the worker's wall clock time, moved onto this process's perf_counter
+            received_at = time.perf_counter() - max(0.0, time.time() - received)
+            try:
+                trace = await self.handler(event_type, self._decoder.decode(payload), received_at, payload.decode())
+            except QueueFull:
+                status = STATUS_FULL
+            except Exception as e:
+                self.log.log(40, f"Forwarded '{event_type}' batch failed: {type(e).__name__}: {e}")
+                status = STATUS_UNAVAILABLE
+        BRIDGE_FRAMES.inc(_STATUS_NAMES[status])
+        out.send((request_id, status, trace or ""))
+
+    async def stop(self, timeout: float = 10) -> None:
+        """Stop the workers, waiting up to timeout for all of them together before killing the rest."""
+        self.draining = True
+        running = [process for process in self.processes.values() if process.returncode is None]
+        for process in running:
+            process.send_signal(signal.SIGTERM)
+        if running:
+            waits = [asyncio.create_task(process.wait()) for process in running]
+            _, late = await asyncio.wait(waits, timeout=timeout)
+            for process in running:
+                if process.returncode is None:
+                    self.log.warning(f"Ingestion worker {process.pid} did not exit within {timeout:.1f}s; killing it")
+                    process.kill()
+            if late:
+                # SIGKILL is not ignorable, so this only waits for the kernel to reap them
+                await asyncio.wait(late)
+        for keeper in self._keepers:
+            keeper.cancel()
+        # a worker still connected (not started by this bridge, or one that ignored SIGTERM) exits on the EOF
+        for writer in list(self._writers):
+            writer.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class BridgeClient:
+    """Worker side: forwards batches to the bot and waits for its answer."""
+
+    def __init__(self, socket_path: str, logger: logging.Logger | None = None):
+        self.socket_path = socket_path
+        self.log = logger or logging.getLogger(__name__)
+        self.out = None
+        self.pending: dict[int, asyncio.Future] = {}
+        self.connected = asyncio.Event()
+        self._ids = itertools.count(1)
+        self._encoder = msgspec.json.Encoder()
+
+    async def run(self) -> None:
+        """
+        Connects with backoff and serves the connection; returns once it ends.
+
+        The bot closing the socket means it stopped or died, and the worker should go
+        with it rather than keep the port. Waiting for the first connection also gives
+        up if the process that started the worker is gone.
+        """
+        parent = os.getppid()
+        delay = 0.1
+        while True:
+            if os.getppid() != parent:
+                self.log.warning("Bot process exited before the bridge connected")
+                return
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.socket_path)
+                break
+            except OSError as e:
+                self.log.debug(f"Bridge socket {self.socket_path} not ready: {e}")
+                await asyncio.sleep(delay)
+                delay = min(5.0, delay * 2)
+        self.out = _FrameWriter(writer)
+        self.connected.set()
+        try:
+            async for request_id, status, trace in _read_frames(reader, _BotFrame, self.log):
+                future = self.pending.pop(request_id, None)
+                if future is not None and not future.done():
+                    future.set_result((status, trace))
+            self.log.warning("Bridge connection closed by the bot")
+        except (ConnectionError, ValueError) as e:
+            self.log.warning(f"Bridge connection lost: {e}")
+        finally:
+            self.connected.clear()
+            self.out = None
+            writer.close()
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Bot connection lost."))
+            self.pending.clear()
+
+    def send_metrics(self) -> None:
+        # samples stay in this process until they could be handed to the bot
+        if self.out is not None:
+            entries = metrics.collect(INGEST_METRICS)
+            if entries:
+                self.out.send((0, None, time.time(), entries))
+
+    async def report_metrics(self, interval: float = METRICS_INTERVAL) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.send_metrics()
+
+    async def forward(self, event_type: str, data: list, received_at: float) -> str:
+        """IngestServer handler: returns the trace id, or raises QueueFull or ConnectionError like the in-process path would."""
+        if self.out is None:
+            raise ConnectionError("Not connected to the bot.")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        received = time.time() - (time.perf_counter() - received_at)
+        self.out.send((request_id, event_type, received, self._encoder.encode(data)))
+        status, trace = await future
+        if status == STATUS_FULL:
+            raise QueueFull(event_type)
+        if status != STATUS_OK:
+            raise ConnectionError("Bot is not accepting events.")
+        return trace
+
+
+async def run_worker(socket_path: str, config_path: str, index: int) -> None:
+    from .asyncLogging import setup_logging, apply_levels
+    from .eventRegistry import EventRegistry
+    from .ingestServer import IngestServer
+
+    registry = EventRegistry(config_path)
+    config = registry.config
+    sampling = config.get("logSampling", {})
+    setup_logging(config.get("logFormat", "json"), sampling.get("burst", 5), sampling.get("windowSeconds", 60))
+    apply_levels(config.get("logLevels"))
+    log = logging.getLogger(f"eventhorizon.ingest.{index}")
+
+    client = BridgeClient(socket_path, log)
+    server = IngestServer(
+        client.forward,
+        registry.routes,
+        host=config.get("ingestHost", "127.0.0.1"),
+        port=config.get("ingestPort", 5002),
+        max_body=config.get("ingestMaxBodyBytes", 8 * 1024 * 1024),
+        keepalive_timeout=config.get("ingestKeepAliveSeconds", 75),
+        logger=log,
+        decode=registry.decode,
+        reuse_port=True,
+    )
+    connection = asyncio.create_task(client.run())
+    tasks = [
+        connection,
+        asyncio.create_task(client.report_metrics()),
+        # routes and field types follow config.json edits, like in the bot
+        asyncio.create_task(registry.watch(None, config.get("configReloadSeconds", 5))),
+    ]
+    await asyncio.wait_for(client.connected.wait(), 30)
+    await server.start()
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stopping.set)
+    # losing the bot connection stops the worker as well
+    connection.add_done_callback(lambda _: stopping.set())
+    await stopping.wait()
+    # the bot stops answering with 204 first, so whatever is still in flight gets a 503
+    server.draining = True
+    await server.stop()
+    client.send_metrics()
+    await asyncio.sleep(0)
+    for task in tasks:
+        task.cancel()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ingestion worker process")
+    parser.add_argument("--socket", required=True, help="Unix socket the bot listens on")
+    parser.add_argument("--config", default="src/bot/config.json")
+    parser.add_argument("--index", type=int, default=0)
+    args = parser.parse_args()
+    from .asyncLogging import stop_logging
+    try:
+        asyncio.run(run_worker(args.socket, args.config, args.index))
+    finally:
+        stop_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import math
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, values) -> str:
+    if not labelnames:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)) + "}"
+
+
+class Counter:
+    """
+    Monotonic counter, optionally labelled.
+
+    Metrics are only ever updated from the event loop thread, so a plain dict and int
+    addition is enough: no locks on the hot path.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, *labels) -> None:
+        self.values[labels] = value
+
+
+class CallbackMetric:
+    """Counter or gauge whose samples are read from fn() at scrape time; fn returns {label tuple: value}."""
+
+    def __init__(self, name: str, help: str, fn, labelnames: tuple = (), kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labelnames = labelnames
+        self.kind = kind
+
+    def samples(self):
+        for labels, value in self.fn().items():
+            if not isinstance(labels, tuple):
+                labels = (labels,) if self.labelnames else ()
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # per label set: [bucket counts..., +Inf count], sum
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def add(self, counts: list, total: float, *labels) -> None:
+        # folds in observations made elsewhere, bucketed with the same bounds
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0] = [a + b for a, b in zip(series[0], counts)]
+        series[1] += total
+
+    def samples(self):
+        for labels, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                yield f"{self.name}_bucket", _format_labels(self.labelnames + ("le",), labels + (le,)), cumulative
+            yield f"{self.name}_sum", _format_labels(self.labelnames, labels), total
+            yield f"{self.name}_count", _format_labels(self.labelnames, labels), cumulative
+
+
+class MetricsRegistry:
+    """Named metrics rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        metric = self.metrics.get(name)
+        if metric is None or not isinstance(metric, cls):
+            metric = self.metrics[name] = cls(name, *args, **kwargs)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: tuple = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets)
+
+    def callback(self, name: str, help: str, fn, labelnames: tuple = (), kind: str = "gauge") -> CallbackMetric:
+        # re-registering replaces the callback, so reloaded cogs do not leave stale closures behind
+        metric = self.metrics[name] = CallbackMetric(name, help, fn, labelnames, kind)
+        return metric
+
+    def collect(self, selected) -> list:
+        """
+        Take the samples of the given counters and histograms, resetting them to zero.
+
+        merge() adds the result to another registry; ingestion worker processes use the
+        pair to report their metrics through the bot's /metrics page.
+        """
+        entries = []
+        for metric in selected:
+            if isinstance(metric, Histogram):
+                entries.extend((metric.name, list(labels), counts, total) for labels, (counts, total) in metric.series.items())
+                metric.series.clear()
+            else:
+                entries.extend((metric.name, list(labels), value, None) for labels, value in metric.values.items())
+                metric.values.clear()
+        return entries
+
+    def merge(self, entries) -> None:
+        for name, labels, value, total in entries:
+            metric = self.metrics.get(name)
+            if isinstance(metric, Histogram):
+                metric.add(value, total, *labels)
+            elif isinstance(metric, Counter):
+                metric.inc(*labels, amount=value)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# process-wide registry served at /metrics
+metrics = MetricsRegistry()
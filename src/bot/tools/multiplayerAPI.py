@@ -1,9 +1,14 @@
 # src/shared/multiplayerAPI.py
+import asyncio
 import time
 import logging
-import traceback
 from urllib.parse import unquote_plus
-from .http_client import safe_post
+from .http_client import safe_post, async_safe_post, async_post_once
+from .metrics import metrics
+
+HANDSHAKES = metrics.counter("stableintel_geofs_handshakes_total", "GeoFS handshake attempts by result.", ("result",))
+
+UPDATE_URL = "https://mps.geo-fs.com/update"
 
 
 class MultiplayerAPI:
@@ -53,8 +58,7 @@ class MultiplayerAPI:
                 headers=self.headers,
             )
             if not resp:
-                self.log.warning("[mp] handshake step2 failed in %.2fs; retrying…", time.time() - t0)
-                traceback.print_exc()
+                self.log.warning("[mp] handshake step1 failed in %.2fs; retrying…", time.time() - t0)
                 time.sleep(5)
                 continue
 
@@ -75,8 +79,7 @@ class MultiplayerAPI:
                 cookies={"PHPSESSID": self.sessionID},
                 headers=self.headers,            )
             if not resp2:
-                print("Second handshake call failed, retrying in 5s…")
-                traceback.print_exc()
+                self.log.warning("[mp] handshake step2 failed; retrying in 5s…")
                 time.sleep(5)
                 continue
 
@@ -85,47 +88,6 @@ class MultiplayerAPI:
             self.log.info("[mp] handshake: success myId=%s lastMsgId=%s total=%.2fs", self.myID, self.lastMsgID, time.time() - t0)
             return
 
-    def sendMsg(self, msg: str):
-        """Post a chat message into Geo‑FS."""
-        while True:
-            body = {
-                "origin": "https://www.geo-fs.com",
-                "acid": self.accountID,
-                "sid": self.sessionID,
-                "id": self.myID,
-                "ac": "1",
-                "co": [9999999999999999]*6,
-                "ve": [0.0]*6,
-                "st": {"gr": True, "as": 0},
-                "ti": None,
-                "ac": 1,
-                "co": [0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
-                "ve": [0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
-                "st": {"gr": 1, "as": 0},
-                "ro": {"ad": 0},
-                "ti": int(time.time() * 1000),
-                "m": msg,
-                "ci": self.lastMsgID
-            }
-            start_time = time.time()
-            resp = safe_post(
-                "https://mps.geo-fs.com/update",
-                body,
-                timeout=(5, 15),
-                max_json_retries=2,
-                cookies={"PHPSESSID": self.sessionID},
-                headers=self.headers,
-            )
-            end_time = time.time()
-            print(f"The last request took {end_time - start_time} seconds.")
-            if resp:
-                self.myID = resp.get("myId")
-                return
-
-            print("sendMsg failed, retrying in 5s…")
-            traceback.print_exc()
-            time.sleep(5)
-
     def getMessages(self, max_duration: float = 20.0) -> list[dict]:
         """Fetch latest chat messages and update self.lastMsgID."""
         start = time.time()
@@ -170,7 +132,123 @@ class MultiplayerAPI:
                 return msgs
 
             self.log.warning("[mp] getMessages: request failed in %.2fs (elapsed %.2fs); retrying…", time.time() - t0, time.time() - start)
-            traceback.print_exc()
             if time.time() - start >=max_duration:
                 raise TimeoutError("getMessages: soft deadline exceeded")
-            time.sleep(2)
\ No newline at end of file
+            time.sleep(2)
+
+
+class AsyncMultiplayerAPI(MultiplayerAPI):
+    """
+    Same protocol as MultiplayerAPI, but native asyncio on the pooled keep-alive session.
+
+    Nothing here blocks a thread: waits are asyncio.sleep and every call reuses the
+    shared connection to mps.geo-fs.com instead of paying for a new TLS handshake.
+    """
+
+    def __init__(self, sessionID, accountID, url: str = UPDATE_URL):
+        super().__init__(sessionID, accountID)
+        self.url = url
+
+    def _body(self, msg: str = "", ci=None) -> dict:
+        return {
+            "origin": "https://www.geo-fs.com",
+            "acid": self.accountID,
+            "sid": self.sessionID,
+            "id": self.myID if self.myID is not None else "",
+            "ac": 1,
+            "co": [0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+            "ve": [0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+            "st": {"gr": 1, "as": 0},
+            "ro": {"ad": 0},
+            "ti": int(time.time() * 1000),
+            "m": msg,
+            "ci": self.lastMsgID if ci is None else ci,
+        }
+
+    async def _post(self, body: dict) -> dict | None:
+        return await async_safe_post(
+            self.url,
+            body,
+            timeout=(5, 15),
+            max_json_retries=2,
+            cookies={"PHPSESSID": self.sessionID},
+            headers=self.headers,
+        )
+
+    async def handshake(self):
+        """Initialize connection; populate self.myID and self.lastMsgID."""
+        self.log.info("[mp] handshake: begin")
+        self.myID = None
+        while True:
+            t0 = time.time()
+            resp = await self._post(self._body(ci=0))
+            if not resp:
+                HANDSHAKES.inc("failure")
+                self.log.warning("[mp] handshake step1 failed in %.2fs; retrying…", time.time() - t0)
+                await asyncio.sleep(5)
+                continue
+
+            # first call gives us myID, second call picks up lastMsgId
+            self.myID = resp.get("myId")
+            resp2 = await self._post(self._body(ci=0))
+            if not resp2:
+                HANDSHAKES.inc("failure")
+                self.log.warning("[mp] handshake step2 failed; retrying in 5s…")
+                await asyncio.sleep(5)
+                continue
+
+            self.myID = resp2.get("myId")
+            self.lastMsgID = resp2.get("lastMsgId") or 0
+            HANDSHAKES.inc("success")
+            self.log.info("[mp] handshake: success myId=%s lastMsgId=%s total=%.2fs", self.myID, self.lastMsgID, time.time() - t0)
+            return
+
+    def _read_messages(self, resp: dict) -> list[dict]:
+        self.myID = resp.get("myId")
+        self.lastMsgID = resp.get("lastMsgId") or self.lastMsgID
+        msgs = resp.get("chatMessages", [])
+        for m in msgs:
+            if "msg" in m and m["msg"]:
+                m["msg"] = unquote_plus(m["msg"])
+        return msgs
+
+    async def getMessages(self, max_duration: float = 20.0) -> list[dict]:
+        """Fetch latest chat messages and update self.lastMsgID."""
+        start = time.time()
+        self.log.debug("[mp] getMessages: begin myId=%s lastMsgId=%s", self.myID, self.lastMsgID)
+        while True:
+            t0 = time.time()
+            resp = await self._post(self._body())
+            if resp:
+                msgs = self._read_messages(resp)
+                self.log.debug("[mp] getMessages: ok in %.2fs; msgs=%d lastMsgId=%s", time.time() - t0, len(msgs), self.lastMsgID)
+                return msgs
+
+            self.log.warning("[mp] getMessages: request failed in %.2fs (elapsed %.2fs); retrying…", time.time() - t0, time.time() - start)
+            if time.time() - start >= max_duration:
+                raise TimeoutError("getMessages: soft deadline exceeded")
+            await asyncio.sleep(2)
+
+    async def pollWithMessage(self, msg: str) -> tuple[list[dict] | None, bool]:
+        """
+        Post msg with a single poll request; returns (messages, refused).
+
+        messages is None if the request failed. The request is never retried, not even on a
+        stale socket: most failures give no way to tell whether GeoFS already took the message,
+        and a retry could post it twice. refused is True only for failures known to happen
+        before GeoFS acted on it (see async_post_once), the one case where sending again is safe.
+        """
+        t0 = time.time()
+        resp, refused = await async_post_once(
+            self.url,
+            self._body(msg=msg),
+            timeout=(5, 15),
+            cookies={"PHPSESSID": self.sessionID},
+            headers=self.headers,
+        )
+        if resp is None:
+            self.log.warning("[mp] pollWithMessage: request failed in %.2fs (refused=%s)", time.time() - t0, refused)
+            return None, refused
+        msgs = self._read_messages(resp)
+        self.log.debug("[mp] pollWithMessage: ok in %.2fs; msgs=%d lastMsgId=%s", time.time() - t0, len(msgs), self.lastMsgID)
+        return msgs, False
@@ -0,0 +1,45 @@
+class AdaptivePollScheduler:
+    """
+    Picks the delay before the next chat poll from what the last poll returned.
+
+    Busy chat (many messages or a fast moving lastMsgId) halves the interval down to
+    min_interval, normal traffic settles back to base_interval, an idle chat stretches
+    it towards idle_interval and failures back off exponentially up to max_interval.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 1.0,
+        base_interval: float = 5.0,
+        idle_interval: float = 15.0,
+        max_interval: float = 60.0,
+        busy_messages: int = 5,
+    ):
+        self.min_interval = min_interval
+        self.base_interval = base_interval
+        self.idle_interval = idle_interval
+        self.max_interval = max_interval
+        self.busy_messages = busy_messages
+        self.interval = base_interval
+        self._last_msgid = None
+
+    def on_success(self, msg_count: int, last_msgid=None) -> float:
+        activity = msg_count
+        if isinstance(last_msgid, int) and isinstance(self._last_msgid, int):
+            activity = max(activity, last_msgid - self._last_msgid)
+        self._last_msgid = last_msgid
+
+        if activity >= self.busy_messages:
+            self.interval = max(self.min_interval, min(self.interval, self.base_interval) / 2)
+        elif activity > 0:
+            self.interval = max(self.min_interval, min(self.interval, self.base_interval))
+        elif self.interval < self.base_interval:
+            # chat just went quiet: ease back to the base rate before stretching further
+            self.interval = min(self.base_interval, self.interval * 2)
+        else:
+            self.interval = min(self.idle_interval, self.interval * 1.5)
+        return self.interval
+
+    def on_failure(self) -> float:
+        self.interval = min(self.max_interval, max(self.interval, self.base_interval) * 2)
+        return self.interval
@@ -0,0 +1,140 @@
+import json
+import logging
+import os
+
+# filter kind -> item fields it is checked against; any of the fields may match.
+# Ordered from most to least selective.
+FILTER_FIELDS = {
+    "acid": ("acid",),
+    "callsign": ("callsign", "oldCallsign", "newCallsign"),
+    "aircraft": ("newAircraft", "oldAircraft"),
+}
+
+
+class Subscription:
+    """One channel receiving one event type, optionally narrowed by filters."""
+    __slots__ = ("guild_id", "channel_id", "event_type", "filters")
+
+    def __init__(self, guild_id: int, channel_id: int, event_type: str, filters: dict | None = None):
+        self.guild_id = int(guild_id)
+        self.channel_id = int(channel_id)
+        self.event_type = event_type
+        # kind -> lowercase values; every kind must match, any value within a kind
+        self.filters = {
+            kind: frozenset(str(v).strip().lower() for v in values)
+            for kind, values in (filters or {}).items()
+            if kind in FILTER_FIELDS and values
+        }
+
+    def matches(self, item) -> bool:
+        for kind, values in self.filters.items():
+            if not any(str(item.get(field, "")).lower() in values for field in FILTER_FIELDS[kind]):
+                return False
+        return True
+
+    def to_json(self) -> dict:
+        return {
+            "guild": self.guild_id,
+            "channel": self.channel_id,
+            "event": self.event_type,
+            "filters": {kind: sorted(values) for kind, values in self.filters.items()},
+        }
+
+
+class _EventIndex:
+    # unfiltered subscribers take the whole batch; filtered ones are found through one of their filter values
+    __slots__ = ("unfiltered", "by_value", "kinds")
+
+    def __init__(self, subscriptions):
+        self.unfiltered = []
+        self.by_value: dict[tuple[str, str], list[Subscription]] = {}
+        for sub in subscriptions:
+            if not sub.filters:
+                self.unfiltered.append(sub)
+                continue
+            # keyed on its most selective kind (FILTER_FIELDS order); the others are checked by matches()
+            kind = next(k for k in FILTER_FIELDS if k in sub.filters)
+            for value in sub.filters[kind]:
+                self.by_value.setdefault((kind, value), []).append(sub)
+        self.kinds = sorted({kind for kind, _ in self.by_value})
+
+
+class SubscriptionTable:
+    """
+    Which channels, across any number of guilds, receive which event types.
+
+    Matching a batch costs a dict lookup per item and filter kind rather than a pass
+    over every subscriber, so adding subscribers barely changes per-event cost. The
+    table lives in a JSON file that is rewritten atomically on every change.
+    """
+
+    def __init__(self, path: str, logger: logging.Logger | None = None):
+        self.path = path
+        self.log = logger or logging.getLogger(__name__)
+        # (channel id, event type) -> subscription
+        self.subscriptions: dict[tuple[int, str], Subscription] = {}
+        self._index: dict[str, _EventIndex] = {}
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as f:
+            entries = json.load(f)
+        for entry in entries:
+            sub = Subscription(entry["guild"], entry["channel"], entry["event"], entry.get("filters"))
+            self.subscriptions[(sub.channel_id, sub.event_type)] = sub
+        self._reindex()
+        self.log.info(f"Loaded {len(self.subscriptions)} subscription(s) from {self.path}")
+
+    def save(self) -> None:
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump([sub.to_json() for sub in self.subscriptions.values()], f, indent=1)
+        os.replace(tmp, self.path)
+
+    def _reindex(self) -> None:
+        by_type: dict[str, list[Subscription]] = {}
+        for sub in self.subscriptions.values():
+            by_type.setdefault(sub.event_type, []).append(sub)
+        self._index = {event_type: _EventIndex(subs) for event_type, subs in by_type.items()}
+
+    def add(self, guild_id: int, channel_id: int, event_type: str, filters: dict | None = None) -> Subscription:
+        """Subscribe a channel, replacing its existing subscription to the same event type."""
+        sub = Subscription(guild_id, channel_id, event_type, filters)
+        self.subscriptions[(sub.channel_id, event_type)] = sub
+        self._reindex()
+        return sub
+
+    def remove(self, channel_id: int, event_type: str) -> bool:
+        removed = self.subscriptions.pop((int(channel_id), event_type), None) is not None
+        if removed:
+            self._reindex()
+        return removed
+
+    def for_guild(self, guild_id: int) -> list[Subscription]:
+        return [sub for sub in self.subscriptions.values() if sub.guild_id == guild_id]
+
+    def match(self, event_type: str, items: list) -> dict[int, list[int] | None]:
+        """channel id -> indexes of the items it should receive, or None for the whole batch."""
+        index = self._index.get(event_type)
+        if index is None or not items:
+            return {}
+        targets: dict[int, list[int] | None] = {sub.channel_id: None for sub in index.unfiltered}
+        if not index.by_value:
+            return targets
+        for i, item in enumerate(items):
+            for kind in index.kinds:
+                for field in FILTER_FIELDS[kind]:
+                    value = item.get(field)
+                    if value is None:
+                        continue
+                    for sub in index.by_value.get((kind, str(value).lower()), ()):
+                        if not sub.matches(item):
+                            continue
+                        selected = targets.setdefault(sub.channel_id, [])
+                        # one item can hit the same subscriber through several fields
+                        if not selected or selected[-1] != i:
+                            selected.append(i)
+        return targets
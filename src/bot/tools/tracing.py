@@ -0,0 +1,106 @@
+import itertools
+import secrets
+import time
+from collections import deque
+
+# per-batch stages, in pipeline order; each is the time between two consecutive marks
+STAGES = (
+    ("ingest", "received", "enqueued"),    # body read, validated and spooled
+    ("queue", "enqueued", "dequeued"),     # waiting in task_queue
+    ("render", "dequeued", "rendered"),    # hooks, embeds and packing
+    ("dispatch", "rendered", "send_start"),  # waiting in the channel worker, including its throttle
+    ("send", "send_start", "send_end"),    # Discord, first message sent to last message acknowledged
+)
+
+
+def trace_id(trace) -> str:
+    """The id to print for a trace in log lines; batches replayed without one show as "-"."""
+    return trace.trace_id if trace is not None else "-"
+
+
+class Trace:
+    """Timestamps (perf_counter) of one batch as it moves through the pipeline."""
+    __slots__ = ("trace_id", "event_type", "received", "enqueued", "dequeued", "rendered", "send_start", "send_end")
+
+    def __init__(self, trace_id: str, event_type: str, received: float | None = None):
+        self.trace_id = trace_id
+        self.event_type = event_type
+        self.received = received if received is not None else time.perf_counter()
+        self.enqueued = None
+        self.dequeued = None
+        self.rendered = None
+        self.send_start = None
+        self.send_end = None
+
+    def mark(self, name: str) -> None:
+        setattr(self, name, time.perf_counter())
+
+    def mark_send(self, start: float, end: float) -> None:
+        # a batch can become several messages; the send stage spans all of them
+        if self.send_start is None or start < self.send_start:
+            self.send_start = start
+        if self.send_end is None or end > self.send_end:
+            self.send_end = end
+
+    def durations(self) -> dict[str, float]:
+        result = {}
+        for stage, begin, end in STAGES:
+            t0, t1 = getattr(self, begin), getattr(self, end)
+            if t0 is not None and t1 is not None:
+                result[stage] = t1 - t0
+        last = self.send_end or self.rendered or self.dequeued
+        if last is not None:
+            result["total"] = last - self.received
+        return result
+
+
+class TraceRecorder:
+    """
+    Rolling latency samples per stage, kept in fixed-size ring buffers.
+
+    Recording is an append to a bounded deque; percentiles are only computed when
+    somebody asks for them (the /stats command), over the last `size` samples.
+    """
+
+    def __init__(self, size: int = 2048):
+        self.size = size
+        self.samples: dict[str, deque] = {}
+        # the most recent finished traces, newest last, for looking at individual slow batches
+        self.recent: deque = deque(maxlen=64)
+        self._prefix = secrets.token_hex(2)
+        self._ids = itertools.count(1)
+
+    def start(self, event_type: str, received: float | None = None) -> Trace:
+        return Trace(f"{self._prefix}-{next(self._ids):x}", event_type, received)
+
+    def record(self, stage: str, seconds: float) -> None:
+        samples = self.samples.get(stage)
+        if samples is None:
+            samples = self.samples[stage] = deque(maxlen=self.size)
+        samples.append(seconds)
+
+    def finish(self, trace: Trace) -> None:
+        for stage, seconds in trace.durations().items():
+            self.record(stage, seconds)
+            if stage == "total":
+                self.record(f"total {trace.event_type}", seconds)
+        self.recent.append(trace)
+
+    def percentiles(self, stage: str) -> dict | None:
+        samples = self.samples.get(stage)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        last = len(ordered) - 1
+
+        def pct(p):
+            return ordered[min(last, round(p / 100 * last))]
+        return {"n": len(ordered), "p50": pct(50), "p90": pct(90), "p99": pct(99), "max": ordered[-1]}
+
+    def slowest(self, count: int = 5) -> list[tuple[Trace, float]]:
+        """The slowest of the recent traces by total time, slowest first."""
+        totals = [(trace, trace.durations().get("total")) for trace in self.recent]
+        return sorted(((trace, total) for trace, total in totals if total is not None), key=lambda pair: -pair[1])[:count]
+
+    def summary(self) -> dict[str, dict]:
+        return {stage: self.percentiles(stage) for stage in self.samples if self.samples[stage]}
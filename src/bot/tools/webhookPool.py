@@ -0,0 +1,47 @@
+import asyncio
+import logging
+import aiohttp
+import discord
+
+
+class WebhookPool:
+    """
+    Provides channel webhooks for event delivery.
+
+    Every channel gets up to per_channel webhooks owned by the bot, created on first
+    use and reused across restarts (matched by name). They all post through one
+    keep-alive aiohttp session that is separate from the bot's gateway and REST
+    session. Each webhook has its own rate-limit bucket, and discord.py's webhook
+    adapter waits out a bucket from its X-RateLimit headers before the next send.
+    """
+
+    def __init__(self, name: str = "Stable Intel Events", per_channel: int = 3, logger: logging.Logger | None = None):
+        self.name = name
+        self.per_channel = per_channel
+        self.log = logger or logging.getLogger(__name__)
+        self._session = None
+
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=0, limit_per_host=64, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def acquire(self, channel) -> list[discord.Webhook]:
+        """The channel's delivery webhooks; empty when the bot may not manage webhooks there."""
+        try:
+            owned = [w for w in await channel.webhooks() if w.name == self.name and w.token]
+            while len(owned) < self.per_channel:
+                owned.append(await channel.create_webhook(name=self.name, reason="Event log delivery"))
+        except (discord.Forbidden, AttributeError) as e:
+            self.log.warning(f"Cannot use webhooks in channel {getattr(channel, 'id', '?')}, delivering as the bot: {e}")
+            return []
+        except (discord.HTTPException, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.log.warning(f"Webhook setup for channel {channel.id} failed, delivering as the bot: {type(e).__name__}: {e}")
+            return []
+        session = self.session()
+        return [discord.Webhook.partial(w.id, w.token, session=session) for w in owned[:self.per_channel]]
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src", "bot"))
+sys.path.insert(0, os.path.join(ROOT, "src", "bench"))
+# the bot reads src/bot/config.json relative to the repository root, like under pm2
+os.chdir(ROOT)
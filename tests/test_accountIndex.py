@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from tools.accountIndex import AccountIndex
+
+
+def test_snapshot_is_not_torn_by_events_during_and_after_it(tmp_path):
+    index = AccountIndex()
+    index.on_new_account([{"acid": n, "callsign": f"C{n}"} for n in range(5)])
+    index.on_aircraft_change([{"callsign": "C0", "newAircraft": "Cessna"}])
+
+    async def scenario():
+        # one history per chunk, with events landing between the chunks
+        snapshot = asyncio.create_task(index.snapshot_state(chunk=1))
+        for n in range(5, 10):
+            await asyncio.sleep(0)
+            index.on_new_account([{"acid": n, "callsign": "C0"}])
+            index.on_callsign_change([{"acid": 0, "oldCallsign": "C0", "newCallsign": f"D{n}"}])
+        return await snapshot
+    generation, state = asyncio.run(scenario())
+    # events keep landing while write_snapshot runs in a thread
+    index.on_callsign_change([{"acid": 1, "oldCallsign": "C1", "newCallsign": "Z"}])
+    path = str(tmp_path / "accounts.idx")
+    AccountIndex.write_snapshot(path, state)
+
+    loaded = AccountIndex.load_snapshot(path)
+    assert loaded.lookup("1")["callsigns"] == ["C1"]
+    assert loaded.lookup("C0")["aircraft"] == "Cessna"
+    # every account a callsign lists can be resolved
+    for holder, current in loaded.lookup("C0")["accounts"]:
+        assert loaded.lookup(holder)["callsigns"][-1] == current
+
+
+def test_dirty_until_the_snapshot_is_written(tmp_path):
+    index = AccountIndex()
+    assert not index.dirty
+    index.on_new_account([{"acid": 1, "callsign": "A"}])
+    generation, state = asyncio.run(index.snapshot_state())
+    # the snapshot directory is taken by a file, so the write fails
+    (tmp_path / "blocked").write_text("")
+    with pytest.raises(OSError):
+        AccountIndex.write_snapshot(str(tmp_path / "blocked" / "accounts.idx"), state)
+    assert index.dirty
+    index.on_new_account([{"acid": 2, "callsign": "B"}])
+    index.mark_saved(generation)
+    # the change made while the snapshot was written is not in it
+    assert index.dirty
+    generation, state = asyncio.run(index.snapshot_state())
+    index.mark_saved(generation)
+    assert not index.dirty
@@ -0,0 +1,74 @@
+import asyncio
+import io
+import json
+import logging
+import sys
+
+from tools.asyncLogging import CallSiteSampler, JsonFormatter, _QueueHandler
+from tools.channelDispatcher import ChannelDispatcher
+from tools.tracing import Trace
+
+
+def record(level=logging.WARNING, line=10, created=1000.0, msg="boom"):
+    rec = logging.LogRecord("test", level, "/src/site.py", line, msg, (), None)
+    rec.created = created
+    return rec
+
+
+def test_repeated_records_from_one_site_are_sampled():
+    sampler = CallSiteSampler(burst=2, window=60)
+    passed = [sampler.filter(record(created=1000 + n)) for n in range(5)]
+    assert passed == [True, True, False, False, False]
+    # the first record of the next window passes and carries the count of those dropped
+    rec = record(created=1061)
+    assert sampler.filter(rec) and rec.suppressed == 3
+
+
+def test_other_sites_and_levels_are_not_held_back_by_a_noisy_one():
+    sampler = CallSiteSampler(burst=1, window=60)
+    assert sampler.filter(record())
+    assert not sampler.filter(record())
+    # an ERROR from another call site has its own budget
+    assert sampler.filter(record(level=logging.ERROR, line=20))
+    assert sampler.filter(record(line=30))
+    # INFO and DEBUG are never sampled, even from the noisy site
+    assert all(sampler.filter(record(level=logging.INFO)) for _ in range(10))
+
+
+def test_json_output_carries_the_trace_id():
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    logger = logging.getLogger("test.asyncLogging.trace")
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    class Channel:
+        id = 42
+
+        async def send(self, **kwargs):
+            raise RuntimeError("Forbidden")
+
+    async def scenario():
+        dispatcher = ChannelDispatcher(0, logger)
+        delivered = await dispatcher.submit(Channel(), trace=Trace("w1-2a", "teleporation"), content="x")
+        dispatcher.stop()
+        return delivered
+    try:
+        assert asyncio.run(scenario()) is False
+    finally:
+        logger.removeHandler(handler)
+    entry = json.loads(stream.getvalue())
+    assert entry["trace_id"] == "w1-2a"
+    assert entry["level"] == "ERROR" and "Failed to deliver to channel 42" in entry["msg"]
+
+
+def test_queue_handler_renders_the_message_before_handing_it_over():
+    rec = logging.LogRecord("test", logging.ERROR, "/src/site.py", 1, "value %s", ("x",), None)
+    try:
+        raise ValueError("bad")
+    except ValueError:
+        rec.exc_info = sys.exc_info()
+    prepared = _QueueHandler(None).prepare(rec)
+    assert (prepared.msg, prepared.args, prepared.exc_info) == ("value x", None, None)
+    assert "ValueError: bad" in json.loads(JsonFormatter().format(prepared))["exc"]
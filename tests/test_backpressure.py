@@ -0,0 +1,123 @@
+import asyncio
+import os
+
+import pytest
+
+import bot as bot_module
+from tools.channelDispatcher import ChannelDispatcher
+from tools.eventQueue import EventQueue, QueueFull
+from tools.eventSpool import EventSpool
+from tools.floodDigest import FloodDigest
+from tools.subscriptions import SubscriptionTable
+
+
+class SlowChannel:
+    """A channel whose sends take `latency` seconds each, like Discord during an outage."""
+
+    def __init__(self, channel_id, latency):
+        self.id = channel_id
+        self.latency = latency
+        self.sent = []
+
+    async def send(self, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.sent.append(kwargs)
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    bot = bot_module.bot
+    saved = {name: getattr(bot, name) for name in ("task_queue", "dispatcher", "digests", "spool", "subscriptions", "wait_until_ready")}
+
+    def setup(limits, max_pending, channels):
+        bot.task_queue = EventQueue(limits, on_drop=bot.on_batches_dropped)
+        bot.dispatcher = ChannelDispatcher(0, bot.logger, max_pending=max_pending)
+        bot.digests = FloodDigest({"default": {"enabled": False}}, bot.dispatcher.submit, bot.logger)
+        bot.spool = EventSpool(os.path.join(tmp_path, "spool.sqlite3"), synchronous="OFF", logger=bot.logger)
+        bot.subscriptions = SubscriptionTable(os.path.join(tmp_path, "subscriptions.json"), bot.logger)
+        for event_type, channel in channels.items():
+            event = bot.registry.get(event_type)
+            event.enabled = True
+            event.channel = channel
+
+        async def ready():
+            return None
+        bot.wait_until_ready = ready
+        return bot
+
+    yield setup
+    for name, value in saved.items():
+        setattr(bot, name, value)
+
+
+def items(n, prefix="x"):
+    return [{"acid": f"{prefix}{i}", "callsign": f"{prefix}{i}"} for i in range(n)]
+
+
+def test_slow_discord_fills_the_lane_and_rejects(pipeline):
+    # 100 batches of 20 against a lane of 200 events: once the dispatcher is at its
+    # limit the consumer stops, the lane fills up and further batches get QueueFull (429)
+    bot = pipeline({"new-account": {"maxEvents": 200, "overflow": "reject"}}, max_pending=5, channels={"new-account": SlowChannel(1, 0.05)})
+
+    async def scenario():
+        await bot.spool.start()
+        consumer = asyncio.create_task(bot.process_tasks())
+        accepted = rejected = 0
+        for n in range(100):
+            try:
+                await bot.enqueue_event("new-account", items(20, f"b{n}-"))
+                accepted += 1
+            except QueueFull:
+                rejected += 1
+            await asyncio.sleep(0)
+        depth = bot.task_queue.qsize()
+        pending = bot.dispatcher.pending
+        consumer.cancel()
+        bot.dispatcher.stop()
+        await bot.spool.close()
+        return accepted, rejected, depth, pending
+
+    accepted, rejected, depth, pending = asyncio.run(scenario())
+    assert rejected > 0
+    assert depth <= 200
+    # soft limit: the batch dequeued last may add its messages on top of the cap
+    assert pending <= 5 + 2
+    assert accepted + rejected == 100
+
+
+def test_high_priority_overtakes_backlogged_low_priority(pipeline):
+    slow = SlowChannel(1, 0.02)
+    fast = SlowChannel(2, 0.0)
+    bot = pipeline(
+        {
+            "default": {"maxEvents": 100000, "maxWaitSeconds": 60},
+            "activity-change": {"priority": 0},
+            "new-account": {"priority": 2},
+        },
+        max_pending=2,
+        channels={"activity-change": slow, "new-account": fast},
+    )
+
+    async def scenario():
+        await bot.spool.start()
+        for n in range(50):
+            await bot.enqueue_event("activity-change", [{"acid": f"a{n}", "status": "online"}])
+        consumer = asyncio.create_task(bot.process_tasks())
+        # the consumer is now held back by the slow channel with most of the flood still queued
+        await asyncio.sleep(0.1)
+        backlog_before = bot.task_queue.lanes["activity-change"].events
+        await bot.enqueue_event("new-account", items(1, "vip"))
+        for _ in range(100):
+            if fast.sent:
+                break
+            await asyncio.sleep(0.01)
+        backlog_after = bot.task_queue.lanes["activity-change"].events
+        consumer.cancel()
+        bot.dispatcher.stop()
+        await bot.spool.close()
+        return backlog_before, backlog_after
+
+    backlog_before, backlog_after = asyncio.run(scenario())
+    assert backlog_before > 30
+    # the new account was delivered while most of the older flood was still waiting
+    assert backlog_after > 25
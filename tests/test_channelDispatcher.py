@@ -0,0 +1,85 @@
+import asyncio
+import random
+
+import aiohttp
+import discord
+
+from tools.channelDispatcher import ChannelDispatcher
+from tools.webhookPool import WebhookPool
+
+
+class Sink:
+    def __init__(self, log, name, deleted=False):
+        self.log = log
+        self.id = name
+        self.deleted = deleted
+
+    async def send(self, **kwargs):
+        if self.deleted:
+            raise discord.NotFound(type("Response", (), {"status": 404, "reason": "Not Found"})(), "Unknown Webhook")
+        # uneven latency, as separate webhook buckets would have
+        await asyncio.sleep(random.uniform(0, 0.005))
+        self.log.append((self.id, kwargs["content"]))
+
+
+class Pool:
+    def __init__(self, webhooks):
+        self.webhooks = webhooks
+
+    async def acquire(self, channel):
+        return self.webhooks
+
+
+def test_webhook_delivery_keeps_channel_order():
+    delivered = []
+
+    async def scenario():
+        webhooks = [Sink(delivered, "w1"), Sink(delivered, "w2", deleted=True), Sink(delivered, "w3")]
+        dispatcher = ChannelDispatcher(0, webhooks=Pool(webhooks))
+        channel = Sink(delivered, 1)
+        dispatcher.worker_for(channel)
+        await asyncio.sleep(0)
+        futures = [dispatcher.submit(channel, content=i) for i in range(60)]
+        assert all(await asyncio.gather(*futures))
+        dispatcher.stop()
+    asyncio.run(scenario())
+    assert [content for _, content in delivered] == list(range(60))
+    # the deleted webhook was dropped and the other two shared the sends
+    assert {sender for sender, _ in delivered} == {"w1", "w3"}
+
+
+class Unreachable(Sink):
+    async def webhooks(self):
+        raise aiohttp.ClientConnectionError("connection reset")
+
+
+def test_webhook_setup_network_error_falls_back_to_the_bot():
+    delivered = []
+
+    async def scenario():
+        dispatcher = ChannelDispatcher(0, webhooks=WebhookPool())
+        channel = Unreachable(delivered, 1)
+        assert await dispatcher.submit(channel, content="hi")
+        worker = dispatcher.workers[1]
+        await worker.attach_task
+        assert worker.attach_task.exception() is None and not worker.webhooks
+        dispatcher.stop()
+    asyncio.run(scenario())
+    assert delivered == [(1, "hi")]
+
+
+def test_stop_cancels_a_pending_webhook_lookup():
+    async def scenario():
+        never = asyncio.Event()
+
+        class Slow:
+            async def acquire(self, channel):
+                await never.wait()
+
+        dispatcher = ChannelDispatcher(0, webhooks=Slow())
+        worker = dispatcher.worker_for(Sink([], 1))
+        await asyncio.sleep(0)
+        dispatcher.stop()
+        await asyncio.sleep(0)
+        assert worker.attach_task.cancelled()
+    asyncio.run(scenario())
@@ -0,0 +1,26 @@
+import asyncio
+
+from tools.chatArchive import ChatArchive
+
+
+def test_archive_keeps_every_message_and_drops_overlap(tmp_path):
+    async def scenario():
+        archive = ChatArchive(str(tmp_path / "chat.sqlite3"), flush_interval=0)
+        await archive.start()
+        first = [{"acid": 1, "cs": "A", "msg": "hello"}, {"acid": 2, "cs": "B", "msg": "hi there"}]
+        archive.add(first, 100.0)
+        # an overlapping poll returns the last message again, plus a new one
+        archive.add([first[1], {"acid": 3, "cs": "C", "msg": "hello"}], 101.0)
+        # a poll during which lastMsgId did not move is archived all the same
+        archive.add([{"acid": 1, "cs": "A", "msg": "again"}, {"acid": 1, "cs": "A", "msg": ""}], 102.0)
+        await archive.close()
+
+        archive = ChatArchive(str(tmp_path / "chat.sqlite3"))
+        await archive.start()
+        rows, more = await archive.search(per_page=10)
+        assert [(row[1], row[3]) for row in rows] == [("1", "again"), ("3", "hello"), ("2", "hi there"), ("1", "hello")]
+        assert not more
+        rows, _ = await archive.search("hel")
+        assert len(rows) == 2
+        await archive.close()
+    asyncio.run(scenario())
@@ -0,0 +1,171 @@
+import asyncio
+
+from aiohttp import web
+
+from tools.chatOutbox import ChatOutbox, OutboxFull
+from tools.http_client import close_async_session
+from tools.multiplayerAPI import AsyncMultiplayerAPI
+
+
+def test_outbox_paces_retries_and_gives_up():
+    async def scenario():
+        outbox = ChatOutbox(min_interval=0, max_attempts=2, max_size=2)
+        first = outbox.submit("one")
+        second = outbox.submit("two")
+        try:
+            outbox.submit("three")
+            raise AssertionError("outbox accepted more than max_size")
+        except OutboxFull:
+            pass
+        message = outbox.take()
+        assert message.text == "one" and message.attempts == 1
+        outbox.failed(message)
+        # a failed message keeps its place at the front
+        outbox.queue[0].not_before = 0
+        message = outbox.take()
+        assert message.text == "one" and message.attempts == 2
+        outbox.failed(message)
+        assert first.done() and first.result() is False
+        message = outbox.take()
+        outbox.sent(message)
+        assert message.text == "two" and second.result() is True
+        assert outbox.take() is None
+    asyncio.run(scenario())
+
+
+def test_outbox_close_resolves_waiting_messages():
+    async def scenario():
+        outbox = ChatOutbox()
+        future = outbox.submit("hello")
+        outbox.close()
+        assert future.result() is False and len(outbox) == 0
+    asyncio.run(scenario())
+
+
+def test_message_is_posted_exactly_once_against_a_failing_server():
+    bodies = []
+
+    async def update(request):
+        bodies.append(await request.json())
+        return web.Response(status=503)
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/update", update)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            api = AsyncMultiplayerAPI("sid", 1, url=f"http://127.0.0.1:{port}/update")
+            api.lastMsgID = 0
+            # a 503 means GeoFS turned the request away, so the message may go out again
+            assert await api.pollWithMessage("hello") == (None, True)
+        finally:
+            await close_async_session()
+            await runner.cleanup()
+    asyncio.run(scenario())
+    assert [body["m"] for body in bodies] == ["hello"]
+
+
+def test_dropped_connection_is_not_a_refusal():
+    bodies = []
+
+    async def update(request):
+        bodies.append(await request.json())
+        # the server read the message, then the connection died before any answer
+        request.transport.close()
+        return web.Response(status=200)
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/update", update)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            api = AsyncMultiplayerAPI("sid", 1, url=f"http://127.0.0.1:{port}/update")
+            api.lastMsgID = 0
+            assert await api.pollWithMessage("hello") == (None, False)
+        finally:
+            await close_async_session()
+            await runner.cleanup()
+        # nothing listens on the port any more: the request never left, which is a refusal
+        assert await api.pollWithMessage("again") == (None, True)
+        await close_async_session()
+    asyncio.run(scenario())
+    assert [body["m"] for body in bodies] == ["hello"]
+
+
+class _Channel:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content, **kwargs):
+        self.sent.append(content)
+
+
+class _Tracer:
+    def record(self, name, seconds):
+        pass
+
+
+def _poll_once(poll):
+    """Runs one printMessages tick with a stub GeoFS API; returns the queued message's future and the API."""
+    from cogs.chatLogging import ChatLogging
+
+    class API:
+        myID = 1
+        lastMsgID = 0
+
+        def __init__(self):
+            self.posted = []
+            self.polls = 0
+
+        async def pollWithMessage(self, text):
+            self.posted.append(text)
+            return await poll()
+
+        async def getMessages(self):
+            self.polls += 1
+            return []
+
+    async def scenario():
+        channel = _Channel()
+        bot = type("Bot", (), {})()
+        bot.config = {"chatLogChannel": 1, "chatSendIntervalSeconds": 0}
+        bot.get_channel = lambda channel_id: channel
+        bot.tracer = _Tracer()
+        cog = ChatLogging(bot)
+        cog.multiplayerAPI = API()
+        future = cog.outbox.submit("hello")
+        await cog.printMessages.coro(cog)
+        return future, cog
+    return asyncio.run(scenario())
+
+
+def test_poll_timeout_settles_the_message_as_unconfirmed():
+    async def poll():
+        raise asyncio.TimeoutError()
+
+    future, cog = _poll_once(poll)
+    # the text may already be in the chat, so it is neither retried nor reported as failed
+    assert future.result() is None
+    assert len(cog.outbox) == 0 and cog.multiplayerAPI.posted == ["hello"]
+
+
+def test_refused_poll_requeues_and_unanswered_poll_does_not():
+    async def refused():
+        return None, True
+
+    async def unanswered():
+        return None, False
+
+    future, cog = _poll_once(refused)
+    assert not future.done() and [m.text for m in cog.outbox.queue] == ["hello"]
+    assert cog.multiplayerAPI.polls == 1
+    future, cog = _poll_once(unanswered)
+    assert future.result() is None and len(cog.outbox) == 0
@@ -0,0 +1,73 @@
+import discord
+
+from tools.embedPacker import (
+    MAX_DESCRIPTION_CHARS, MAX_EMBED_CHARS_PER_MESSAGE, MAX_EMBEDS_PER_MESSAGE, MAX_MESSAGE_CHARS,
+    chunk_lines, compact_embeds, pack_embeds,
+)
+
+
+def embed(chars: int, title: str | None = None) -> discord.Embed:
+    return discord.Embed(title=title, description="a" * chars)
+
+
+def sizes(messages):
+    return [len(message) for message in messages]
+
+
+def test_pack_splits_just_over_the_embed_count():
+    assert sizes(pack_embeds([embed(1) for _ in range(MAX_EMBEDS_PER_MESSAGE)])) == [10]
+    assert sizes(pack_embeds([embed(1) for _ in range(MAX_EMBEDS_PER_MESSAGE + 1)])) == [10, 1]
+
+
+def test_pack_splits_just_over_the_character_total():
+    per = MAX_EMBED_CHARS_PER_MESSAGE // MAX_EMBEDS_PER_MESSAGE
+    assert sizes(pack_embeds([embed(per) for _ in range(MAX_EMBEDS_PER_MESSAGE)])) == [10]
+    # 6000 characters exactly fit, one more moves the last embed on
+    assert sizes(pack_embeds([embed(3000), embed(3000)])) == [2]
+    assert sizes(pack_embeds([embed(3000), embed(3001)])) == [1, 1]
+
+
+def test_pack_counts_field_text_and_keeps_an_oversized_embed_alone():
+    full = discord.Embed(title="t")
+    for n in range(25):
+        full.add_field(name=f"f{n:02}", value="v" * 200)
+    assert len(full.fields) == 25 and len(full) == 1 + 25 * 203
+    assert sizes(pack_embeds([full, full])) == [1, 1]
+    # nothing can make a single embed smaller, so it still goes out, on its own
+    assert sizes(pack_embeds([embed(1), embed(MAX_EMBED_CHARS_PER_MESSAGE + 1), embed(1)])) == [1, 1, 1]
+
+
+def test_compact_merges_up_to_the_description_limit():
+    # two blocks plus the blank line between them fill the limit exactly
+    merged = compact_embeds([embed(49, "x"), embed(49, "x")], max_description=100)
+    assert [(e.title, len(e.description)) for e in merged] == [("x ×2", 100)]
+    split = compact_embeds([embed(49, "x"), embed(50, "x")], max_description=100)
+    assert [(e.title, len(e.description)) for e in split] == [("x", 49), ("x", 50)]
+
+
+def test_compact_never_exceeds_discords_description_limit():
+    merged = compact_embeds(
+        [embed(MAX_DESCRIPTION_CHARS, "x"), embed(MAX_DESCRIPTION_CHARS + 1, "x")], max_description=10**6,
+    )
+    assert [len(e.description) for e in merged] == [MAX_DESCRIPTION_CHARS, MAX_DESCRIPTION_CHARS]
+
+
+def test_compact_passes_embeds_with_fields_through():
+    full = discord.Embed(title="x")
+    for n in range(25):
+        full.add_field(name=str(n), value="v")
+    merged = compact_embeds([embed(1, "x"), full, embed(1, "x"), embed(1, "x")])
+    assert merged[1] is full and len(merged[1].fields) == 25
+    assert [e.title for e in merged] == ["x", "x", "x ×2"]
+
+
+def test_chunk_lines_at_and_over_the_limit():
+    assert chunk_lines(["a" * 1000, "b" * 1000]) == ["a" * 1000 + "b" * 1000]
+    assert chunk_lines(["a" * 1000, "b" * 1001]) == ["a" * 1000, "b" * 1001]
+    assert chunk_lines([]) == []
+
+
+def test_chunk_lines_hard_splits_a_single_oversized_line():
+    chunks = chunk_lines(["head", "x" * (2 * MAX_MESSAGE_CHARS + 10), "tail"])
+    assert chunks == ["head", "x" * MAX_MESSAGE_CHARS, "x" * MAX_MESSAGE_CHARS, "x" * 10 + "tail"]
+    assert all(len(chunk) <= MAX_MESSAGE_CHARS for chunk in chunks)
@@ -0,0 +1,150 @@
+import asyncio
+import time
+from collections import Counter
+
+import pytest
+
+from tools.eventQueue import EventQueue, QueueFull
+
+
+def drain(queue, n):
+    return [queue.get_nowait().event_type for _ in range(n)]
+
+
+def test_higher_priority_tier_is_served_first():
+    queue = EventQueue({"default": {"maxEvents": 10**6}, "rare": {"priority": 2}})
+    for _ in range(10):
+        queue.put_nowait("flood", [0] * 50)
+    queue.put_nowait("rare", [0])
+    assert drain(queue, 1) == ["rare"]
+
+
+def test_weights_share_a_tier_in_proportion():
+    queue = EventQueue({"default": {"maxEvents": 10**6}, "heavy": {"weight": 3}, "light": {"weight": 1}})
+    for _ in range(200):
+        queue.put_nowait("heavy", [0] * 10)
+        queue.put_nowait("light", [0] * 10)
+    served = Counter(drain(queue, 200))
+    assert 140 <= served["heavy"] <= 160
+    assert 40 <= served["light"] <= 60
+
+
+def test_idle_lane_does_not_bank_credit():
+    # a lane that was empty while another was served rejoins at the current virtual time
+    queue = EventQueue({"default": {"maxEvents": 10**6}})
+    for _ in range(100):
+        queue.put_nowait("busy", [0])
+    drain(queue, 90)
+    for _ in range(20):
+        queue.put_nowait("late", [0])
+    served = Counter(drain(queue, 20))
+    assert served["busy"] >= 8
+
+
+def test_starvation_guard_serves_overdue_low_tier():
+    queue = EventQueue({"default": {"maxEvents": 10**6, "maxWaitSeconds": 0.05}, "high": {"priority": 2, "maxWaitSeconds": 100}})
+    for _ in range(100):
+        queue.put_nowait("high", [0])
+    queue.put_nowait("low", [0])
+    assert drain(queue, 3) == ["high"] * 3
+    time.sleep(0.06)
+    assert drain(queue, 1) == ["low"]
+    assert queue.stats()["low"]["aged"] == 1
+
+
+def test_slo_counts():
+    queue = EventQueue({"x": {"sloSeconds": 1}})
+    assert queue.observe_latency("x", 0.5)
+    assert not queue.observe_latency("x", 2)
+    stats = queue.stats()["x"]
+    assert (stats["sloMet"], stats["sloMissed"]) == (1, 1)
+
+
+def test_drop_oldest_evicts_whole_batches_and_trims_oversized_ones():
+    dropped = []
+    queue = EventQueue({"x": {"maxEvents": 5}}, on_drop=lambda event_type, batches: dropped.extend(b.spool_id for b in batches))
+    queue.put_nowait("x", [1, 2], spool_id=1)
+    queue.put_nowait("x", [3, 4], spool_id=2)
+    queue.put_nowait("x", [5, 6], spool_id=3)
+    assert dropped == [1]
+    batch = queue.put_nowait("x", list(range(8)), spool_id=4)
+    assert batch.data == [3, 4, 5, 6, 7]
+    assert dropped == [1, 2, 3]
+    assert queue.stats()["x"]["dropped"] == 2 + 4 + 3
+
+
+def test_drop_newest_and_reject():
+    queue = EventQueue({"new": {"maxEvents": 2, "overflow": "drop-newest"}, "rej": {"maxEvents": 2, "overflow": "reject"}})
+    assert queue.put_nowait("new", [1, 2]) is not None
+    assert queue.put_nowait("new", [3]) is None
+    assert queue.stats()["new"]["dropped"] == 1
+    queue.put_nowait("rej", [1])
+    queue.check_capacity("rej", 1)
+    with pytest.raises(QueueFull):
+        queue.check_capacity("rej", 2)
+    with pytest.raises(QueueFull):
+        queue.put_nowait("rej", [2, 3])
+    assert queue.stats()["rej"]["rejected"] == 4
+    assert queue.qsize() == 3
+
+
+def test_unknown_policy_is_refused():
+    with pytest.raises(ValueError):
+        EventQueue({"x": {"overflow": "drop-random"}}).lane("x")
+
+
+def test_purge_hands_batches_to_on_drop():
+    dropped = []
+    queue = EventQueue(on_drop=lambda event_type, batches: dropped.append([b.spool_id for b in batches]))
+    for spool_id in (1, 2, 3):
+        queue.put_nowait("x", [spool_id], spool_id=spool_id)
+    assert queue.purge("x") == 3
+    assert dropped == [[1, 2, 3]] and queue.empty()
+
+
+def test_coalescing_lane_holds_then_merges():
+    queue = EventQueue({"x": {"coalesceSeconds": 0.05}})
+    for spool_id in (1, 2, 3):
+        queue.put_nowait("x", [spool_id], spool_id=spool_id)
+    assert queue.get_nowait() is None
+    time.sleep(0.06)
+    batch = queue.get_nowait()
+    assert batch.data == [1, 2, 3]
+    assert (batch.spool_id, batch.absorbed) == (1, (2, 3))
+    assert queue.empty()
+
+
+def test_release_stops_holding():
+    async def scenario():
+        queue = EventQueue({"x": {"coalesceSeconds": 60}})
+        queue.put_nowait("x", [1])
+        queue.put_nowait("x", [2])
+        getter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0.01)
+        assert not getter.done()
+        queue.release()
+        return await asyncio.wait_for(getter, 1)
+    assert asyncio.run(scenario()).data == [1, 2]
+
+
+def test_configure_updates_existing_and_future_lanes():
+    queue = EventQueue({"x": {"maxEvents": 2, "coalesceSeconds": 60}})
+    queue.put_nowait("x", [1])
+    queue.put_nowait("x", [2])
+    assert queue.get_nowait() is None
+    queue.configure({"default": {"priority": 3}, "x": {"maxEvents": 3, "overflow": "reject"}})
+    # the held batches are kept and now served at once, and the new cap applies
+    queue.put_nowait("x", [3])
+    with pytest.raises(QueueFull):
+        queue.put_nowait("x", [4])
+    assert queue.get_nowait().data == [1]
+    assert queue.lane("y").priority == 3
+
+
+def test_configure_with_a_bad_entry_changes_nothing():
+    queue = EventQueue({"x": {"maxEvents": 2}})
+    queue.lane("x")
+    queue.lane("y")
+    with pytest.raises(ValueError):
+        queue.configure({"x": {"maxEvents": 9}, "y": {"overflow": "drop-random"}})
+    assert queue.lane("x").max_events == 2 and queue.limits == {"x": {"maxEvents": 2}}
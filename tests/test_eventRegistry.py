@@ -0,0 +1,83 @@
+import json
+
+import msgspec
+import pytest
+
+from tools.eventRegistry import DEFAULT_EVENT_TYPES, EventType
+
+
+def teleport():
+    return EventType("teleporation", DEFAULT_EVENT_TYPES["teleporation"], {})
+
+
+def body(items):
+    return json.dumps(items).encode()
+
+
+def jump(**overrides):
+    item = {"acid": 7, "oldLatitude": 1.5, "oldLongitude": 2, "newLatitude": -3, "newLongitude": 179.5, "distance": 400.2}
+    item.update(overrides)
+    return item
+
+
+def test_valid_batch():
+    items, errors = teleport().decode(body([jump(), jump(acid="8")]))
+    assert errors == []
+    assert [item["acid"] for item in items] == [7, "8"]
+
+
+def test_numeric_strings_are_coerced():
+    items, errors = teleport().decode(body([jump(newLatitude="51.5", newLongitude="-0.12", distance="12")]))
+    assert errors == []
+    assert (items[0]["newLatitude"], items[0]["newLongitude"], items[0]["distance"]) == (51.5, -0.12, 12.0)
+
+
+def test_bad_items_are_rejected_one_by_one():
+    items, errors = teleport().decode(body([jump(), jump(newLatitude=91), jump(distance="far"), {"acid": 1}]))
+    assert len(items) == 1
+    assert [error.split(":")[0] for error in errors] == ["item 1", "item 2", "item 3"]
+
+
+def test_malformed_bodies_raise():
+    with pytest.raises(msgspec.DecodeError):
+        teleport().decode(b"[{")
+    with pytest.raises(msgspec.ValidationError):
+        teleport().decode(b"{}")
+
+
+def test_coalesce_chains_changes_per_key():
+    event = EventType("callsign-change", DEFAULT_EVENT_TYPES["callsign-change"], {})
+    items = [
+        {"acid": 1, "oldCallsign": "A", "newCallsign": "B"},
+        {"acid": 2, "oldCallsign": "X", "newCallsign": "Y"},
+        {"acid": 1, "oldCallsign": "B", "newCallsign": "C"},
+        {"acid": 1, "oldCallsign": "B", "newCallsign": "C"},
+        {"oldCallsign": "P", "newCallsign": "Q"},
+    ]
+    merged = event.coalesce(items)
+    assert merged == [
+        {"acid": 1, "oldCallsign": "A", "newCallsign": "C", "changes": 2},
+        {"acid": 2, "oldCallsign": "X", "newCallsign": "Y"},
+        {"oldCallsign": "P", "newCallsign": "Q"},
+    ]
+    assert "Changes: 2" in event.render(merged[0]).description
+
+
+def test_reload_reapplies_queue_limits_and_digest_settings():
+    import bot as bot_module
+    bot = bot_module.bot
+    saved = dict(bot.config)
+    bot.task_queue.lane("reload-test")
+    try:
+        bot.config["queueLimits"] = {"reload-test": {"maxEvents": 7}}
+        bot.config["floodDigest"] = {"default": {"intervalSeconds": 5}}
+        for callback in bot.registry.on_reload:
+            callback()
+        assert bot.task_queue.lane("reload-test").max_events == 7
+        assert bot.digests.settings("reload-test")["intervalSeconds"] == 5
+    finally:
+        bot.config.clear()
+        bot.config.update(saved)
+        bot.task_queue.lanes.pop("reload-test", None)
+        for callback in bot.registry.on_reload:
+            callback()
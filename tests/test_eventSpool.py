@@ -0,0 +1,127 @@
+import asyncio
+import os
+
+import bot as bot_module
+from tools.eventQueue import EventQueue
+from tools.eventSpool import EventSpool
+
+
+def spool_at(tmp_path):
+    return EventSpool(os.path.join(tmp_path, "spool.sqlite3"), synchronous="OFF")
+
+
+def test_unacknowledged_batches_are_replayed_in_order(tmp_path):
+    async def scenario():
+        spool = spool_at(tmp_path)
+        await spool.start()
+        ids = await asyncio.gather(*(spool.append("x", [n]) for n in range(5)))
+        spool.mark_delivered(ids[0])
+        spool.mark_delivered(ids[2])
+        spool.mark_delivered(ids[3])
+        other = await spool.append("y", [9], payload="[9]")
+        await spool.close()
+
+        spool = spool_at(tmp_path)
+        await spool.start()
+        replayed = await spool.replay()
+        await spool.close()
+        return ids, other, replayed
+    ids, other, replayed = asyncio.run(scenario())
+    assert replayed == [(ids[1], "x", [1]), (ids[4], "x", [4]), (other, "y", [9])]
+
+
+def test_bot_acknowledges_merged_dropped_and_replayed_batches(tmp_path):
+    bot = bot_module.bot
+    saved = bot.task_queue, bot.spool
+
+    async def scenario():
+        bot.spool = spool_at(tmp_path)
+        await bot.spool.start()
+        bot.task_queue = EventQueue({"held": {"coalesceSeconds": 60}, "small": {"maxEvents": 2}}, on_drop=bot.on_batches_dropped)
+        try:
+            for n in range(3):
+                await bot.enqueue_event("held", [n])
+            for n in range(4):
+                await bot.enqueue_event("small", [n])
+            # drop-oldest evicted the first two "small" batches and acknowledged them
+            bot.task_queue.release()
+            merged = bot.task_queue.get_nowait()
+            assert merged.data == [0, 1, 2] and len(merged.absorbed) == 2
+            bot.acknowledge(merged)
+            await bot.spool.close()
+
+            # the two surviving "small" batches come back after a restart
+            bot.spool = spool_at(tmp_path)
+            await bot.spool.start()
+            bot.task_queue = EventQueue()
+            await bot.replay_spool()
+            replayed = [bot.task_queue.get_nowait() for _ in range(2)]
+            assert [batch.data for batch in replayed] == [[2], [3]]
+            for batch in replayed:
+                bot.acknowledge(batch)
+            await bot.spool.close()
+
+            bot.spool = spool_at(tmp_path)
+            await bot.spool.start()
+            assert await bot.spool.replay() == []
+            await bot.spool.close()
+        finally:
+            bot.task_queue, bot.spool = saved
+    asyncio.run(scenario())
+
+
+def test_acks_survive_a_failed_write(tmp_path):
+    async def scenario():
+        spool = spool_at(tmp_path)
+        await spool.start()
+        ids = await asyncio.gather(*(spool.append("x", [n]) for n in range(3)))
+        write = spool._write
+
+        def failing(pending, acks):
+            spool._write = write
+            raise OSError("disk full")
+        spool._write = failing
+        spool.mark_delivered(ids[0])
+        await asyncio.sleep(0.05)
+        assert spool._acks == [ids[0]]
+        # the kept ack goes out with the next commit
+        spool.mark_delivered(ids[1])
+        await spool.close()
+
+        spool = spool_at(tmp_path)
+        await spool.start()
+        replayed = await spool.replay()
+        await spool.close()
+        return ids, replayed
+    ids, replayed = asyncio.run(scenario())
+    assert replayed == [(ids[2], "x", [2])]
+
+
+def test_purge_keeps_batches_a_full_replay_skipped(tmp_path):
+    bot = bot_module.bot
+    saved = bot.task_queue, bot.spool
+
+    async def scenario():
+        bot.spool = spool_at(tmp_path)
+        await bot.spool.start()
+        try:
+            ids = await asyncio.gather(*(bot.spool.append("x", [n]) for n in range(4)))
+            # room for two: the replay queues the first two and leaves the rest on disk
+            bot.task_queue = EventQueue({"x": {"maxEvents": 2, "overflow": "reject"}}, on_drop=bot.on_batches_dropped)
+            await bot.replay_spool()
+            bot.acknowledge(bot.task_queue.get_nowait())
+            # a new batch lands after the skipped ones, so the purged ids no longer form a run
+            await bot.enqueue_event("x", [4])
+            purged = await bot.clear_queue_for_event("x")
+            assert purged == 2
+            await bot.spool.close()
+
+            bot.spool = spool_at(tmp_path)
+            await bot.spool.start()
+            replayed = await bot.spool.replay()
+            await bot.spool.close()
+            return ids, replayed
+        finally:
+            bot.task_queue, bot.spool = saved
+    ids, replayed = asyncio.run(scenario())
+    assert replayed == [(ids[2], "x", [2]), (ids[3], "x", [3])]
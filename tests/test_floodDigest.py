@@ -0,0 +1,36 @@
+import asyncio
+import gzip
+
+from tools.eventRegistry import DEFAULT_EVENT_TYPES, EventType
+from tools.floodDigest import FloodDigest
+
+
+class Channel:
+    id = 1
+
+
+def test_digest_resolves_every_tracked_future():
+    sent = []
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+
+        def submit(channel, **kwargs):
+            sent.append(kwargs)
+            future = loop.create_future()
+            future.set_result(True)
+            return future
+
+        digest = FloodDigest({}, submit)
+        event = EventType("new-account", DEFAULT_EVENT_TYPES["new-account"], {})
+        # a batch whose items were all coalesced away still waits on the digest
+        empty = digest.add(event, Channel(), [], track=True)
+        await digest.flush((event.name, Channel.id))
+        assert empty.result() == [True] and sent == []
+
+        full = digest.add(event, Channel(), [{"acid": 1, "callsign": "A"}], track=True)
+        await digest.flush_all()
+        await asyncio.sleep(0)
+        assert full.result() == [True]
+        assert b"acid,callsign" in gzip.decompress(sent[0]["file"].fp.read())
+    asyncio.run(scenario())
@@ -0,0 +1,59 @@
+from tools.geofence import GeofenceEngine
+
+LONDON = (51.5, -0.12)
+PARIS = (48.86, 2.35)
+TOKYO = (35.68, 139.69)
+SYDNEY = (-33.87, 151.21)
+
+
+def teleport(acid, old, new):
+    return {"acid": acid, "oldLatitude": old[0], "oldLongitude": old[1], "newLatitude": new[0], "newLongitude": new[1]}
+
+
+def kinds(alerts):
+    return sorted(alert["kind"] for alert in alerts)
+
+
+def test_entering_a_zone_alerts_once():
+    engine = GeofenceEngine([
+        {"name": "Paris", "lat": PARIS[0], "lon": PARIS[1], "radiusKm": 50},
+        {"name": "Box", "type": "polygon", "points": [[35, 139], [36, 139], [36, 140], [35, 140]]},
+    ])
+    alerts = engine.check([teleport(1, LONDON, PARIS), teleport(2, PARIS, PARIS), teleport(3, LONDON, TOKYO)], now=0)
+    assert sorted((a["acid"], a["zone"]) for a in alerts if a["kind"] == "entry") == [("1", "Paris"), ("3", "Box")]
+
+
+def test_single_jump_over_the_limit():
+    engine = GeofenceEngine([], max_jump_km=15000)
+    alerts = engine.check([teleport(1, LONDON, SYDNEY), teleport(2, LONDON, TOKYO)], now=0)
+    assert [(a["kind"], a["acid"]) for a in alerts] == [("jump", "1")]
+    assert 16900 < alerts[0]["distance"] < 17100
+
+
+def test_two_teleports_are_not_an_impossible_speed():
+    engine = GeofenceEngine([])
+    assert engine.check([teleport(1, PARIS, LONDON)], now=0) == []
+    # the account is still where it landed, so the London -> Tokyo jump is not travel
+    assert engine.check([teleport(1, LONDON, TOKYO)], now=3600) == []
+
+
+def test_travel_between_teleports_is_speed_checked():
+    engine = GeofenceEngine([], max_speed_kmh=4000)
+    engine.check([teleport(1, PARIS, LONDON)], times=[0])
+    # it was next seen leaving Tokyo one hour after landing in London
+    alerts = engine.check([teleport(1, TOKYO, SYDNEY)], times=[3600])
+    assert kinds(alerts) == ["speed"]
+    assert 9500 < alerts[0]["speed"] < 9700
+    # slow enough over a day
+    engine.check([teleport(2, PARIS, LONDON)], times=[0])
+    assert engine.check([teleport(2, TOKYO, SYDNEY)], times=[86400]) == []
+
+
+def test_speed_uses_event_times_and_earlier_events_in_the_batch():
+    engine = GeofenceEngine([], max_speed_kmh=4000)
+    # processed late and together: the receive times still say they were a day apart
+    batch = [teleport(1, PARIS, LONDON), teleport(1, TOKYO, SYDNEY)]
+    assert engine.check(batch, now=10**6, times=[0, 86400]) == []
+    alerts = engine.check(batch, now=10**6, times=[10**5, 10**5 + 60])
+    assert kinds(alerts) == ["speed", "speed"]
+    assert engine.last_seen["1"][2] == 10**5 + 60
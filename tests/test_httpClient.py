@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+from tools import http_client
+from tools.http_client import async_safe_post, close_async_session, http_stats
+
+
+async def keep_alive_server(log):
+    # answers the first request on each connection and keeps it open, then drops the
+    # connection without answering when a second request arrives, as a server does
+    # after closing an idle keep-alive socket the client still has in its pool
+    async def handle(reader, writer):
+        served = 0
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = next(int(line.split(b":")[1]) for line in head.split(b"\r\n") if line.lower().startswith(b"content-length"))
+            await reader.readexactly(length)
+            log.append(served)
+            if served:
+                writer.close()
+                return
+            served += 1
+            body = b'{"ok": true}'
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+            await writer.drain()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_stale_keep_alive_connection_is_retried_at_once_on_a_fresh_one():
+    log = []
+
+    async def scenario():
+        server, port = await keep_alive_server(log)
+        url = f"http://127.0.0.1:{port}/update"
+        stale_before = http_stats["stale_retries"]
+        try:
+            assert await async_safe_post(url, {"n": 1}) == {"ok": True}
+            t0 = time.perf_counter()
+            assert await async_safe_post(url, {"n": 2}) == {"ok": True}
+            elapsed = time.perf_counter() - t0
+        finally:
+            await close_async_session()
+            server.close()
+            await server.wait_closed()
+        return http_stats["stale_retries"] - stale_before, elapsed
+    stale_retries, elapsed = asyncio.run(scenario())
+    # the second request hit the dropped socket and went straight out again on a new connection,
+    # with no back-off sleep in between
+    assert log == [0, 1, 0]
+    assert stale_retries == 1 and elapsed < 1
+
+
+def test_sync_session_keeps_connections_alive():
+    session = http_client.make_session()
+    assert session.headers["Connection"] == "keep-alive"
+    assert session.get_adapter("http://127.0.0.1").max_retries.total == 5
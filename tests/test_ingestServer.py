@@ -0,0 +1,25 @@
+import asyncio
+
+import aiohttp
+
+from tools.ingestServer import IngestServer
+
+
+def test_accepted_batches_return_their_trace_id():
+    async def handler(event_type, data, received_at):
+        return "ab-7"
+
+    async def scenario():
+        server = IngestServer(handler, {"/new-account": "new-account"}, port=0)
+        await server.start()
+        port = server._runner.addresses[0][1]
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(f"http://127.0.0.1:{port}/new-account", json=[{"acid": 1}]) as resp:
+                    assert resp.status == 204
+                    assert resp.headers["X-Trace-Id"] == "ab-7"
+                async with session.post(f"http://127.0.0.1:{port}/unknown", json=[]) as resp:
+                    assert resp.status == 404
+        finally:
+            await server.stop()
+    asyncio.run(scenario())
@@ -0,0 +1,63 @@
+import asyncio
+import signal
+import sys
+import time
+
+from tools.ingestServer import INGEST_REJECTED, INGEST_SECONDS
+from tools.ingestWorker import _HEADER, BridgeClient, IngestBridge
+
+
+def test_bridge_survives_bad_frames_carries_metrics_and_ends_worker(tmp_path):
+    received = []
+
+    async def handler(event_type, data, received_at, payload):
+        received.append((event_type, data))
+        return "ab-1"
+
+    async def scenario():
+        socket_path = str(tmp_path / "ingest.sock")
+        bridge = IngestBridge(handler, socket_path, 0, "unused")
+        await bridge.start()
+        client = BridgeClient(socket_path)
+        connection = asyncio.create_task(client.run())
+        await asyncio.wait_for(client.connected.wait(), 5)
+
+        # an undecodable frame is dropped without losing the connection
+        client.out.writer.write(_HEADER.pack(1) + b"\xc1")
+        assert await client.forward("new-account", [{"acid": 1}], 0.0) == "ab-1"
+        assert received == [("new-account", [{"acid": 1}])]
+
+        # samples taken in the worker show up in the bot's registry
+        INGEST_REJECTED.inc("bridge-test", amount=3)
+        INGEST_SECONDS.observe(0.02, "bridge-test")
+        client.send_metrics()
+        assert ("bridge-test",) not in INGEST_REJECTED.values
+        for _ in range(50):
+            if ("bridge-test",) in INGEST_REJECTED.values:
+                break
+            await asyncio.sleep(0.01)
+        assert INGEST_REJECTED.values[("bridge-test",)] == 3
+        assert INGEST_SECONDS.series[("bridge-test",)][1] == 0.02
+
+        # the bot going away ends the worker's connection task instead of reconnecting
+        await bridge.stop()
+        await asyncio.wait_for(connection, 5)
+    asyncio.run(scenario())
+
+
+def test_stop_waits_for_all_workers_under_one_deadline(tmp_path):
+    async def scenario():
+        bridge = IngestBridge(None, str(tmp_path / "ingest.sock"), 0, "unused")
+        stubborn = "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); print(flush=True); time.sleep(60)"
+        for index in range(3):
+            process = await asyncio.create_subprocess_exec(sys.executable, "-c", stubborn, stdout=asyncio.subprocess.PIPE)
+            # the handler is installed once the worker has printed its line
+            await process.stdout.readline()
+            bridge.processes[index] = process
+        t0 = time.perf_counter()
+        await bridge.stop(0.5)
+        return time.perf_counter() - t0, [process.returncode for process in bridge.processes.values()]
+    elapsed, codes = asyncio.run(scenario())
+    # three workers ignoring SIGTERM cost one timeout, not three
+    assert 0.5 <= elapsed < 1.4
+    assert codes == [-signal.SIGKILL] * 3
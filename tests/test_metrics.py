@@ -0,0 +1,51 @@
+from tools.metrics import MetricsRegistry
+
+
+def test_render_escapes_label_values():
+    registry = MetricsRegistry()
+    registry.counter("c_total", "Counter.", ("name",)).inc('a "b" \\ c\nd')
+    assert registry.render() == (
+        "# HELP c_total Counter.\n"
+        "# TYPE c_total counter\n"
+        'c_total{name="a \\"b\\" \\\\ c\\nd"} 1\n'
+    )
+
+
+def test_labelled_counter_amounts_accumulate_per_label_set():
+    registry = MetricsRegistry()
+    counter = registry.counter("events_total", "Events.", ("type", "result"))
+    counter.inc("x", "ok", amount=3)
+    counter.inc("x", "ok")
+    counter.inc("x", "failed", amount=2.5)
+    lines = registry.render().splitlines()[2:]
+    assert lines == ['events_total{type="x",result="ok"} 4', 'events_total{type="x",result="failed"} 2.5']
+
+
+def test_histogram_buckets_are_cumulative_with_sum_and_count():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("t_seconds", "Time.", ("op",), buckets=(0.1, 1.0))
+    # a value on a bound counts in that bucket (le is inclusive)
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, "get")
+    assert registry.render().splitlines() == [
+        "# HELP t_seconds Time.",
+        "# TYPE t_seconds histogram",
+        't_seconds_bucket{op="get",le="0.1"} 2',
+        't_seconds_bucket{op="get",le="1.0"} 3',
+        't_seconds_bucket{op="get",le="+Inf"} 4',
+        't_seconds_sum{op="get"} 2.65',
+        't_seconds_count{op="get"} 4',
+    ]
+
+
+def test_collect_and_merge_carry_counters_and_histograms_across():
+    worker, bot = MetricsRegistry(), MetricsRegistry()
+    for registry in (worker, bot):
+        registry.counter("n_total", "N.", ("k",))
+        registry.histogram("h_seconds", "H.", buckets=(1.0,))
+    worker.metrics["n_total"].inc("a", amount=2)
+    worker.metrics["h_seconds"].observe(0.5)
+    bot.merge(worker.collect([worker.metrics["n_total"], worker.metrics["h_seconds"]]))
+    bot.merge(worker.collect([worker.metrics["n_total"], worker.metrics["h_seconds"]]))
+    assert bot.metrics["n_total"].values == {("a",): 2}
+    assert bot.metrics["h_seconds"].series == {(): [[1, 0], 0.5]}
@@ -0,0 +1,61 @@
+from tools.pollScheduler import AdaptivePollScheduler
+
+
+def scheduler():
+    return AdaptivePollScheduler(min_interval=1, base_interval=5, idle_interval=15, max_interval=60, busy_messages=5)
+
+
+def test_empty_polls_stretch_to_the_idle_interval_and_stop():
+    s = scheduler()
+    assert [s.on_success(0) for _ in range(5)] == [7.5, 11.25, 15, 15, 15]
+
+
+def test_busy_polls_halve_down_to_the_minimum():
+    s = scheduler()
+    assert [s.on_success(5) for _ in range(4)] == [2.5, 1.25, 1, 1]
+    # just under the busy threshold is normal traffic: back to base at once
+    assert s.on_success(4) == 1
+    s = scheduler()
+    s.on_success(0)
+    assert s.on_success(4) == 5
+
+
+def test_a_moving_last_msg_id_counts_as_activity():
+    s = scheduler()
+    s.on_success(0, 100)
+    # one message returned, but lastMsgId moved by 20
+    assert s.on_success(1, 120) == 2.5
+    # ids that are not ints are ignored rather than compared
+    assert s.on_success(0, None) == 5
+    assert s.on_success(0, 130) == 7.5
+
+
+def test_quiet_after_busy_eases_back_to_base_before_idling():
+    s = scheduler()
+    for _ in range(4):
+        s.on_success(10)
+    assert [s.on_success(0) for _ in range(5)] == [2, 4, 5, 7.5, 11.25]
+
+
+def test_failures_back_off_exponentially_up_to_the_maximum():
+    s = scheduler()
+    assert [s.on_failure() for _ in range(5)] == [10, 20, 40, 60, 60]
+    # a failure while polling fast backs off from the base interval, not the fast one
+    s = scheduler()
+    s.on_success(10)
+    assert s.on_failure() == 10
+
+
+def test_recovery_after_failures():
+    s = scheduler()
+    for _ in range(4):
+        s.on_failure()
+    # normal traffic drops straight back to base, busy traffic below it
+    assert s.on_success(1) == 5
+    for _ in range(4):
+        s.on_failure()
+    assert s.on_success(10) == 2.5
+    # an empty poll after a failure does not go past idle
+    for _ in range(4):
+        s.on_failure()
+    assert s.on_success(0) == 15
@@ -0,0 +1,30 @@
+import asyncio
+import gc
+import signal
+
+import bot as bot_module
+
+
+def test_repeated_signals_start_one_shutdown_that_is_kept_alive():
+    bot = bot_module.bot
+    calls = []
+
+    async def shutdown(reason="shutdown"):
+        calls.append(reason)
+        await asyncio.sleep(0.05)
+        calls.append("drained")
+
+    async def scenario():
+        bot.shutdown = shutdown
+        try:
+            bot.on_signal(signal.SIGTERM)
+            task = bot._shutdown_task
+            bot.on_signal(signal.SIGINT)
+            assert bot._shutdown_task is task
+            gc.collect()
+            await task
+        finally:
+            del bot.shutdown
+            bot._shutdown_task = None
+    asyncio.run(scenario())
+    assert calls == ["SIGTERM", "drained"]
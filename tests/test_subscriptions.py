@@ -0,0 +1,33 @@
+from tools.subscriptions import SubscriptionTable
+
+
+def test_match_routes_items_by_filter(tmp_path):
+    table = SubscriptionTable(str(tmp_path / "subscriptions.json"))
+    table.add(1, 10, "callsign-change")
+    table.add(1, 11, "callsign-change", {"callsign": ["ABC"]})
+    table.add(2, 12, "callsign-change", {"acid": ["7"], "callsign": ["xyz"]})
+    table.add(2, 13, "new-account", {"acid": ["7"]})
+    items = [
+        {"acid": 1, "oldCallsign": "abc", "newCallsign": "ABC2"},
+        {"acid": 7, "oldCallsign": "XYZ", "newCallsign": "ABC"},
+        {"acid": 7, "oldCallsign": "Q", "newCallsign": "R"},
+    ]
+    assert table.match("callsign-change", items) == {10: None, 11: [0, 1], 12: [1]}
+    assert table.match("aircraft-change", items) == {}
+
+
+def test_subscriptions_survive_a_reload(tmp_path):
+    path = str(tmp_path / "subscriptions.json")
+    table = SubscriptionTable(path)
+    table.add(1, 11, "new-account", {"aircraft": ["Cessna"]})
+    table.add(1, 12, "new-account")
+    assert table.remove(12, "new-account")
+    assert not table.remove(12, "new-account")
+    table.save()
+
+    loaded = SubscriptionTable(path)
+    loaded.load()
+    assert [sub.to_json() for sub in loaded.for_guild(1)] == [
+        {"guild": 1, "channel": 11, "event": "new-account", "filters": {"aircraft": ["cessna"]}},
+    ]
+    assert loaded.match("new-account", [{"newAircraft": "CESSNA"}, {"newAircraft": "A320"}]) == {11: [0]}
@@ -0,0 +1,13 @@
+from tools.tracing import TraceRecorder, trace_id
+
+
+def test_slowest_recent_traces_keep_their_ids():
+    tracer = TraceRecorder()
+    for seconds in (0.5, 2.0, 1.0):
+        trace = tracer.start("new-account", received=0.0)
+        trace.dequeued = seconds
+        tracer.finish(trace)
+    slowest = tracer.slowest(2)
+    assert [total for _, total in slowest] == [2.0, 1.0]
+    assert slowest[0][0].trace_id.endswith("-2")
+    assert trace_id(None) == "-"